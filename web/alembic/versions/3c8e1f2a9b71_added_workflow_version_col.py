@@ -0,0 +1,26 @@
+"""added workflow version col
+
+Revision ID: 3c8e1f2a9b71
+Revises: b0d5e10cb082
+Create Date: 2026-10-17 10:12:41.208314
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '3c8e1f2a9b71'
+down_revision: Union[str, None] = 'b0d5e10cb082'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.add_column('workflow', sa.Column('version', sa.Integer(), server_default='1', nullable=False))
+
+
+def downgrade() -> None:
+    op.drop_column('workflow', 'version')
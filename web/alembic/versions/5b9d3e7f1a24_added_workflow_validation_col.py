@@ -0,0 +1,27 @@
+"""added workflow validation col
+
+Revision ID: 5b9d3e7f1a24
+Revises: 9e4b7a1c2d58
+Create Date: 2026-10-17 21:40:12.584920
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '5b9d3e7f1a24'
+down_revision: Union[str, None] = '9e4b7a1c2d58'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # Existing Workflows are validated on first request of their validation
+    op.add_column('workflow', sa.Column('validation', sa.JSON(), nullable=True))
+
+
+def downgrade() -> None:
+    op.drop_column('workflow', 'validation')
@@ -0,0 +1,32 @@
+"""added lookup indexes
+
+Revision ID: 7d2a4c6e8f13
+Revises: 3c8e1f2a9b71
+Create Date: 2026-10-17 14:03:27.519842
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '7d2a4c6e8f13'
+down_revision: Union[str, None] = '3c8e1f2a9b71'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_index('ix_node_workflow_id_type', 'node', ['workflow_id', 'type'], unique=False)
+    op.create_index('ix_edge_target_node_id', 'edge', ['target_node_id'], unique=False)
+    op.create_index('ix_condition_yes_edge_id', 'condition', ['yes_edge_id'], unique=False)
+    op.create_index('ix_condition_no_edge_id', 'condition', ['no_edge_id'], unique=False)
+
+
+def downgrade() -> None:
+    op.drop_index('ix_condition_no_edge_id', table_name='condition')
+    op.drop_index('ix_condition_yes_edge_id', table_name='condition')
+    op.drop_index('ix_edge_target_node_id', table_name='edge')
+    op.drop_index('ix_node_workflow_id_type', table_name='node')
@@ -0,0 +1,35 @@
+"""added edge workflow_id col
+
+Revision ID: 9e4b7a1c2d58
+Revises: 7d2a4c6e8f13
+Create Date: 2026-10-17 16:41:09.734120
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '9e4b7a1c2d58'
+down_revision: Union[str, None] = '7d2a4c6e8f13'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.add_column('edge', sa.Column('workflow_id', sa.Integer(), nullable=True))
+    # Edges only link Nodes of the same Workflow, so source Node determines the Workflow
+    op.execute(
+        'UPDATE edge SET workflow_id = node.workflow_id FROM node WHERE node.id = edge.source_node_id'
+    )
+    op.alter_column('edge', 'workflow_id', nullable=False)
+    op.create_foreign_key('edge_workflow_id_fkey', 'edge', 'workflow', ['workflow_id'], ['id'], ondelete='CASCADE')
+    op.create_index(op.f('ix_edge_workflow_id'), 'edge', ['workflow_id'], unique=False)
+
+
+def downgrade() -> None:
+    op.drop_index(op.f('ix_edge_workflow_id'), table_name='edge')
+    op.drop_constraint('edge_workflow_id_fkey', 'edge', type_='foreignkey')
+    op.drop_column('edge', 'workflow_id')
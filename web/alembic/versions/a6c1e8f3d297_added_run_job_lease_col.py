@@ -0,0 +1,26 @@
+"""added run_job lease_expires_at col
+
+Revision ID: a6c1e8f3d297
+Revises: e7a3b9d05c42
+Create Date: 2026-10-17 23:12:08.530416
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'a6c1e8f3d297'
+down_revision: Union[str, None] = 'e7a3b9d05c42'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.add_column('run_job', sa.Column('lease_expires_at', sa.TIMESTAMP(timezone=True), nullable=True))
+
+
+def downgrade() -> None:
+    op.drop_column('run_job', 'lease_expires_at')
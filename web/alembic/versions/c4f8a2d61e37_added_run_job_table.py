@@ -0,0 +1,42 @@
+"""added run_job table
+
+Revision ID: c4f8a2d61e37
+Revises: 5b9d3e7f1a24
+Create Date: 2026-10-17 22:05:31.402715
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'c4f8a2d61e37'
+down_revision: Union[str, None] = '5b9d3e7f1a24'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table('run_job',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('status', sa.Enum('queued', 'running', 'done', 'failed', name='runjobstatusenum'), nullable=False),
+    sa.Column('workflow_ids', sa.JSON(), nullable=False),
+    sa.Column('parallel', sa.Boolean(), server_default='false', nullable=False),
+    sa.Column('runs', sa.JSON(), nullable=True),
+    sa.Column('error', sa.Text(), nullable=True),
+    sa.Column('created_at', sa.TIMESTAMP(timezone=True), server_default=sa.text('now()'), nullable=False),
+    sa.Column('started_at', sa.TIMESTAMP(timezone=True), nullable=True),
+    sa.Column('finished_at', sa.TIMESTAMP(timezone=True), nullable=True),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index(op.f('ix_run_job_id'), 'run_job', ['id'], unique=False)
+    op.create_index('ix_run_job_status_id', 'run_job', ['status', 'id'], unique=False)
+
+
+def downgrade() -> None:
+    op.drop_index('ix_run_job_status_id', table_name='run_job')
+    op.drop_index(op.f('ix_run_job_id'), table_name='run_job')
+    op.drop_table('run_job')
+    sa.Enum(name='runjobstatusenum').drop(op.get_bind(), checkfirst=False)
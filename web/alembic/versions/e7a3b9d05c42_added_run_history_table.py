@@ -0,0 +1,39 @@
+"""added run_history table
+
+Revision ID: e7a3b9d05c42
+Revises: c4f8a2d61e37
+Create Date: 2026-10-17 22:31:47.118352
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'e7a3b9d05c42'
+down_revision: Union[str, None] = 'c4f8a2d61e37'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table('run_history',
+    sa.Column('id', sa.BigInteger(), nullable=False),
+    sa.Column('workflow_id', sa.Integer(), nullable=False),
+    sa.Column('version', sa.Integer(), nullable=False),
+    sa.Column('nodes_ids', sa.JSON(), nullable=True),
+    sa.Column('error', sa.Text(), nullable=True),
+    sa.Column('duration_ms', sa.Float(), nullable=False),
+    sa.Column('created_at', sa.TIMESTAMP(timezone=True), nullable=False),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index(
+        'ix_run_history_workflow_id_created_at_id', 'run_history', ['workflow_id', 'created_at', 'id'], unique=False
+    )
+
+
+def downgrade() -> None:
+    op.drop_index('ix_run_history_workflow_id_created_at_id', table_name='run_history')
+    op.drop_table('run_history')
@@ -0,0 +1,233 @@
+"""
+Async version of API, run with `uvicorn app.async_main:app`.
+
+Endpoints on hot path are served by async endpoints using `AsyncSession`, so concurrency is not limited
+by threadpool size. Remaining endpoints are served by sync app from `main` mounted below.
+"""
+from typing import Optional
+
+from fastapi import (
+    FastAPI,
+    Depends,
+    Header,
+    Query,
+    Response,
+    status
+)
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from . import async_services
+from . import main
+from . import metrics
+from . import models
+from . import plans
+from . import process_runs
+from . import response_cache
+from . import run_history
+from . import run_jobs
+from . import schemas
+from . import selectors
+from . import utils
+from .config import settings
+from .profiling import setup_profiling
+from .db import get_async_db
+
+app = FastAPI()
+app.add_middleware(metrics.MetricsMiddleware)
+app.add_event_handler("shutdown", metrics.mark_process_dead)
+app.add_event_handler("shutdown", process_runs.shutdown_process_executor)
+app.add_event_handler("startup", run_jobs.start_workers)
+app.add_event_handler("shutdown", run_jobs.stop_workers)
+app.add_event_handler("startup", run_history.start_writer)
+app.add_event_handler("shutdown", run_history.stop_writer)
+if settings.PROFILING_ENABLED:
+    setup_profiling(app)
+
+
+@app.get("/api/workflows", status_code=status.HTTP_200_OK, response_model_exclude_none=True)
+async def get_all_workflows(
+    after_id: Optional[int] = None,
+    limit: int = Query(settings.WORKFLOWS_PAGE_SIZE, ge=1, le=settings.WORKFLOWS_MAX_PAGE_SIZE),
+    with_graph: bool = True,
+    db: AsyncSession = Depends(get_async_db)
+) -> list[schemas.WorkflowListOut]:
+    """
+    Retrieve page of Workflows (ordered by ID) and their nodes and edges data
+
+    Notes:
+    To get next page pass ID of the last Workflow of current page as `after_id`.
+    With `with_graph=false` only Workflows data is returned, without nodes and edges.
+    """
+    if not with_graph:
+        return await db.run_sync(lambda session: selectors.get_workflows_page(
+            session.query(models.Workflow.id, models.Workflow.name, models.Workflow.created_at),
+            after_id=after_id,
+            limit=limit
+        ))
+    workflows = await db.run_sync(lambda session: selectors.get_workflows_page(
+        session.query(models.Workflow), after_id=after_id, limit=limit
+    ))
+    contents = await async_services.get_workflows_json(workflows, db=db)
+    return Response(content=response_cache.join(contents), media_type="application/json")
+
+
+@app.post("/api/workflows", status_code=status.HTTP_201_CREATED)
+async def create_workflow(workflow: schemas.WorkflowIn, db: AsyncSession = Depends(get_async_db)) -> schemas.WorkflowOut:
+    """
+    Create Workflow
+    """
+    workflow_obj = models.Workflow(**workflow.model_dump(), nodes=[])
+    db.add(workflow_obj)
+    await db.commit()
+    await db.refresh(workflow_obj, attribute_names=["created_at", "version"])
+    return workflow_obj
+
+
+@app.get("/api/workflows/{workflow_id:int}", status_code=status.HTTP_200_OK, response_model_exclude_none=True)
+async def get_workflow(
+    workflow_id: int,
+    if_none_match: Optional[str] = Header(None),
+    db: AsyncSession = Depends(get_async_db)
+) -> schemas.WorkflowOut:
+    """
+    Retrieve Workflow and its nodes and edges data
+
+    Notes:
+    Response has ETag of Workflow version, with matching `If-None-Match` header 304 is returned
+    without loading nodes and edges.
+    """
+    workflow_obj = await selectors.aget_object_or_404(models.Workflow, object_id=workflow_id, db=db)
+    etag = utils.get_workflow_etag(workflow_obj)
+    if utils.etag_matches(if_none_match, etag):
+        return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers={"ETag": etag})
+    content = (await async_services.get_workflows_json([workflow_obj], db=db))[0]
+    return Response(content=content, media_type="application/json", headers={"ETag": etag})
+
+
+@app.delete("/api/workflows/{workflow_id:int}", status_code=status.HTTP_204_NO_CONTENT)
+async def delete_workflow(workflow_id: int, db: AsyncSession = Depends(get_async_db)) -> None:
+    """
+    Delete Workflow
+    """
+    await async_services.delete_workflow(workflow_id=workflow_id, db=db)
+
+
+@app.get("/api/workflows/{workflow_id:int}/run", status_code=status.HTTP_200_OK, response_model_exclude_none=True)
+async def run_workflow(
+    workflow_id: int,
+    if_none_match: Optional[str] = Header(None),
+    limits: Optional[plans.RunLimits] = Depends(main.get_run_limits),
+    db: AsyncSession = Depends(get_async_db)
+) -> schemas.Graph:
+    """
+    Run specific Workflow and return full DiGraph path with Nodes data
+
+    Notes:
+    Run fails if path returns to the same Node with the same preceding Message (it would never end),
+    or if it exceeds `max_steps` or `max_duration_ms` (lower limits than default ones can be requested).
+    Response has ETag of Workflow version, with matching `If-None-Match` header 304 is returned
+    without running Workflow (unless limits are requested).
+    """
+    workflow_obj = await selectors.aget_object_or_404(models.Workflow, object_id=workflow_id, db=db)
+    etag = utils.get_workflow_etag(workflow_obj)
+    if limits is None and utils.etag_matches(if_none_match, etag):
+        return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers={"ETag": etag})
+    content = await async_services.run_workflow_json(workflow_obj=workflow_obj, db=db, limits=limits)
+    return Response(content=content, media_type="application/json", headers={"ETag": etag})
+
+
+@app.post("/api/workflows/{workflow_id:int}/runs", status_code=status.HTTP_200_OK, response_model_exclude_none=True)
+async def run_workflow_batch(
+    workflow_id: int,
+    runs: schemas.WorkflowRunsIn,
+    limits: Optional[plans.RunLimits] = Depends(main.get_run_limits),
+    db: AsyncSession = Depends(get_async_db)
+) -> schemas.GraphRuns:
+    """
+    Run specific Workflow once per provided set of Message statuses ("what-if" runs).
+
+    Notes:
+    Statuses override saved ones only within the run, nothing is saved.
+    Each run returns either full DiGraph path with Nodes data or error.
+    `max_steps` and `max_duration_ms` limits apply to every run separately.
+    """
+    workflow_obj = await selectors.aget_object_or_404(models.Workflow, object_id=workflow_id, db=db)
+    runs_results = await async_services.run_workflow_batch(
+        workflow_obj=workflow_obj,
+        runs=runs.runs,
+        db=db,
+        limits=limits
+    )
+    return {
+        "workflow_id": workflow_id,
+        "runs": runs_results
+    }
+
+
+@app.post("/api/nodes", status_code=status.HTTP_201_CREATED, response_model_exclude_none=True)
+async def create_node(node: schemas.NodeInCreate, db: AsyncSession = Depends(get_async_db)) -> schemas.NodeOut:
+    """
+    Create Node within provided Workflow
+    """
+    node_obj = await async_services.create_node(node=node, db=db)
+    return node_obj
+
+
+@app.patch("/api/nodes/{node_id:int}", status_code=status.HTTP_200_OK, response_model_exclude_none=True)
+async def update_node(
+    node_id: int,
+    node: schemas.NodeInUpdate,
+    db: AsyncSession = Depends(get_async_db)
+) -> schemas.NodeOut:
+    """
+    Update given Node.
+
+    Notes:
+    Node type cannot be changed, only the additional parameters.
+    For condition only the expression can be changed, as well as status and text for Message Node.
+    To update Condition "yes" and "no" edges endpoints for egdes creation/deletion must be used.
+    """
+    node_obj = await async_services.update_node(node_id=node_id, node_data=node, db=db)
+    return node_obj
+
+
+@app.delete("/api/nodes/{node_id:int}", status_code=status.HTTP_204_NO_CONTENT)
+async def delete_node(node_id: int, db: AsyncSession = Depends(get_async_db)) -> None:
+    """
+    Delete given Node
+    """
+    await async_services.delete_node(node_id=node_id, db=db)
+
+
+@app.post("/api/edges", status_code=status.HTTP_201_CREATED)
+async def create_edge(edge: schemas.EdgeIn, db: AsyncSession = Depends(get_async_db)) -> schemas.EdgeOut:
+    """
+    Create Edge that links 2 Nodes
+    """
+    edge_obj = await async_services.create_edge(edge=edge, db=db)
+    return edge_obj
+
+
+@app.post("/api/edges/batch", status_code=status.HTTP_201_CREATED)
+async def create_edges(edges: schemas.EdgesIn, db: AsyncSession = Depends(get_async_db)) -> list[schemas.EdgeOut]:
+    """
+    Create many Edges at once
+
+    Notes:
+    Edges are validated with the same rules as single Edge, including conflicts between provided Edges.
+    Nothing is created if any of Edges is invalid.
+    """
+    edges_objs = await async_services.create_edges(edges=edges.edges, db=db)
+    return edges_objs
+
+
+@app.delete("/api/edges/{edge_id:int}", status_code=status.HTTP_204_NO_CONTENT)
+async def delete_edge(edge_id: int, db: AsyncSession = Depends(get_async_db)) -> None:
+    """
+    Delete Edge
+    """
+    await async_services.delete_edge(edge_id=edge_id, db=db)
+
+
+# Endpoints without async version (bulk runs, import, export)
+app.mount("/", main.app)
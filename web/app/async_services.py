@@ -0,0 +1,93 @@
+"""
+Async versions of `services`.
+
+Business logic is shared with `services`. DB work runs inside `AsyncSession.run_sync`, where SQLAlchemy executes
+DB calls through async driver, but the callback itself runs on event loop thread. So run paths are found and
+responses are encoded (CPU-bound work) on threadpool with `run_in_threadpool`, `run_sync` is only used for
+loading data. Graph changes stay within `run_sync` as a whole: they are mostly DB work, validation of changed
+graph is incremental (see `validation`) and only loads whole graph when its reachability or cycles may change.
+"""
+from typing import Optional
+
+from sqlalchemy.ext.asyncio import AsyncSession
+from starlette.concurrency import run_in_threadpool
+
+from . import models
+from . import plans
+from . import schemas
+from . import selectors
+from . import services
+
+
+async def get_runnable_workflow_plan(workflow_obj: models.Workflow, db: AsyncSession) -> plans.WorkflowPlan:
+    """
+    Returns compiled plan of Workflow (see `services.get_runnable_workflow_plan`), on cache miss graph is loaded
+    by `run_sync` and compiled on threadpool
+    """
+    services.check_workflow_validation(workflow_obj)
+    workflows_plans, missing_workflows = services.get_cached_plans([workflow_obj])
+    if missing_workflows:
+        graphs = await db.run_sync(
+            lambda session: selectors.get_workflows_graphs([workflow_obj.id], db=session, with_nodes_data=True)
+        )
+        workflows_plans = await run_in_threadpool(services.compile_loaded_plans, missing_workflows, graphs)
+    plan = workflows_plans[workflow_obj.id]
+    services.check_runnable_plan(plan)
+    return plan
+
+
+async def run_workflow_json(
+    workflow_obj: models.Workflow,
+    db: AsyncSession,
+    limits: Optional[plans.RunLimits] = None
+) -> bytes:
+    content = services.get_cached_run_json(workflow_obj, limits=limits)
+    if content is None:
+        plan = await get_runnable_workflow_plan(workflow_obj, db=db)
+        content = await run_in_threadpool(services.run_plan_json, workflow_obj, plan, limits)
+    return content
+
+
+async def get_workflows_json(workflows: list[models.Workflow], db: AsyncSession) -> list[bytes]:
+    contents, missing_workflows = services.get_cached_workflows_json(workflows)
+    if missing_workflows:
+        await db.run_sync(lambda session: selectors.attach_workflows_graphs(missing_workflows, db=session))
+    return await run_in_threadpool(services.encode_workflows_json, workflows, missing_workflows, contents)
+
+
+async def run_workflow_batch(
+    workflow_obj: models.Workflow,
+    runs: list[schemas.WorkflowRunIn],
+    db: AsyncSession,
+    limits: Optional[plans.RunLimits] = None
+) -> list[dict]:
+    plan = await get_runnable_workflow_plan(workflow_obj, db=db)
+    return await run_in_threadpool(services.run_plan_batch, plan, runs, limits)
+
+
+async def create_node(node: schemas.NodeInCreate, db: AsyncSession) -> models.Node:
+    return await db.run_sync(lambda session: services.create_node(node=node, db=session))
+
+
+async def update_node(node_id: int, node_data: schemas.NodeInUpdate, db: AsyncSession) -> models.Node:
+    return await db.run_sync(lambda session: services.update_node(node_id=node_id, node_data=node_data, db=session))
+
+
+async def create_edge(edge: schemas.EdgeIn, db: AsyncSession) -> models.Edge:
+    return await db.run_sync(lambda session: services.create_edge(edge=edge, db=session))
+
+
+async def create_edges(edges: list[schemas.EdgeIn], db: AsyncSession) -> list[models.Edge]:
+    return await db.run_sync(lambda session: services.create_edges(edges=edges, db=session))
+
+
+async def delete_workflow(workflow_id: int, db: AsyncSession) -> None:
+    await db.run_sync(lambda session: services.delete_workflow(workflow_id=workflow_id, db=session))
+
+
+async def delete_node(node_id: int, db: AsyncSession) -> None:
+    await db.run_sync(lambda session: services.delete_node(node_id=node_id, db=session))
+
+
+async def delete_edge(edge_id: int, db: AsyncSession) -> None:
+    await db.run_sync(lambda session: services.delete_edge(edge_id=edge_id, db=session))
@@ -1,3 +1,5 @@
+from typing import Literal
+
 from pydantic_settings import BaseSettings
 
 
@@ -6,4 +8,76 @@ class Settings(BaseSettings):
     DB_URL: str
     TESTS_DB_URL: str
 
+    # Connection pool of each engine (sync and async) in every worker process.
+    # Sync app handles requests on threadpool (40 threads by default), pool smaller than that
+    # makes requests wait for connection while holding threads needed to finish other requests.
+    DB_POOL_SIZE: int = 5
+    DB_MAX_OVERFLOW: int = 10
+    # Seconds to wait for connection before failing request
+    DB_POOL_TIMEOUT: float = 30
+    # Seconds after which connection is replaced, -1 to keep connections forever
+    DB_POOL_RECYCLE: int = -1
+    # Check connections liveness on checkout
+    DB_POOL_PRE_PING: bool = False
+    # Max duration of single SQL statement in milliseconds, 0 for no limit
+    DB_STATEMENT_TIMEOUT: int = 0
+
+    # Max number of compiled Workflow execution plans kept in memory
+    PLAN_CACHE_SIZE: int = 512
+    # Max total size of encoded Workflow and run responses kept in memory (bytes)
+    RESPONSE_CACHE_MAX_BYTES: int = 64 * 1024 * 1024
+    # Seconds after which cached response is dropped, 0 to keep until evicted or invalidated
+    RESPONSE_CACHE_TTL: float = 0
+    # Max number of paths in decision table of Workflow, runs of Workflows with more paths walk the graph
+    DECISION_TABLE_MAX_PATHS: int = 1024
+    # Max number of parsed Condition expressions kept in memory
+    RULE_CACHE_SIZE: int = 4096
+    # Max number of Nodes in run path and max duration of single run (0 for no limit),
+    # runs can request lower limits
+    RUN_MAX_STEPS: int = 10000
+    RUN_MAX_DURATION_MS: float = 1000
+    # Number of threads used by bulk runs requested as parallel
+    BULK_RUN_WORKERS: int = 4
+    # Number of worker processes used by bulk runs requested as parallel instead of threads, 0 to use threads.
+    # Plans are sent to processes in chunks of BULK_RUN_CHUNK_SIZE Workflows.
+    BULK_RUN_PROCESSES: int = 0
+    BULK_RUN_CHUNK_SIZE: int = 64
+    # Queue of run jobs: "postgres" (jobs are claimed from DB and shared by all processes) or "memory"
+    # (jobs are run by process which created them)
+    RUN_JOBS_QUEUE: Literal["postgres", "memory"] = "postgres"
+    # Number of threads running jobs in every worker process (`python -m app.run_jobs`). API processes run jobs
+    # only with RUN_JOBS_IN_API (always with "memory" queue, where jobs are run by process which created them).
+    RUN_JOBS_WORKERS: int = 2
+    RUN_JOBS_IN_API: bool = False
+    # Seconds idle workers wait before polling queue again
+    RUN_JOBS_POLL_INTERVAL: float = 1
+    # Seconds running job is leased to its worker. Worker renews lease while job is running, job which lease
+    # expired (e.g. its worker was killed) is claimed again.
+    RUN_JOBS_LEASE_SECONDS: float = 60
+    # Max duration of every Workflow run of job (0 for no limit), jobs are not bound by request timeouts
+    RUN_JOBS_MAX_DURATION_MS: float = 0
+    # Record every run with saved Message statuses in run history. Rows are inserted by background thread
+    # in batches of RUN_HISTORY_BATCH_SIZE rows, or every RUN_HISTORY_FLUSH_INTERVAL seconds,
+    # new rows are dropped while RUN_HISTORY_MAX_PENDING rows are waiting.
+    RUN_HISTORY_ENABLED: bool = True
+    RUN_HISTORY_BATCH_SIZE: int = 500
+    RUN_HISTORY_FLUSH_INTERVAL: float = 1
+    RUN_HISTORY_MAX_PENDING: int = 100000
+    # Default and max number of runs returned by history of Workflow
+    RUN_HISTORY_PAGE_SIZE: int = 50
+    RUN_HISTORY_MAX_PAGE_SIZE: int = 500
+    # Default and max number of Workflows returned by listing
+    WORKFLOWS_PAGE_SIZE: int = 20
+    WORKFLOWS_MAX_PAGE_SIZE: int = 100
+    # Number of Workflows fetched from DB cursor at once during export
+    EXPORT_BATCH_SIZE: int = 500
+
+    # Report SQL, endpoint and serialization timings of every request in Server-Timing header and log
+    PROFILING_ENABLED: bool = False
+    # Part of profiled requests (0-1) run under cProfile
+    PROFILING_SAMPLE_RATE: float = 0.0
+    # cProfile stats of sampled requests slower than this are saved to PROFILING_DIR
+    PROFILING_SLOW_REQUEST_MS: float = 500
+    PROFILING_DIR: str = "profiles"
+
 settings = Settings()
@@ -1,14 +1,118 @@
-from sqlalchemy import create_engine
+import threading
+import time
+
+from typing import AsyncGenerator
+
+from sqlalchemy import create_engine, make_url
+from sqlalchemy.engine import Engine
+from sqlalchemy.exc import TimeoutError as PoolTimeoutError
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
 from sqlalchemy.orm import declarative_base
 from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import AsyncAdaptedQueuePool, QueuePool
 
 from .config import settings
 
 
-engine = create_engine(settings.DB_URL)
+def get_async_url(url: str) -> str:
+    """
+    Converts DB URL to URL using async driver
+    """
+    return make_url(url).set(drivername="postgresql+asyncpg").render_as_string(hide_password=False)
+
+
+class PoolWaitStatsMixin:
+    """
+    Collects number of connections checkouts from pool and time spent waiting for them
+    """
+
+    def __init__(self, *args, **kwargs) -> None:
+        super().__init__(*args, **kwargs)
+        self._stats_lock = threading.Lock()
+        self.checkouts = 0
+        self.timeouts = 0
+        self.wait_time_total = 0.0
+        self.wait_time_max = 0.0
+
+    def _do_get(self):
+        started_at = time.perf_counter()
+        try:
+            return super()._do_get()
+        except PoolTimeoutError:
+            with self._stats_lock:
+                self.timeouts += 1
+            raise
+        finally:
+            wait_time = time.perf_counter() - started_at
+            with self._stats_lock:
+                self.checkouts += 1
+                self.wait_time_total += wait_time
+                self.wait_time_max = max(self.wait_time_max, wait_time)
+
+
+class InstrumentedQueuePool(PoolWaitStatsMixin, QueuePool):
+    pass
+
+
+class InstrumentedAsyncAdaptedQueuePool(PoolWaitStatsMixin, AsyncAdaptedQueuePool):
+    pass
+
+
+def get_engine_options() -> dict:
+    """
+    Pool options of DB engines based on settings
+    """
+    return {
+        "pool_size": settings.DB_POOL_SIZE,
+        "max_overflow": settings.DB_MAX_OVERFLOW,
+        "pool_timeout": settings.DB_POOL_TIMEOUT,
+        "pool_recycle": settings.DB_POOL_RECYCLE,
+        "pool_pre_ping": settings.DB_POOL_PRE_PING,
+    }
+
+
+def get_pool_stats(engine: Engine) -> dict:
+    """
+    Returns current state of engine connection pool and wait times collected since process start
+    """
+    pool = engine.pool
+    return {
+        "size": pool.size(),
+        "checked_in": pool.checkedin(),
+        "checked_out": pool.checkedout(),
+        "overflow": pool.overflow(),
+        "checkouts": pool.checkouts,
+        "timeouts": pool.timeouts,
+        "wait_time_total": pool.wait_time_total,
+        "wait_time_max": pool.wait_time_max,
+        "wait_time_avg": pool.wait_time_total / pool.checkouts if pool.checkouts else 0.0,
+    }
+
+
+statement_timeout_options = {}
+async_statement_timeout_options = {}
+if settings.DB_STATEMENT_TIMEOUT:
+    statement_timeout_options["options"] = f"-c statement_timeout={settings.DB_STATEMENT_TIMEOUT}"
+    async_statement_timeout_options["server_settings"] = {"statement_timeout": str(settings.DB_STATEMENT_TIMEOUT)}
+
+engine = create_engine(
+    settings.DB_URL,
+    poolclass=InstrumentedQueuePool,
+    connect_args=statement_timeout_options,
+    **get_engine_options()
+)
 SessionLocal = sessionmaker(bind=engine, autocommit=False, autoflush=False)
 Base = declarative_base()
 
+async_engine = create_async_engine(
+    get_async_url(settings.DB_URL),
+    poolclass=InstrumentedAsyncAdaptedQueuePool,
+    connect_args=async_statement_timeout_options,
+    **get_engine_options()
+)
+# Expired attributes cannot be lazy loaded in async code, so objects are not expired after commit
+AsyncSessionLocal = async_sessionmaker(bind=async_engine, autoflush=False, expire_on_commit=False)
+
 def get_db():
     """
     Generate DB session
@@ -18,3 +122,18 @@ def get_db():
         yield db
     finally:
         db.close()
+
+
+def get_session_factory() -> sessionmaker:
+    """
+    Get factory of DB sessions, used by work outliving request (e.g. streamed responses)
+    """
+    return SessionLocal
+
+
+async def get_async_db() -> AsyncGenerator[AsyncSession, None]:
+    """
+    Generate async DB session
+    """
+    async with AsyncSessionLocal() as db:
+        yield db
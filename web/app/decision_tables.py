@@ -0,0 +1,266 @@
+"""
+Decision tables of compiled Workflow plans.
+
+Condition only evaluates the most recent Message, and the only Node data that differs between runs is Message
+status (see `statuses` of `plans.find_plan_path`), which has just a few values. So all paths of Workflow can be
+listed ahead of time, each of them with statuses of Messages leading to it.
+
+Table is built by walking the plan once and forking at every Condition which result depends on status of
+its Message. Besides list of paths it keeps decision tree, so path of a run is found by looking up statuses of
+Messages that decide it instead of walking the plan.
+"""
+from dataclasses import dataclass
+from typing import Mapping, Optional, Union
+
+from . import models
+from .config import settings
+from .plans import (
+    CONDITION_TYPE,
+    MESSAGE_TYPE,
+    NO_NODE,
+    CycleError,
+    DeadEndError,
+    InvalidConditionError,
+    PlanCache,
+    RunLimitExceededError,
+    RunLimits,
+    WorkflowPlan,
+)
+
+STATUSES = tuple(models.Message.MessageStatusEnum)
+
+
+class TooManyPathsError(ValueError):
+    """
+    Workflow has more paths than allowed in decision table
+    """
+
+
+@dataclass(frozen=True, slots=True)
+class TablePath:
+    # Message index -> statuses of Message leading to this path, Messages not listed do not affect it
+    statuses: Mapping[int, tuple[models.Message.MessageStatusEnum, ...]]
+    # Indexes of Nodes in path, up to Node where run fails
+    path: tuple[int, ...]
+    # Length of path checked against steps limit, Condition where run fails is added after the check
+    steps: int
+    # Type and message of error raised by run following this path
+    error: Optional[tuple[type[ValueError], str]] = None
+
+
+# Index of path in `DecisionTable.paths`, or Message index and status -> subtree
+DecisionTree = Union[int, tuple[int, Mapping[models.Message.MessageStatusEnum, "DecisionTree"]]]
+
+
+@dataclass(frozen=True, slots=True)
+class DecisionTable:
+    workflow_id: int
+    version: int
+    paths: tuple[TablePath, ...]
+    # None when Workflow has too many paths, runs are then found by walking the plan
+    tree: Optional[DecisionTree]
+
+
+@dataclass(slots=True)
+class Branch:
+    """
+    Run being explored, forked at Conditions which result depends on status of Message
+    """
+    current_index: int
+    previous_message_index: int
+    path: list[int]
+    visited_states: set[tuple[int, int]]
+    statuses: dict[int, tuple[models.Message.MessageStatusEnum, ...]]
+    # Container and keys to which subtree of the branch is assigned
+    tree_slot: tuple[dict, tuple]
+
+
+def get_invalid_condition_error(node_id: int) -> tuple[type[ValueError], str]:
+    return InvalidConditionError, f"Condition with ID of {node_id} is invalid, please update the expression."
+
+
+def compile_decision_table(plan: WorkflowPlan, max_paths: int, max_steps: Optional[int] = None) -> DecisionTable:
+    """
+    Lists all paths of compiled Workflow plan and builds decision tree leading to them.
+
+    Paths follow exactly the same rules as `plans.find_plan_path`, including its errors and steps limit
+    (time limit is not applied, finding path in decision tree does not depend on Workflow size).
+
+    Raises:
+        TooManyPathsError: Workflow has more than `max_paths` paths.
+    """
+    if max_steps is None:
+        max_steps = settings.RUN_MAX_STEPS
+    nodes = plan.nodes
+    node_types = plan.node_types
+    successors = plan.successors
+
+    paths = []
+    root_slot = {}
+    branches = [Branch(plan.start_index, NO_NODE, [], set(), {}, (root_slot, ("root",)))]
+
+    def finish(branch: Branch, steps: int, error: Optional[tuple[type[ValueError], str]] = None) -> None:
+        if len(paths) >= max_paths:
+            raise TooManyPathsError(f"Workflow has more than {max_paths} paths")
+        container, keys = branch.tree_slot
+        for key in keys:
+            container[key] = len(paths)
+        paths.append(TablePath(
+            statuses={index: branch.statuses[index] for index in sorted(branch.statuses)},
+            path=tuple(branch.path),
+            steps=steps,
+            error=error
+        ))
+
+    while branches:
+        branch = branches.pop()
+        path = branch.path
+        current_index = branch.current_index
+        previous_message_index = branch.previous_message_index
+        while True:
+            if current_index == NO_NODE:
+                # Condition without "yes" or "no" edge was reached, it was added to path after the steps check
+                finish(
+                    branch,
+                    len(path) - 1 if path else 0,
+                    (DeadEndError, "No end node at the end of the path or edge missing. Node id: None")
+                )
+                break
+            path.append(current_index)
+            steps = len(path)
+            if steps > max_steps:
+                finish(branch, steps, (RunLimitExceededError, f"Run exceeded limit of {max_steps} steps"))
+                break
+            if current_index == plan.end_index:
+                finish(branch, steps)
+                break
+
+            state = (current_index, previous_message_index)
+            if state in branch.visited_states:
+                finish(branch, steps, (
+                    CycleError,
+                    f"Path returns to the same state, run would never end. Node id: {nodes[current_index]['id']}"
+                ))
+                break
+            branch.visited_states.add(state)
+
+            neighbor_index = successors[current_index]
+            if neighbor_index == NO_NODE:
+                finish(branch, steps, (
+                    DeadEndError,
+                    f"No end node at the end of the path or edge missing. Node id: {nodes[current_index]['id']}"
+                ))
+                break
+
+            neighbor_type = node_types[neighbor_index]
+            if neighbor_type == CONDITION_TYPE:
+                path.append(neighbor_index)
+                if previous_message_index == NO_NODE:
+                    finish(branch, steps, (
+                        InvalidConditionError,
+                        f"No message found for condition with ID of {nodes[neighbor_index]['id']}"
+                    ))
+                    break
+                rule = plan.rules[neighbor_index]
+                if isinstance(rule, Exception):
+                    finish(branch, steps, (InvalidConditionError, str(rule)))
+                    break
+
+                # Group statuses Message can still have in this branch by result of Condition
+                results = {}
+                for message_status in branch.statuses.get(previous_message_index, STATUSES):
+                    try:
+                        result = bool(rule.matches({**nodes[previous_message_index], "status": message_status}))
+                    except:
+                        result = None
+                    results.setdefault(result, []).append(message_status)
+
+                if len(results) == 1:
+                    result = next(iter(results))
+                    if result is None:
+                        finish(branch, steps, get_invalid_condition_error(nodes[current_index]["id"]))
+                        break
+                    current_index = plan.yes_targets[neighbor_index] if result else plan.no_targets[neighbor_index]
+                    continue
+
+                # Branch is replaced by one fork per result of Condition
+                decisions = {}
+                container, keys = branch.tree_slot
+                for key in keys:
+                    container[key] = (previous_message_index, decisions)
+                for result, message_statuses in reversed(results.items()):
+                    fork = Branch(
+                        plan.yes_targets[neighbor_index] if result else plan.no_targets[neighbor_index],
+                        previous_message_index,
+                        list(path),
+                        set(branch.visited_states),
+                        {**branch.statuses, previous_message_index: tuple(message_statuses)},
+                        (decisions, tuple(message_statuses))
+                    )
+                    if result is None:
+                        finish(fork, steps, get_invalid_condition_error(nodes[current_index]["id"]))
+                    else:
+                        branches.append(fork)
+                break
+
+            elif neighbor_type == MESSAGE_TYPE:
+                previous_message_index = neighbor_index
+            current_index = neighbor_index
+
+    return DecisionTable(
+        workflow_id=plan.workflow_id,
+        version=plan.version,
+        paths=tuple(paths),
+        tree=root_slot["root"]
+    )
+
+
+def find_table_path(
+    table: DecisionTable,
+    plan: WorkflowPlan,
+    statuses: Optional[Mapping[int, models.Message.MessageStatusEnum]] = None,
+    limits: Optional[RunLimits] = None
+) -> list[dict[any, any]]:
+    """
+    Finds path of run in decision table (which tree must be built), returns and raises the same
+    as `plans.find_plan_path` with the same arguments
+    """
+    nodes = plan.nodes
+    if statuses:
+        nodes = list(nodes)
+        for node_id, message_status in statuses.items():
+            index = plan.node_indexes[node_id]
+            nodes[index] = {**nodes[index], "status": message_status}
+
+    tree = table.tree
+    while not isinstance(tree, int):
+        message_index, decisions = tree
+        tree = decisions[nodes[message_index]["status"]]
+    table_path = table.paths[tree]
+
+    max_steps = limits.max_steps if limits is not None else settings.RUN_MAX_STEPS
+    if table_path.steps > max_steps:
+        raise RunLimitExceededError(f"Run exceeded limit of {max_steps} steps")
+    if table_path.error is not None:
+        error_type, message = table_path.error
+        raise error_type(message)
+    return [nodes[index] for index in table_path.path]
+
+
+def get_decision_table(plan: WorkflowPlan) -> DecisionTable:
+    """
+    Returns decision table of compiled plan, building it if it is not cached
+    """
+    table = decision_table_cache.get(plan.workflow_id, plan.version)
+    if table is None:
+        try:
+            table = compile_decision_table(plan, max_paths=settings.DECISION_TABLE_MAX_PATHS)
+        except TooManyPathsError:
+            # Kept in cache, so the table is not built again for the same version
+            table = DecisionTable(workflow_id=plan.workflow_id, version=plan.version, paths=(), tree=None)
+        decision_table_cache.set(table)
+    return table
+
+
+# Tables are invalidated together with plans
+decision_table_cache = PlanCache(maxsize=settings.PLAN_CACHE_SIZE)
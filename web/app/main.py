@@ -1,36 +1,109 @@
+import os
+
+from datetime import datetime
+from typing import Iterator, Optional
+
+import orjson
+
 from fastapi import (
     FastAPI,
     Depends,
+    Header,
+    Query,
     status
 )
-from sqlalchemy import or_
-from sqlalchemy.orm import Session
+from fastapi.responses import Response, StreamingResponse
+from sqlalchemy.orm import Session, sessionmaker
 
+from . import metrics
 from . import models
+from . import plans
+from . import process_runs
+from . import response_cache
+from . import run_history
+from . import run_jobs
 from . import schemas
 from . import services
 from . import selectors
-from .db import get_db
+from . import utils
+from .config import settings
+from .profiling import setup_profiling
+from .db import async_engine, engine, get_db, get_pool_stats, get_session_factory
 
 app = FastAPI()
+app.add_middleware(metrics.MetricsMiddleware)
+app.add_event_handler("shutdown", metrics.mark_process_dead)
+app.add_event_handler("shutdown", process_runs.shutdown_process_executor)
+app.add_event_handler("startup", run_jobs.start_workers)
+app.add_event_handler("shutdown", run_jobs.stop_workers)
+app.add_event_handler("startup", run_history.start_writer)
+app.add_event_handler("shutdown", run_history.stop_writer)
+if settings.PROFILING_ENABLED:
+    setup_profiling(app)
+
+metrics.instrument_pool(engine, "sync")
+metrics.instrument_pool(async_engine.sync_engine, "async")
+
+
+def get_run_limits(
+    max_steps: Optional[int] = Query(None, ge=1, le=settings.RUN_MAX_STEPS),
+    max_duration_ms: Optional[float] = Query(None, gt=0, le=settings.RUN_MAX_DURATION_MS or None),
+) -> Optional[plans.RunLimits]:
+    """
+    Run limits lower than default ones requested with query parameters, None if not requested
+    """
+    if max_steps is None and max_duration_ms is None:
+        return None
+    return plans.get_run_limits(max_steps=max_steps, max_duration_ms=max_duration_ms)
 
 
 @app.get("/api/workflows", status_code=status.HTTP_200_OK, response_model_exclude_none=True)
-def get_all_workflows(db: Session = Depends(get_db)) -> list[schemas.WorkflowOut]:
+def get_all_workflows(
+    after_id: Optional[int] = None,
+    limit: int = Query(settings.WORKFLOWS_PAGE_SIZE, ge=1, le=settings.WORKFLOWS_MAX_PAGE_SIZE),
+    with_graph: bool = True,
+    db: Session = Depends(get_db)
+) -> list[schemas.WorkflowListOut]:
     """
-    Retrieve Workflows and their nodes and edges data
+    Retrieve page of Workflows (ordered by ID) and their nodes and edges data
+
+    Notes:
+    To get next page pass ID of the last Workflow of current page as `after_id`.
+    With `with_graph=false` only Workflows data is returned, without nodes and edges.
     """
-    workflows = db.query(models.Workflow).limit(20).all()
-    workflows_data = []
-    for workflow in workflows:
-        nodes_ids = [node.id for node in workflow.nodes]
-        workflow.edges = db.query(models.Edge) \
-            .filter(or_(
-                (models.Edge.source_node_id.in_(nodes_ids)),
-                (models.Edge.target_node_id.in_(nodes_ids)),
-            )).all()
-        workflows_data.append(workflow)
-    return workflows_data
+    if not with_graph:
+        return selectors.get_workflows_page(
+            db.query(models.Workflow.id, models.Workflow.name, models.Workflow.created_at),
+            after_id=after_id,
+            limit=limit
+        )
+    workflows = selectors.get_workflows_page(db.query(models.Workflow), after_id=after_id, limit=limit)
+    contents = services.get_workflows_json(workflows, db=db)
+    return Response(content=response_cache.join(contents), media_type="application/json")
+
+
+@app.get(
+    "/api/workflows/export",
+    status_code=status.HTTP_200_OK,
+    response_class=StreamingResponse,
+    responses={status.HTTP_200_OK: {"content": {"application/x-ndjson": {}}}},
+)
+def export_workflows(session_factory: sessionmaker = Depends(get_session_factory)) -> StreamingResponse:
+    """
+    Export all Workflows with their nodes (including Message and Condition data) and edges
+
+    Notes:
+    Response is streamed as newline delimited JSON, one line per Workflow.
+    """
+    def stream_workflows() -> Iterator[bytes]:
+        db = session_factory()
+        try:
+            for workflow_data in selectors.iter_workflows_data(db, batch_size=settings.EXPORT_BATCH_SIZE):
+                yield orjson.dumps(workflow_data) + b"\n"
+        finally:
+            db.close()
+
+    return StreamingResponse(stream_workflows(), media_type="application/x-ndjson")
 
 
 @app.post("/api/workflows", status_code=status.HTTP_201_CREATED)
@@ -45,19 +118,86 @@ def create_workflow(workflow: schemas.WorkflowIn, db: Session = Depends(get_db))
     return workflow_obj
 
 
+@app.post(
+    "/api/workflows/runs",
+    status_code=status.HTTP_200_OK,
+    response_class=StreamingResponse,
+    responses={status.HTTP_200_OK: {"content": {"application/x-ndjson": {}}}},
+)
+def run_workflows_bulk(
+    workflows_run: schemas.WorkflowsRunIn,
+    limits: Optional[plans.RunLimits] = Depends(get_run_limits),
+    db: Session = Depends(get_db)
+) -> StreamingResponse:
+    """
+    Run many Workflows at once.
+
+    Notes:
+    Response is streamed as newline delimited JSON, one line per provided Workflow ID (in the same order)
+    with either full DiGraph path with Nodes data or error.
+    `max_steps` and `max_duration_ms` limits apply to every run separately.
+    """
+    results = services.run_workflows_bulk(
+        workflow_ids=workflows_run.workflow_ids,
+        db=db,
+        parallel=workflows_run.parallel,
+        limits=limits
+    )
+    return StreamingResponse(
+        (schemas.WorkflowRun(**result).model_dump_json(exclude_none=True) + "\n" for result in results),
+        media_type="application/x-ndjson"
+    )
+
+
+@app.post("/api/workflows/runs/jobs", status_code=status.HTTP_202_ACCEPTED, response_model_exclude_none=True)
+def create_run_job(job: schemas.RunJobIn, response: Response, db: Session = Depends(get_db)) -> schemas.RunJobOut:
+    """
+    Queue run of many Workflows at once, returns job which results can be polled
+
+    Notes:
+    Results (one per provided Workflow ID, in the same order) are the same as of bulk run.
+    Every run of job has only steps limit, unless time limit of jobs is configured.
+    """
+    job_obj = run_jobs.create_job(workflow_ids=job.workflow_ids, db=db, parallel=job.parallel)
+    response.headers["Location"] = app.url_path_for("get_run_job", run_job_id=job_obj.id)
+    return job_obj
+
+
+@app.post("/api/workflows/import", status_code=status.HTTP_201_CREATED, response_model_exclude_none=True)
+def import_workflow(workflow: schemas.WorkflowInImport, db: Session = Depends(get_db)) -> schemas.WorkflowImportOut:
+    """
+    Create Workflow together with all its nodes and edges
+
+    Notes:
+    Nodes are given temporary IDs used to link them by edges, created nodes IDs are returned in `nodes_ids`.
+    Nodes and edges are validated with the same rules as in nodes and edges creation endpoints,
+    nothing is created if any of them is invalid.
+    """
+    workflow_obj, nodes_ids = services.import_workflow(workflow=workflow, db=db)
+    selectors.attach_workflows_graphs([workflow_obj], db=db)
+    workflow_obj.nodes_ids = nodes_ids
+    return workflow_obj
+
+
 @app.get("/api/workflows/{workflow_id}", status_code=status.HTTP_200_OK, response_model_exclude_none=True)
-def get_workflow(workflow_id: int, db: Session = Depends(get_db)) -> schemas.WorkflowOut:
+def get_workflow(
+    workflow_id: int,
+    if_none_match: Optional[str] = Header(None),
+    db: Session = Depends(get_db)
+) -> schemas.WorkflowOut:
     """
     Retrieve Workflow and its nodes and edges data
+
+    Notes:
+    Response has ETag of Workflow version, with matching `If-None-Match` header 304 is returned
+    without loading nodes and edges.
     """
     workflow_obj = selectors.get_object_or_404(models.Workflow, object_id=workflow_id, db=db)
-    nodes_ids = [node.id for node in workflow_obj.nodes]
-    workflow_obj.edges = db.query(models.Edge) \
-        .filter(or_(
-            (models.Edge.source_node_id.in_(nodes_ids)),
-            (models.Edge.target_node_id.in_(nodes_ids)),
-        )).all()
-    return workflow_obj
+    etag = utils.get_workflow_etag(workflow_obj)
+    if utils.etag_matches(if_none_match, etag):
+        return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers={"ETag": etag})
+    content = services.get_workflows_json([workflow_obj], db=db)[0]
+    return Response(content=content, media_type="application/json", headers={"ETag": etag})
 
 
 @app.delete("/api/workflows/{workflow_id}", status_code=status.HTTP_204_NO_CONTENT)
@@ -65,23 +205,146 @@ def delete_workflow(workflow_id: int, db: Session = Depends(get_db)) -> None:
     """
     Delete Workflow
     """
-    db.query(models.Workflow).filter(models.Workflow.id == workflow_id).delete()
-    db.commit()
+    services.delete_workflow(workflow_id=workflow_id, db=db)
 
 
 @app.get("/api/workflows/{workflow_id}/run", status_code=status.HTTP_200_OK, response_model_exclude_none=True)
-def run_workflow(workflow_id: int, db: Session = Depends(get_db)) -> schemas.Graph:
+def run_workflow(
+    workflow_id: int,
+    if_none_match: Optional[str] = Header(None),
+    limits: Optional[plans.RunLimits] = Depends(get_run_limits),
+    db: Session = Depends(get_db)
+) -> schemas.Graph:
     """
     Run specific Workflow and return full DiGraph path with Nodes data
+
+    Notes:
+    Run fails if path returns to the same Node with the same preceding Message (it would never end),
+    or if it exceeds `max_steps` or `max_duration_ms` (lower limits than default ones can be requested).
+    Response has ETag of Workflow version, with matching `If-None-Match` header 304 is returned
+    without running Workflow (unless limits are requested).
+    """
+    workflow_obj = selectors.get_object_or_404(models.Workflow, object_id=workflow_id, db=db)
+    etag = utils.get_workflow_etag(workflow_obj)
+    if limits is None and utils.etag_matches(if_none_match, etag):
+        return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers={"ETag": etag})
+    content = services.run_workflow_json(workflow_obj=workflow_obj, db=db, limits=limits)
+    return Response(content=content, media_type="application/json", headers={"ETag": etag})
+
+
+@app.post(
+    "/api/workflows/{workflow_id}/run/jobs",
+    status_code=status.HTTP_202_ACCEPTED,
+    response_model_exclude_none=True
+)
+def create_workflow_run_job(workflow_id: int, response: Response, db: Session = Depends(get_db)) -> schemas.RunJobOut:
+    """
+    Queue run of specific Workflow, returns job which result can be polled
+
+    Notes:
+    Used instead of running Workflow within request when run can take longer than request timeout.
+    """
+    selectors.get_object_or_404(models.Workflow, object_id=workflow_id, db=db)
+    job_obj = run_jobs.create_job(workflow_ids=[workflow_id], db=db)
+    response.headers["Location"] = app.url_path_for("get_run_job", run_job_id=job_obj.id)
+    return job_obj
+
+
+@app.get("/api/workflows/{workflow_id}/runs/history", status_code=status.HTTP_200_OK, response_model_exclude_none=True)
+def get_run_history(
+    workflow_id: int,
+    since: Optional[datetime] = None,
+    until: Optional[datetime] = None,
+    before_id: Optional[int] = None,
+    limit: int = Query(settings.RUN_HISTORY_PAGE_SIZE, ge=1, le=settings.RUN_HISTORY_MAX_PAGE_SIZE),
+    db: Session = Depends(get_db)
+) -> list[schemas.RunHistoryOut]:
+    """
+    Retrieve page of Workflow runs history (newest first) with Workflow version, path or error and duration of runs
+
+    Notes:
+    Only runs with saved Message statuses are recorded, runs are saved in background shortly after they end.
+    `since` and `until` limit time of runs, to get next page pass ID of the last run of current page as `before_id`.
+    History is kept after Workflow is deleted.
+    """
+    return selectors.get_run_history_page(
+        workflow_id,
+        db=db,
+        since=since,
+        until=until,
+        before_id=before_id,
+        limit=limit
+    )
+
+
+@app.get("/api/workflows/{workflow_id}/paths", status_code=status.HTTP_200_OK, response_model_exclude_none=True)
+def get_workflow_paths(workflow_id: int, db: Session = Depends(get_db)) -> schemas.WorkflowPathsOut:
+    """
+    Retrieve all possible paths of Workflow runs, each with statuses of Messages leading to it
+
+    Notes:
+    Paths are listed in decision table built once per Workflow version, which is also used by "what-if" runs.
+    Path where run fails has error and Nodes up to the failure.
     """
     workflow_obj = selectors.get_object_or_404(models.Workflow, object_id=workflow_id, db=db)
-    workflow_nodes_path = services.run_workflow(workflow_obj=workflow_obj, db=db)
     return {
         "workflow_id": workflow_id,
-        "nodes": workflow_nodes_path
+        "version": workflow_obj.version,
+        "paths": services.get_workflow_paths(workflow_obj, db=db)
     }
 
 
+@app.get("/api/workflows/{workflow_id}/validation", status_code=status.HTTP_200_OK)
+def get_workflow_validation(workflow_id: int, db: Session = Depends(get_db)) -> schemas.WorkflowValidationOut:
+    """
+    Retrieve validation summary of Workflow graph
+
+    Notes:
+    Summary is updated by every change of Workflow graph, so graph is not loaded.
+    Workflow with errors (no Start or End Node, End Node not reachable from Start Node) cannot be run,
+    warnings (Condition without "yes" or "no" edge, cycle without Condition) only make some runs fail.
+    """
+    workflow_obj = selectors.get_object_or_404(models.Workflow, object_id=workflow_id, db=db)
+    summary = services.get_workflow_validation(workflow_obj, db=db)
+    return {
+        "workflow_id": workflow_id,
+        "version": workflow_obj.version,
+        "is_valid": not summary["errors"],
+        **summary
+    }
+
+
+@app.post("/api/workflows/{workflow_id}/runs", status_code=status.HTTP_200_OK, response_model_exclude_none=True)
+def run_workflow_batch(
+    workflow_id: int,
+    runs: schemas.WorkflowRunsIn,
+    limits: Optional[plans.RunLimits] = Depends(get_run_limits),
+    db: Session = Depends(get_db)
+) -> schemas.GraphRuns:
+    """
+    Run specific Workflow once per provided set of Message statuses ("what-if" runs).
+
+    Notes:
+    Statuses override saved ones only within the run, nothing is saved.
+    Each run returns either full DiGraph path with Nodes data or error.
+    `max_steps` and `max_duration_ms` limits apply to every run separately.
+    """
+    workflow_obj = selectors.get_object_or_404(models.Workflow, object_id=workflow_id, db=db)
+    runs_results = services.run_workflow_batch(workflow_obj=workflow_obj, runs=runs.runs, db=db, limits=limits)
+    return {
+        "workflow_id": workflow_id,
+        "runs": runs_results
+    }
+
+
+@app.get("/api/runs/{run_job_id}", status_code=status.HTTP_200_OK, response_model_exclude_none=True)
+def get_run_job(run_job_id: int, db: Session = Depends(get_db)) -> schemas.RunJobOut:
+    """
+    Retrieve status of run job and its results once it is done
+    """
+    return selectors.get_object_or_404(models.RunJob, object_id=run_job_id, db=db)
+
+
 @app.post("/api/nodes", status_code=status.HTTP_201_CREATED, response_model_exclude_none=True)
 def create_node(node: schemas.NodeInCreate, db: Session = Depends(get_db)) -> schemas.NodeOut:
     """
@@ -110,8 +373,7 @@ def delete_node(node_id: int, db: Session = Depends(get_db)) -> None:
     """
     Delete given Node
     """
-    db.query(models.Node).filter(models.Node.id == node_id).delete()
-    db.commit()
+    services.delete_node(node_id=node_id, db=db)
 
 
 @app.post("/api/edges", status_code=status.HTTP_201_CREATED)
@@ -123,10 +385,43 @@ def create_edge(edge: schemas.EdgeIn, db: Session = Depends(get_db)) -> schemas.
     return edge_obj
 
 
+@app.post("/api/edges/batch", status_code=status.HTTP_201_CREATED)
+def create_edges(edges: schemas.EdgesIn, db: Session = Depends(get_db)) -> list[schemas.EdgeOut]:
+    """
+    Create many Edges at once
+
+    Notes:
+    Edges are validated with the same rules as single Edge, including conflicts between provided Edges.
+    Nothing is created if any of Edges is invalid.
+    """
+    edges_objs = services.create_edges(edges=edges.edges, db=db)
+    return edges_objs
+
+
 @app.delete("/api/edges/{edge_id}", status_code=status.HTTP_204_NO_CONTENT)
 def delete_edge(edge_id: int, db: Session = Depends(get_db)) -> None:
     """
     Delete Edge
     """
-    db.query(models.Edge).filter(models.Edge.id == edge_id).delete()
-    db.commit()
+    services.delete_edge(edge_id=edge_id, db=db)
+
+
+@app.get("/internal/pool", status_code=status.HTTP_200_OK, include_in_schema=False, response_model_by_alias=True)
+def get_pools_stats() -> schemas.PoolsStatsOut:
+    """
+    Retrieve stats of DB connection pools of worker process handling the request
+    """
+    return {
+        "pid": os.getpid(),
+        "sync": get_pool_stats(engine),
+        "async": get_pool_stats(async_engine.sync_engine),
+    }
+
+
+@app.get("/metrics", status_code=status.HTTP_200_OK, include_in_schema=False)
+def get_metrics() -> Response:
+    """
+    Retrieve metrics in Prometheus text format
+    """
+    content, content_type = metrics.generate_metrics()
+    return Response(content=content, media_type=content_type)
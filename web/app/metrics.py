@@ -0,0 +1,167 @@
+"""
+Prometheus metrics of routes, Workflow runs, plan cache and DB pools, exposed by `/metrics` endpoint.
+
+With multiple worker processes `PROMETHEUS_MULTIPROC_DIR` environment variable must point to empty directory
+shared by workers (before they start), values written by every worker are aggregated on scrape.
+"""
+import os
+import time
+
+from prometheus_client import (
+    CONTENT_TYPE_LATEST,
+    REGISTRY,
+    CollectorRegistry,
+    Counter,
+    Gauge,
+    Histogram,
+    generate_latest,
+    multiprocess,
+)
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from . import plans
+
+RUN_OUTCOMES = ("success", "no_start", "no_end", "invalid_condition", "dead_end", "cycle", "limit_exceeded", "error")
+
+REQUEST_DURATION = Histogram(
+    "http_request_duration_seconds",
+    "Duration of HTTP requests",
+    ["method", "route", "status"],
+    buckets=(0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10),
+)
+WORKFLOW_RUNS = Counter("workflow_runs_total", "Workflow runs by outcome", ["outcome"])
+WORKFLOW_RUN_PATH_LENGTH = Histogram(
+    "workflow_run_path_length",
+    "Number of Nodes in path of successful Workflow run",
+    buckets=(2, 5, 10, 20, 50, 100, 200, 500, 1000, 2000, 5000, 10000),
+)
+WORKFLOW_GRAPH_NODES = Histogram(
+    "workflow_graph_nodes",
+    "Number of Nodes of compiled Workflow plans",
+    buckets=(2, 5, 10, 20, 50, 100, 200, 500, 1000, 2000, 5000, 10000),
+)
+WORKFLOW_GRAPH_EDGES = Histogram(
+    "workflow_graph_edges",
+    "Number of Edges of compiled Workflow plans",
+    buckets=(1, 5, 10, 20, 50, 100, 200, 500, 1000, 2000, 5000, 10000, 20000),
+)
+PLAN_CACHE_REQUESTS = Counter("workflow_plan_cache_requests_total", "Plan cache lookups", ["result"])
+RUN_HISTORY_LOST = Counter(
+    "workflow_run_history_lost_total",
+    "Run history rows not saved, because too many rows were waiting or insert failed",
+)
+DB_POOL_CONNECTIONS = Gauge(
+    "db_pool_connections",
+    "Connections of DB pools by state, summed over live worker processes",
+    ["engine", "state"],
+    multiprocess_mode="livesum",
+)
+
+# Children are bound once, so recording on hot path does not look labels up
+runs_by_outcome = {outcome: WORKFLOW_RUNS.labels(outcome) for outcome in RUN_OUTCOMES}
+plan_cache_hits = PLAN_CACHE_REQUESTS.labels("hit")
+plan_cache_misses = PLAN_CACHE_REQUESTS.labels("miss")
+
+
+RUN_OUTCOMES_BY_ERROR = (
+    (plans.DeadEndError, "dead_end"),
+    (plans.InvalidConditionError, "invalid_condition"),
+    (plans.CycleError, "cycle"),
+    (plans.RunLimitExceededError, "limit_exceeded"),
+)
+
+
+def get_run_outcome(err: Exception) -> str:
+    """
+    Returns outcome of run which failed with given error
+    """
+    for error_type, outcome in RUN_OUTCOMES_BY_ERROR:
+        if isinstance(err, error_type):
+            return outcome
+    return "error"
+
+
+def record_run(outcome: str, path_length: int = 0) -> None:
+    runs_by_outcome[outcome].inc()
+    if outcome == "success":
+        WORKFLOW_RUN_PATH_LENGTH.observe(path_length)
+
+
+def record_plan_compiled(nodes_count: int, edges_count: int) -> None:
+    WORKFLOW_GRAPH_NODES.observe(nodes_count)
+    WORKFLOW_GRAPH_EDGES.observe(edges_count)
+
+
+def instrument_pool(engine: Engine, name: str) -> None:
+    """
+    Keeps pool gauges of engine up to date, updated on connection checkout and checkin
+    """
+    pool = engine.pool
+    checked_out = DB_POOL_CONNECTIONS.labels(name, "checked_out")
+    checked_in = DB_POOL_CONNECTIONS.labels(name, "checked_in")
+    overflow = DB_POOL_CONNECTIONS.labels(name, "overflow")
+
+    def update(*args) -> None:
+        checked_out.set(pool.checkedout())
+        checked_in.set(pool.checkedin())
+        overflow.set(max(pool.overflow(), 0))
+
+    event.listen(engine, "checkout", update)
+    event.listen(engine, "checkin", update)
+    DB_POOL_CONNECTIONS.labels(name, "size").set(pool.size())
+
+
+class MetricsMiddleware:
+    """
+    Observes duration of every request, labeled by route path template
+    """
+
+    def __init__(self, app: ASGIApp) -> None:
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        # Requests of mounted app are observed once, by middleware of the outer app
+        if scope["type"] != "http" or "metrics_started_at" in scope:
+            await self.app(scope, receive, send)
+            return
+
+        scope["metrics_started_at"] = started_at = time.perf_counter()
+        status_code = 500
+
+        async def send_with_status(message: Message) -> None:
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_status)
+        finally:
+            route = scope.get("route")
+            REQUEST_DURATION.labels(
+                scope["method"],
+                route.path if route is not None else "unmatched",
+                str(status_code)
+            ).observe(time.perf_counter() - started_at)
+
+
+def generate_metrics() -> tuple[bytes, str]:
+    """
+    Returns metrics of all worker processes (or of current process without multiprocess mode) and content type
+    """
+    if "PROMETHEUS_MULTIPROC_DIR" in os.environ:
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+    else:
+        registry = REGISTRY
+    return generate_latest(registry), CONTENT_TYPE_LATEST
+
+
+def mark_process_dead() -> None:
+    """
+    Removes live gauges of stopped worker process from aggregation
+    """
+    if "PROMETHEUS_MULTIPROC_DIR" in os.environ:
+        multiprocess.mark_process_dead(os.getpid())
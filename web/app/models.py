@@ -1,12 +1,18 @@
 import enum
 
 from sqlalchemy import (
+    JSON,
+    BigInteger,
+    Boolean,
     Column,
+    Float,
     ForeignKey,
     Integer,
     String,
+    Text,
     Enum,
     CheckConstraint,
+    Index,
     UniqueConstraint
 )
 from sqlalchemy.orm import relationship, mapped_column, Mapped
@@ -22,12 +28,21 @@ class Workflow(Base):
     id = Column(Integer, primary_key=True, index=True)
     name = Column(String(length=50), nullable=True)
     created_at = Column(TIMESTAMP(timezone=True), nullable=False, server_default=func.now())
+    # Bumped on every change of Workflow graph, used to detect stale cached data
+    version = Column(Integer, nullable=False, default=1, server_default="1")
+    # Errors and warnings of graph structure (see `validation`), updated with every change of graph,
+    # NULL when not validated yet
+    validation = Column(JSON, nullable=True)
 
     nodes: Mapped[list["Node"]] = relationship(back_populates="workflow")
 
 
 class Node(Base):
     __tablename__ = "node"
+    __table_args__ = (
+        # Also used for lookups by Workflow only
+        Index("ix_node_workflow_id_type", "workflow_id", "type"),
+    )
 
     class NodeTypeEnum(enum.Enum):
         start = "start"
@@ -50,14 +65,19 @@ class Edge(Base):
     __tablename__ = "edge"
     __table_args__ = (
         CheckConstraint("source_node_id != target_node_id", name="check_source_node_not_equal_target_node"),
+        # Also used as index for lookups by source Node
         UniqueConstraint("source_node_id", "target_node_id", name="unq_source_node_target_node"),
+        Index("ix_edge_target_node_id", "target_node_id"),
     )
 
     id = Column(Integer, primary_key=True, index=True)
+    # Workflow of both linked Nodes, kept on Edge to find Workflow Edges without Nodes
+    workflow_id: Mapped[int] = mapped_column(ForeignKey("workflow.id", ondelete="CASCADE"), nullable=False, index=True)
     source_node_id: Mapped[int] = mapped_column(ForeignKey("node.id", ondelete="CASCADE"))
     target_node_id: Mapped[int] = mapped_column(ForeignKey("node.id", ondelete="CASCADE"))
     created_at = Column(TIMESTAMP(timezone=True), nullable=False, server_default=func.now())
 
+    workflow: Mapped[Workflow] = relationship()
     source_node: Mapped["Node"] = relationship(back_populates="source_edges", foreign_keys=[source_node_id])
     target_node: Mapped["Node"] = relationship(back_populates="target_edges", foreign_keys=[target_node_id])
     yes_condition: Mapped["Condition"] = relationship(back_populates="yes_edge", foreign_keys="Condition.yes_edge_id")
@@ -81,6 +101,11 @@ class Message(Base):
 
 class Condition(Base):
     __tablename__ = "condition"
+    __table_args__ = (
+        # Used to set NULL on Edge deletion
+        Index("ix_condition_yes_edge_id", "yes_edge_id"),
+        Index("ix_condition_no_edge_id", "no_edge_id"),
+    )
 
     node_id: Mapped[int] = mapped_column(ForeignKey("node.id", ondelete="CASCADE"), primary_key=True, nullable=False)
     expression = Column(String(length=100), nullable=False)
@@ -90,3 +115,51 @@ class Condition(Base):
     node: Mapped["Node"] = relationship(back_populates="condition", foreign_keys=[node_id])
     yes_edge: Mapped["Edge"] = relationship(back_populates="yes_condition", foreign_keys=[yes_edge_id])
     no_edge: Mapped["Edge"] = relationship(back_populates="no_condition", foreign_keys=[no_edge_id])
+
+
+class RunJob(Base):
+    __tablename__ = "run_job"
+    __table_args__ = (
+        # Used by workers to claim the oldest queued job
+        Index("ix_run_job_status_id", "status", "id"),
+    )
+
+    class RunJobStatusEnum(enum.Enum):
+        queued = "queued"
+        running = "running"
+        done = "done"
+        failed = "failed"
+
+    id = Column(Integer, primary_key=True, index=True)
+    status = Column(Enum(RunJobStatusEnum), nullable=False, default=RunJobStatusEnum.queued)
+    workflow_ids = Column(JSON, nullable=False)
+    # Whether Workflows are run by worker pool (see bulk runs)
+    parallel = Column(Boolean, nullable=False, default=False, server_default="false")
+    # Results of Workflow runs (in order of `workflow_ids`) once job is done, error if job failed
+    runs = Column(JSON, nullable=True)
+    error = Column(Text, nullable=True)
+    created_at = Column(TIMESTAMP(timezone=True), nullable=False, server_default=func.now())
+    started_at = Column(TIMESTAMP(timezone=True), nullable=True)
+    finished_at = Column(TIMESTAMP(timezone=True), nullable=True)
+    # Running job is claimed again by workers after its lease expires
+    lease_expires_at = Column(TIMESTAMP(timezone=True), nullable=True)
+
+
+class RunHistory(Base):
+    __tablename__ = "run_history"
+    __table_args__ = (
+        # Used by history of Workflow in time range, newest first
+        Index("ix_run_history_workflow_id_created_at_id", "workflow_id", "created_at", "id"),
+    )
+
+    id = Column(BigInteger, primary_key=True)
+    # Not a foreign key: history outlives Workflows and rows are inserted after run, when Workflow can be deleted
+    workflow_id = Column(Integer, nullable=False)
+    # Workflow version which was run
+    version = Column(Integer, nullable=False)
+    # IDs of Nodes in path of successful run, error of failed run
+    nodes_ids = Column(JSON, nullable=True)
+    error = Column(Text, nullable=True)
+    duration_ms = Column(Float, nullable=False)
+    # Time of run (not of insert)
+    created_at = Column(TIMESTAMP(timezone=True), nullable=False)
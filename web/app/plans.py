@@ -0,0 +1,321 @@
+import threading
+import time
+
+from collections import OrderedDict
+from dataclasses import dataclass
+from types import MappingProxyType
+from typing import Iterable, Mapping, Optional, Union
+
+import rule_engine
+
+from . import models
+from . import utils
+from .config import settings
+from .rules import compile_rule
+
+
+# Index used in plan arrays when there is no Node to go to
+NO_NODE = -1
+
+NODE_TYPES = tuple(models.Node.NodeTypeEnum)
+NODE_TYPE_POSITIONS = {node_type: position for position, node_type in enumerate(NODE_TYPES)}
+MESSAGE_TYPE = NODE_TYPES.index(models.Node.NodeTypeEnum.message)
+CONDITION_TYPE = NODE_TYPES.index(models.Node.NodeTypeEnum.condition)
+
+
+class DeadEndError(ValueError):
+    """
+    Run reached Node without target Node before End Node
+    """
+
+
+class InvalidConditionError(ValueError):
+    """
+    Run reached Condition that cannot be evaluated
+    """
+
+
+class CycleError(ValueError):
+    """
+    Run reached the same Node with the same preceding Message again, so it would never end
+    """
+
+
+class RunLimitExceededError(ValueError):
+    """
+    Run took more steps or time than allowed by its limits
+    """
+
+
+@dataclass(frozen=True, slots=True)
+class RunLimits:
+    # Max number of Nodes in path
+    max_steps: int
+    # Max duration of run in seconds, 0 for no limit
+    max_duration: float
+
+
+def get_run_limits(max_steps: Optional[int] = None, max_duration_ms: Optional[float] = None) -> RunLimits:
+    """
+    Returns run limits, limits which are not provided are taken from settings
+    """
+    return RunLimits(
+        max_steps=max_steps or settings.RUN_MAX_STEPS,
+        max_duration=(max_duration_ms if max_duration_ms is not None else settings.RUN_MAX_DURATION_MS) / 1000
+    )
+
+
+# Number of steps between checks of run duration
+DURATION_CHECK_INTERVAL = 256
+
+
+@dataclass(frozen=True, slots=True)
+class WorkflowPlan:
+    """
+    Compiled, read-only representation of Workflow graph used to run it without building DiGraph.
+
+    Nodes are referenced by their position in the plan, all per Node data is kept in flat tuples.
+    """
+    workflow_id: int
+    version: int
+    start_index: int
+    end_index: int
+    # Node ID -> index of Node in the plan
+    node_indexes: Mapping[int, int]
+    # Node data returned in run path
+    nodes: tuple[dict, ...]
+    # Position of Node type in NODE_TYPES
+    node_types: bytes
+    # Index of first target Node (edges ordered by creation time)
+    successors: tuple[int, ...]
+    # Index of Node linked by "yes" and "no" edge of Condition
+    yes_targets: tuple[int, ...]
+    no_targets: tuple[int, ...]
+    # Parsed Condition expression, or parsing error (of expression saved before validation existed)
+    # to raise once Condition is reached
+    rules: tuple[Union[rule_engine.Rule, Exception, None], ...]
+
+    @property
+    def start_node_id(self) -> Optional[int]:
+        return self.nodes[self.start_index]["id"] if self.start_index != NO_NODE else None
+
+    @property
+    def end_node_id(self) -> Optional[int]:
+        return self.nodes[self.end_index]["id"] if self.end_index != NO_NODE else None
+
+
+def compile_plan(
+    workflow_obj: models.Workflow,
+    nodes: Iterable[models.Node],
+    edges: Iterable[models.Edge]
+) -> WorkflowPlan:
+    """
+    Compiles Workflow nodes (with loaded Message and Condition data) and edges (ordered by creation time)
+    into execution plan
+    """
+    edges = [(edge.id, edge.source_node_id, edge.target_node_id) for edge in edges]
+    edges_targets = {edge_id: target_node_id for edge_id, _, target_node_id in edges}
+    nodes_data = [utils.get_node_data(node, edges_targets) for node in nodes]
+    indexes = {node_data["id"]: index for index, node_data in enumerate(nodes_data)}
+
+    start_index = NO_NODE
+    end_index = NO_NODE
+    nodes_count = len(nodes_data)
+    node_types = bytearray(nodes_count)
+    successors = [NO_NODE] * nodes_count
+    yes_targets = [NO_NODE] * nodes_count
+    no_targets = [NO_NODE] * nodes_count
+    rules = [None] * nodes_count
+    for index, node_data in enumerate(nodes_data):
+        node_type = node_data["type"]
+        node_types[index] = NODE_TYPE_POSITIONS[node_type]
+        if node_type == models.Node.NodeTypeEnum.start and start_index == NO_NODE:
+            start_index = index
+        elif node_type == models.Node.NodeTypeEnum.end and end_index == NO_NODE:
+            end_index = index
+        elif node_type == models.Node.NodeTypeEnum.condition:
+            yes_targets[index] = indexes.get(node_data["yes_node_id"], NO_NODE)
+            no_targets[index] = indexes.get(node_data["no_node_id"], NO_NODE)
+            try:
+                rules[index] = compile_rule(node_data["expression"])
+            except Exception as err:
+                rules[index] = err
+
+    for _, source_node_id, target_node_id in edges:
+        source_index = indexes.get(source_node_id, NO_NODE)
+        if source_index != NO_NODE and successors[source_index] == NO_NODE:
+            successors[source_index] = indexes.get(target_node_id, NO_NODE)
+
+    return WorkflowPlan(
+        workflow_id=workflow_obj.id,
+        version=workflow_obj.version,
+        start_index=start_index,
+        end_index=end_index,
+        node_indexes=MappingProxyType(indexes),
+        nodes=tuple(nodes_data),
+        node_types=bytes(node_types),
+        successors=tuple(successors),
+        yes_targets=tuple(yes_targets),
+        no_targets=tuple(no_targets),
+        rules=tuple(rules),
+    )
+
+
+def validate_statuses(plan: WorkflowPlan, statuses: Mapping[int, models.Message.MessageStatusEnum]) -> None:
+    """
+    Checks if all Nodes which statuses are overridden are Message Nodes of planned Workflow.
+
+    Raises:
+        ValueError: Node is not a Message Node of Workflow.
+    """
+    for node_id in statuses:
+        index = plan.node_indexes.get(node_id, NO_NODE)
+        if index == NO_NODE or plan.node_types[index] != MESSAGE_TYPE:
+            raise ValueError(f"Node with ID of {node_id} is not a Message Node of this Workflow")
+
+
+def find_plan_path(
+    plan: WorkflowPlan,
+    statuses: Optional[Mapping[int, models.Message.MessageStatusEnum]] = None,
+    limits: Optional[RunLimits] = None
+) -> list[dict[any, any]]:
+    """
+    Go through compiled Workflow plan and find the path to end node.
+
+    Follows exactly the same rules as `utils.find_path`, without DiGraph.
+
+    Args:
+        plan: Compiled Workflow plan.
+        statuses: Message Node ID -> status used instead of saved one, see `validate_statuses`.
+        limits: Max number of steps and duration of run, limits from settings are used if not provided.
+
+    Raises:
+        DeadEndError: Path ends before End Node.
+        InvalidConditionError: Condition has no preceding Message or its expression cannot be evaluated.
+        CycleError: Path returns to Node it already went through with the same preceding Message.
+        RunLimitExceededError: Path is longer than `limits.max_steps` or run takes longer than `limits.max_duration`.
+    """
+    nodes = plan.nodes
+    if statuses:
+        nodes = list(nodes)
+        for node_id, message_status in statuses.items():
+            index = plan.node_indexes[node_id]
+            nodes[index] = {**nodes[index], "status": message_status}
+    node_types = plan.node_types
+    successors = plan.successors
+    end_index = plan.end_index
+
+    if limits is None:
+        limits = get_run_limits()
+    max_steps = limits.max_steps
+    deadline = time.perf_counter() + limits.max_duration if limits.max_duration else None
+    # Next Node is determined by current Node and preceding Message only,
+    # so reaching the same pair again means that run would never end
+    states_count = len(nodes) + 1
+    visited_states = set()
+
+    path = []
+    previous_message_index = NO_NODE
+    current_index = plan.start_index
+
+    while True:
+        if current_index == NO_NODE:
+            # Condition without "yes" or "no" edge was reached
+            raise DeadEndError("No end node at the end of the path or edge missing. Node id: None")
+        path.append(current_index)
+        if len(path) > max_steps:
+            raise RunLimitExceededError(f"Run exceeded limit of {max_steps} steps")
+        if current_index == end_index:
+            break  # End of graph
+
+        state = current_index * states_count + previous_message_index + 1
+        if state in visited_states:
+            raise CycleError(f"Path returns to the same state, run would never end. Node id: {nodes[current_index]['id']}")
+        visited_states.add(state)
+        if deadline is not None and len(path) % DURATION_CHECK_INTERVAL == 0 and time.perf_counter() > deadline:
+            raise RunLimitExceededError(f"Run exceeded time limit of {limits.max_duration * 1000:g} ms")
+
+        neighbor_index = successors[current_index]
+        if neighbor_index == NO_NODE:
+            raise DeadEndError(
+                f"No end node at the end of the path or edge missing. Node id: {nodes[current_index]['id']}"
+            )
+
+        neighbor_type = node_types[neighbor_index]
+
+        if neighbor_type == CONDITION_TYPE:
+            path.append(neighbor_index)
+            # Handle Condition logic
+            if previous_message_index == NO_NODE:
+                raise InvalidConditionError(f"No message found for condition with ID of {nodes[neighbor_index]['id']}")
+            rule = plan.rules[neighbor_index]
+            if isinstance(rule, Exception):
+                raise InvalidConditionError(str(rule)) from rule
+            try:
+                rule_match = rule.matches(nodes[previous_message_index])
+            except:
+                raise InvalidConditionError(
+                    f"Condition with ID of {nodes[current_index]['id']} is invalid, please update the expression."
+                )
+            if rule_match:
+                current_index = plan.yes_targets[neighbor_index]
+            else:
+                current_index = plan.no_targets[neighbor_index]
+            continue
+
+        elif neighbor_type == MESSAGE_TYPE:
+            # Save message for future Conditions
+            previous_message_index = neighbor_index
+
+        current_index = neighbor_index
+
+    return [nodes[index] for index in path]
+
+
+class PlanCache:
+    """
+    Thread-safe LRU cache of compiled plans, one entry per Workflow.
+
+    Entry is only returned for matching Workflow version, so plans compiled by other
+    processes before a change are never reused even if local invalidation was missed.
+    """
+
+    def __init__(self, maxsize: int) -> None:
+        self.maxsize = maxsize
+        self._plans: OrderedDict[int, WorkflowPlan] = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, workflow_id: int, version: int) -> Optional[WorkflowPlan]:
+        with self._lock:
+            plan = self._plans.get(workflow_id)
+            if plan is None:
+                return None
+            if plan.version != version:
+                del self._plans[workflow_id]
+                return None
+            self._plans.move_to_end(workflow_id)
+            return plan
+
+    def set(self, plan: WorkflowPlan) -> None:
+        with self._lock:
+            cached_plan = self._plans.get(plan.workflow_id)
+            if cached_plan is not None and cached_plan.version > plan.version:
+                return  # Newer plan was already compiled by concurrent request
+            self._plans[plan.workflow_id] = plan
+            self._plans.move_to_end(plan.workflow_id)
+            while len(self._plans) > self.maxsize:
+                self._plans.popitem(last=False)
+
+    def invalidate(self, workflow_id: int) -> None:
+        with self._lock:
+            self._plans.pop(workflow_id, None)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._plans.clear()
+
+    def __len__(self) -> int:
+        return len(self._plans)
+
+
+plan_cache = PlanCache(maxsize=settings.PLAN_CACHE_SIZE)
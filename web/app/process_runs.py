@@ -0,0 +1,289 @@
+"""
+Runs of compiled Workflow plans by pool of worker processes.
+
+Path walking and rule evaluation are pure Python and hold the GIL, so bulk run on threads of single API worker
+uses only one core. Plans are sent to worker processes packed (`PackedPlan`): plan arrays as raw bytes,
+Condition expressions instead of parsed rules (parsed again and cached by every worker process) and data of
+Message Nodes only, the only Nodes read by Conditions. Workers send back outcome of the run and indexes
+of Nodes in path, which are resolved to Node data by the process that compiled the plan.
+"""
+import functools
+import math
+import multiprocessing
+import threading
+import time
+
+from array import array
+from concurrent.futures import Future, ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import Iterable, NamedTuple, Optional, Union
+
+from . import metrics
+from . import models
+from .config import settings
+from .plans import (
+    CONDITION_TYPE,
+    MESSAGE_TYPE,
+    PlanCache,
+    RunLimits,
+    WorkflowPlan,
+    find_plan_path,
+    get_run_limits,
+)
+from .rules import compile_rule
+
+STATUSES = tuple(models.Message.MessageStatusEnum)
+
+# Type code of arrays of Node indexes (NO_NODE included) and IDs (32-bit integer columns)
+TYPECODE = "i"
+
+class PackedPlan(NamedTuple):
+    """
+    Picklable, compact form of `WorkflowPlan`, arrays are sent as bytes
+    """
+    workflow_id: int
+    version: int
+    start_index: int
+    end_index: int
+    node_ids: bytes
+    node_types: bytes
+    successors: bytes
+    yes_targets: bytes
+    no_targets: bytes
+    # Data of Message Nodes (see `utils.get_node_data`): Node indexes, positions of statuses in STATUSES and texts
+    message_indexes: bytes
+    message_statuses: bytes
+    message_texts: tuple[str, ...]
+    # Condition Node indexes and expressions, the same expressions are sent as one string
+    condition_indexes: bytes
+    expressions: tuple[str, ...]
+
+
+class PlanRunResult(NamedTuple):
+    # One of `metrics.RUN_OUTCOMES`
+    outcome: str
+    # Indexes of Nodes in path (as bytes) of successful run, error message otherwise
+    result: Union[bytes, str]
+    # Duration of run in seconds
+    duration: float
+
+
+class ProcessRun(NamedTuple):
+    """
+    Run of plan sent to worker processes as part of chunk
+    """
+    future: Future
+    position: int
+
+    def result(self) -> PlanRunResult:
+        return self.future.result()[self.position]
+
+
+def pack_plan(plan: WorkflowPlan) -> PackedPlan:
+    """
+    Returns packed plan, packed plans are cached until Workflow changes
+    """
+    packed_plan = packed_plan_cache.get(plan.workflow_id, plan.version)
+    if packed_plan is not None:
+        return packed_plan
+
+    nodes = plan.nodes
+    message_indexes = array(TYPECODE)
+    message_statuses = bytearray()
+    message_texts = []
+    condition_indexes = array(TYPECODE)
+    expressions = []
+    unique_expressions = {}
+    for index, node_type in enumerate(plan.node_types):
+        if node_type == MESSAGE_TYPE:
+            node = nodes[index]
+            message_indexes.append(index)
+            message_statuses.append(STATUSES.index(node["status"]))
+            message_texts.append(node["text"])
+        elif node_type == CONDITION_TYPE:
+            expression = nodes[index]["expression"]
+            condition_indexes.append(index)
+            expressions.append(unique_expressions.setdefault(expression, expression))
+
+    packed_plan = PackedPlan(
+        workflow_id=plan.workflow_id,
+        version=plan.version,
+        start_index=plan.start_index,
+        end_index=plan.end_index,
+        node_ids=array(TYPECODE, (node["id"] for node in nodes)).tobytes(),
+        node_types=plan.node_types,
+        successors=array(TYPECODE, plan.successors).tobytes(),
+        yes_targets=array(TYPECODE, plan.yes_targets).tobytes(),
+        no_targets=array(TYPECODE, plan.no_targets).tobytes(),
+        message_indexes=message_indexes.tobytes(),
+        message_statuses=bytes(message_statuses),
+        message_texts=tuple(message_texts),
+        condition_indexes=condition_indexes.tobytes(),
+        expressions=tuple(expressions),
+    )
+    packed_plan_cache.set(packed_plan)
+    return packed_plan
+
+
+def unpack_array(data: bytes) -> array:
+    values = array(TYPECODE)
+    values.frombytes(data)
+    return values
+
+
+def unpack_plan(packed_plan: PackedPlan) -> WorkflowPlan:
+    """
+    Builds plan from packed plan, only Message Nodes have all their data, other Nodes only have IDs
+    """
+    node_ids = unpack_array(packed_plan.node_ids)
+    nodes = [{"id": node_id} for node_id in node_ids]
+    message_type = models.Node.NodeTypeEnum.message
+    for index, message_status, text in zip(
+        unpack_array(packed_plan.message_indexes),
+        packed_plan.message_statuses,
+        packed_plan.message_texts
+    ):
+        nodes[index] = {"id": node_ids[index], "type": message_type, "status": STATUSES[message_status], "text": text}
+
+    rules = [None] * len(nodes)
+    for index, expression in zip(unpack_array(packed_plan.condition_indexes), packed_plan.expressions):
+        try:
+            rules[index] = compile_rule(expression)
+        except Exception as err:
+            rules[index] = err
+
+    return WorkflowPlan(
+        workflow_id=packed_plan.workflow_id,
+        version=packed_plan.version,
+        start_index=packed_plan.start_index,
+        end_index=packed_plan.end_index,
+        node_indexes={node_id: index for index, node_id in enumerate(node_ids)},
+        nodes=tuple(nodes),
+        node_types=packed_plan.node_types,
+        successors=tuple(unpack_array(packed_plan.successors)),
+        yes_targets=tuple(unpack_array(packed_plan.yes_targets)),
+        no_targets=tuple(unpack_array(packed_plan.no_targets)),
+        rules=tuple(rules),
+    )
+
+
+def run_packed_plans(
+    packed_plans: list[PackedPlan],
+    max_steps: Optional[int] = None,
+    max_duration_ms: Optional[float] = None
+) -> list[PlanRunResult]:
+    """
+    Runs chunk of packed plans with given limits (see `plans.get_run_limits`), called in worker process.
+
+    Unpacked plans are cached by every worker process, so plans of the same Workflow version sent again
+    do not have their Condition expressions parsed again.
+    """
+    limits = get_run_limits(max_steps=max_steps, max_duration_ms=max_duration_ms)
+    results = []
+    for packed_plan in packed_plans:
+        plan = worker_plan_cache.get(packed_plan.workflow_id, packed_plan.version)
+        if plan is None:
+            plan = unpack_plan(packed_plan)
+            worker_plan_cache.set(plan)
+        started_at = time.perf_counter()
+        try:
+            path = find_plan_path(plan, limits=limits)
+        except Exception as err:
+            results.append(PlanRunResult(metrics.get_run_outcome(err), str(err), time.perf_counter() - started_at))
+            continue
+        duration = time.perf_counter() - started_at
+        node_indexes = plan.node_indexes
+        path_indexes = array(TYPECODE, (node_indexes[node["id"]] for node in path))
+        results.append(PlanRunResult("success", path_indexes.tobytes(), duration))
+    return results
+
+
+def unpack_path(plan: WorkflowPlan, result: bytes) -> list[dict]:
+    """
+    Returns data of Nodes in path of successful run of plan
+    """
+    nodes = plan.nodes
+    return [nodes[index] for index in unpack_array(result)]
+
+
+def submit_plans(
+    plans: Iterable[WorkflowPlan],
+    chunk_size: Optional[int] = None,
+    limits: Optional[RunLimits] = None
+) -> dict[int, ProcessRun]:
+    """
+    Sends plans to worker processes in chunks, every distinct Workflow is run once with given limits.
+    Chunks are made smaller when there are fewer plans than needed to give every worker process one chunk.
+
+    Returns:
+        Workflow ID -> run, which result can be awaited.
+    """
+    if chunk_size is None:
+        chunk_size = settings.BULK_RUN_CHUNK_SIZE
+    executor = get_process_executor()
+    plans_by_workflow = {plan.workflow_id: plan for plan in plans}
+    chunk_size = max(min(chunk_size, math.ceil(len(plans_by_workflow) / settings.BULK_RUN_PROCESSES)), 1)
+    runs = {}
+    chunk = []
+    limits_args = (limits.max_steps, limits.max_duration * 1000) if limits is not None else ()
+
+    def submit_chunk() -> None:
+        future = executor.submit(run_packed_plans, [pack_plan(plan) for plan in chunk], *limits_args)
+        future.add_done_callback(functools.partial(discard_broken_executor, executor))
+        for position, plan in enumerate(chunk):
+            runs[plan.workflow_id] = ProcessRun(future, position)
+        chunk.clear()
+
+    for plan in plans_by_workflow.values():
+        chunk.append(plan)
+        if len(chunk) >= chunk_size:
+            submit_chunk()
+    if chunk:
+        submit_chunk()
+    return runs
+
+
+def get_process_executor() -> ProcessPoolExecutor:
+    """
+    Returns process pool shared by bulk runs, created on first use.
+
+    Workers are spawned instead of forked, so they do not inherit threads, locks and DB connections of API process.
+    """
+    global process_executor
+    with process_executor_lock:
+        if process_executor is None:
+            process_executor = ProcessPoolExecutor(
+                max_workers=settings.BULK_RUN_PROCESSES,
+                mp_context=multiprocessing.get_context("spawn")
+            )
+    return process_executor
+
+
+def discard_broken_executor(executor: ProcessPoolExecutor, future: Future) -> None:
+    """
+    Drops process pool which worker process died (e.g. killed by OOM killer), so next bulk run starts new pool
+    instead of failing. Called when run of chunk is done, runs of broken pool fail with `BrokenProcessPool`.
+    """
+    global process_executor
+    if future.cancelled() or not isinstance(future.exception(), BrokenProcessPool):
+        return
+    with process_executor_lock:
+        if process_executor is executor:
+            process_executor = None
+
+
+def shutdown_process_executor() -> None:
+    global process_executor
+    with process_executor_lock:
+        if process_executor is not None:
+            process_executor.shutdown(cancel_futures=True)
+            process_executor = None
+
+
+process_executor: Optional[ProcessPoolExecutor] = None
+process_executor_lock = threading.Lock()
+
+# Plans packed by API process, invalidated together with plans
+packed_plan_cache = PlanCache(maxsize=settings.PLAN_CACHE_SIZE)
+# Plans unpacked by worker process
+worker_plan_cache = PlanCache(maxsize=settings.PLAN_CACHE_SIZE)
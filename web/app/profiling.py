@@ -0,0 +1,207 @@
+"""
+Opt-in per-request profiling, enabled with `PROFILING_ENABLED` setting.
+
+Every request gets `RequestProfile` collecting number and time of SQL statements (Engine events), time of
+endpoint function, time of phases marked with `profile_phase` (e.g. "find_path") and serialization time.
+Collected timings are returned in `Server-Timing` header and logged as JSON line.
+
+With `PROFILING_SAMPLE_RATE` part of requests is run under cProfile and stats of those slower than
+`PROFILING_SLOW_REQUEST_MS` are dumped to `PROFILING_DIR`. Profiler runs in the thread of endpoint function,
+so stats cover the endpoint only.
+"""
+import asyncio
+import cProfile
+import functools
+import json
+import logging
+import os
+import random
+import re
+import time
+
+from contextlib import contextmanager
+from contextvars import ContextVar
+from dataclasses import dataclass, field
+from typing import Awaitable, Callable, Iterator, Optional
+
+from fastapi import FastAPI, Request, Response
+from fastapi.routing import APIRoute
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+from .config import settings
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass(slots=True)
+class RequestProfile:
+    sql_count: int = 0
+    sql_time: float = 0.0
+    # Phase name -> seconds spent in it
+    timings: dict[str, float] = field(default_factory=dict)
+    # Set for sampled requests
+    profiler: Optional[cProfile.Profile] = None
+
+    def add_timing(self, name: str, seconds: float) -> None:
+        self.timings[name] = self.timings.get(name, 0.0) + seconds
+
+
+# Profile of request being handled, None when profiling is disabled
+current_profile: ContextVar[Optional[RequestProfile]] = ContextVar("current_profile", default=None)
+
+
+@contextmanager
+def profile_phase(name: str) -> Iterator[None]:
+    """
+    Adds time spent in the block to the phase of current request profile, does nothing outside of profiled request
+    """
+    profile = current_profile.get()
+    if profile is None:
+        yield
+        return
+    started_at = time.perf_counter()
+    try:
+        yield
+    finally:
+        profile.add_timing(name, time.perf_counter() - started_at)
+
+
+def before_cursor_execute(conn, cursor, statement, parameters, context, executemany) -> None:
+    if context is not None and current_profile.get() is not None:
+        context._profiling_started_at = time.perf_counter()
+
+
+def after_cursor_execute(conn, cursor, statement, parameters, context, executemany) -> None:
+    profile = current_profile.get()
+    started_at = getattr(context, "_profiling_started_at", None)
+    if profile is not None and started_at is not None:
+        profile.sql_count += 1
+        profile.sql_time += time.perf_counter() - started_at
+
+
+@contextmanager
+def profile_endpoint_call(profile: RequestProfile) -> Iterator[None]:
+    if profile.profiler is not None:
+        profile.profiler.enable()
+    try:
+        with profile_phase("endpoint"):
+            yield
+    finally:
+        if profile.profiler is not None:
+            profile.profiler.disable()
+
+
+def profile_endpoint(endpoint: Callable) -> Callable:
+    """
+    Wraps endpoint function to measure (and sample with cProfile) its call, signature is kept for FastAPI
+    """
+    if asyncio.iscoroutinefunction(endpoint):
+        @functools.wraps(endpoint)
+        async def async_wrapper(*args, **kwargs):
+            profile = current_profile.get()
+            if profile is None:
+                return await endpoint(*args, **kwargs)
+            with profile_endpoint_call(profile):
+                return await endpoint(*args, **kwargs)
+        return async_wrapper
+
+    @functools.wraps(endpoint)
+    def wrapper(*args, **kwargs):
+        profile = current_profile.get()
+        if profile is None:
+            return endpoint(*args, **kwargs)
+        with profile_endpoint_call(profile):
+            return endpoint(*args, **kwargs)
+    return wrapper
+
+
+class ProfiledRoute(APIRoute):
+    """
+    Route measuring endpoint function and the rest of request handling.
+
+    Time of handling outside of endpoint function is reported as serialization, it is mostly validation
+    and serialization of response, but also includes parsing of request and resolving dependencies.
+    """
+
+    def __init__(self, path: str, endpoint: Callable, **kwargs) -> None:
+        super().__init__(path, profile_endpoint(endpoint), **kwargs)
+
+    def get_route_handler(self) -> Callable[[Request], Awaitable[Response]]:
+        handler = super().get_route_handler()
+
+        async def profiled_handler(request: Request) -> Response:
+            profile = current_profile.get()
+            if profile is None:
+                return await handler(request)
+            started_at = time.perf_counter()
+            response = await handler(request)
+            handler_time = time.perf_counter() - started_at
+            profile.add_timing("serialize", max(handler_time - profile.timings.get("endpoint", 0.0), 0.0))
+            return response
+
+        return profiled_handler
+
+
+def format_server_timing(profile: RequestProfile, total_time: float) -> str:
+    metrics = [f'sql;dur={profile.sql_time * 1000:.3f};desc="{profile.sql_count} statements"']
+    metrics += [f"{name};dur={seconds * 1000:.3f}" for name, seconds in profile.timings.items()]
+    metrics.append(f"total;dur={total_time * 1000:.3f}")
+    return ", ".join(metrics)
+
+
+def dump_stats(profile: RequestProfile, request: Request, total_time: float) -> str:
+    """
+    Saves cProfile stats of request to file, returns its path
+    """
+    os.makedirs(settings.PROFILING_DIR, exist_ok=True)
+    path_name = re.sub(r"[^A-Za-z0-9]+", "_", request.url.path).strip("_")
+    file_path = os.path.join(
+        settings.PROFILING_DIR,
+        f"{time.strftime('%Y%m%d-%H%M%S')}-{request.method}-{path_name}-{total_time * 1000:.0f}ms.prof"
+    )
+    profile.profiler.dump_stats(file_path)
+    return file_path
+
+
+async def profiling_middleware(request: Request, call_next: Callable[[Request], Awaitable[Response]]) -> Response:
+    if current_profile.get() is not None:
+        return await call_next(request)  # Already profiled by app which mounted this one
+
+    profile = RequestProfile()
+    if random.random() < settings.PROFILING_SAMPLE_RATE:
+        profile.profiler = cProfile.Profile()
+    token = current_profile.set(profile)
+    started_at = time.perf_counter()
+    try:
+        response = await call_next(request)
+    finally:
+        current_profile.reset(token)
+    total_time = time.perf_counter() - started_at
+
+    response.headers["Server-Timing"] = format_server_timing(profile, total_time)
+    log_data = {
+        "method": request.method,
+        "path": request.url.path,
+        "status": response.status_code,
+        "total_ms": round(total_time * 1000, 3),
+        "sql_count": profile.sql_count,
+        "sql_ms": round(profile.sql_time * 1000, 3),
+        **{f"{name}_ms": round(seconds * 1000, 3) for name, seconds in profile.timings.items()},
+    }
+    if profile.profiler is not None and total_time * 1000 >= settings.PROFILING_SLOW_REQUEST_MS:
+        log_data["profile_path"] = dump_stats(profile, request, total_time)
+    logger.info(json.dumps(log_data))
+    return response
+
+
+def setup_profiling(app: FastAPI) -> None:
+    """
+    Enables profiling of requests handled by app, must be called before routes are added
+    """
+    app.router.route_class = ProfiledRoute
+    app.middleware("http")(profiling_middleware)
+    # Listening on Engine class covers sync and async engines (and any engine created later)
+    if not event.contains(Engine, "before_cursor_execute", before_cursor_execute):
+        event.listen(Engine, "before_cursor_execute", before_cursor_execute)
+        event.listen(Engine, "after_cursor_execute", after_cursor_execute)
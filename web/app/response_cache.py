@@ -0,0 +1,129 @@
+"""
+Cache of encoded JSON responses of Workflows and their runs.
+
+Entries are keyed by response kind (e.g. "workflow", "run"), Workflow ID and Workflow version, so entry stored
+for previous version is never returned, even by other processes sharing the cache. Write paths in `services`
+invalidate entries of changed Workflows, so memory is not held by outdated responses.
+
+`backend` is in-process `MemoryResponseCache`, shared store can be plugged in by assigning another
+`ResponseCacheBackend` implementation to it at startup.
+"""
+import threading
+import time
+
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from typing import Any, NamedTuple, Optional
+
+from pydantic import BaseModel
+
+from .config import settings
+
+
+class ResponseCacheBackend(ABC):
+    @abstractmethod
+    def get(self, kind: str, workflow_id: int, version: int) -> Optional[bytes]:
+        """
+        Returns content stored for given Workflow version, None if missing or stored for other version
+        """
+
+    @abstractmethod
+    def set(self, kind: str, workflow_id: int, version: int, content: bytes) -> None:
+        """
+        Stores content of given Workflow version, replacing content of older version
+        """
+
+    @abstractmethod
+    def invalidate(self, workflow_id: int) -> None:
+        """
+        Removes content of all kinds stored for Workflow
+        """
+
+    @abstractmethod
+    def clear(self) -> None:
+        pass
+
+
+class CacheEntry(NamedTuple):
+    version: int
+    content: bytes
+    expires_at: float
+
+
+class MemoryResponseCache(ResponseCacheBackend):
+    """
+    Thread-safe LRU cache bounded by total size of stored content, entries expire after `ttl` seconds (0 for never).
+    """
+
+    def __init__(self, max_bytes: int, ttl: float = 0) -> None:
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self.size = 0
+        self._entries: OrderedDict[tuple[str, int], CacheEntry] = OrderedDict()
+        self._kinds: set[str] = set()
+        self._lock = threading.Lock()
+
+    def get(self, kind: str, workflow_id: int, version: int) -> Optional[bytes]:
+        key = (kind, workflow_id)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            if entry.version != version or (self.ttl and entry.expires_at <= time.monotonic()):
+                self._remove(key)
+                return None
+            self._entries.move_to_end(key)
+            return entry.content
+
+    def set(self, kind: str, workflow_id: int, version: int, content: bytes) -> None:
+        if len(content) > self.max_bytes:
+            return
+        key = (kind, workflow_id)
+        with self._lock:
+            cached_entry = self._entries.get(key)
+            if cached_entry is not None:
+                if cached_entry.version > version:
+                    return  # Newer version was already stored by concurrent request
+                self._remove(key)
+            self._entries[key] = CacheEntry(version, content, time.monotonic() + self.ttl)
+            self._kinds.add(kind)
+            self.size += len(content)
+            while self.size > self.max_bytes:
+                self._remove(next(iter(self._entries)))
+
+    def invalidate(self, workflow_id: int) -> None:
+        with self._lock:
+            for kind in self._kinds:
+                if (kind, workflow_id) in self._entries:
+                    self._remove((kind, workflow_id))
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self.size = 0
+
+    def _remove(self, key: tuple[str, int]) -> None:
+        self.size -= len(self._entries.pop(key).content)
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+
+def encode(schema: type[BaseModel], obj: Any) -> bytes:
+    """
+    Validates object (ORM object or dict) with response schema and encodes it the same way as endpoints do
+    """
+    return schema.model_validate(obj, from_attributes=True).model_dump_json(exclude_none=True).encode()
+
+
+def join(contents: list[bytes]) -> bytes:
+    """
+    Encodes list of already encoded items
+    """
+    return b"[" + b",".join(contents) + b"]"
+
+
+backend: ResponseCacheBackend = MemoryResponseCache(
+    max_bytes=settings.RESPONSE_CACHE_MAX_BYTES,
+    ttl=settings.RESPONSE_CACHE_TTL
+)
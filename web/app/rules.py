@@ -0,0 +1,57 @@
+import enum
+
+from functools import lru_cache
+
+import rule_engine
+
+from .config import settings
+
+
+def resolve_item(thing: dict, name: str) -> any:
+    """
+    Resolves symbol used in expression from Node data, enum values (e.g. Message status) are compared by value
+    """
+    value = rule_engine.resolve_item(thing, name)
+    if isinstance(value, enum.Enum):
+        return value.value
+    return value
+
+
+context = rule_engine.Context(resolver=resolve_item)
+
+
+@lru_cache(maxsize=settings.RULE_CACHE_SIZE)
+def compile_rule(expression: str) -> rule_engine.Rule:
+    """
+    Parses Condition expression, parsed rules are shared by the whole process.
+
+    Raises:
+        rule_engine.RuleSyntaxError: Expression is invalid, errors are not cached.
+    """
+    return rule_engine.Rule(expression, context=context)
+
+
+def get_rules_cache_info() -> dict[str, int]:
+    """
+    Returns hits, misses and size counters of parsed rules cache
+    """
+    cache_info = compile_rule.cache_info()
+    return {
+        "hits": cache_info.hits,
+        "misses": cache_info.misses,
+        "maxsize": cache_info.maxsize,
+        "currsize": cache_info.currsize,
+    }
+
+
+def validate_expression(expression: str) -> None:
+    """
+    Checks if Condition expression can be parsed.
+
+    Raises:
+        ValueError: Expression is invalid.
+    """
+    try:
+        compile_rule(expression)
+    except rule_engine.EngineError as err:
+        raise ValueError(f"Invalid expression: {err.message}") from err
@@ -0,0 +1,173 @@
+"""
+History of Workflow runs: Workflow version, path (or error) and duration of every run with saved Message statuses.
+
+Runs are recorded in memory and inserted by background thread of `writer` in batches (many rows per INSERT),
+so recording adds no DB round trip to runs. Rows waiting for insert are lost if process is killed, and new rows
+are dropped while `RUN_HISTORY_MAX_PENDING` rows are waiting (e.g. DB is not available), see
+`workflow_run_history_lost_total` metric.
+
+Runs served from response cache are recorded too, with path of cached response and duration of cache lookup.
+"What-if" runs (with overridden statuses) and Not Modified responses (client kept response of the same Workflow
+version) are not recorded.
+"""
+import logging
+import threading
+
+from datetime import datetime, timezone
+from typing import Callable, Optional
+
+from sqlalchemy import insert
+from sqlalchemy.orm import Session
+
+from . import metrics
+from . import models
+from .config import settings
+from .db import get_session_factory
+from .plans import WorkflowPlan
+
+logger = logging.getLogger(__name__)
+
+
+class RunHistoryWriter:
+    """
+    Collects run history rows and inserts them by background thread, once `batch_size` rows are waiting
+    or every `flush_interval` seconds
+    """
+
+    def __init__(
+        self,
+        session_factory: Callable[[], Session],
+        batch_size: int,
+        flush_interval: float,
+        max_pending: int
+    ) -> None:
+        self.session_factory = session_factory
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.max_pending = max_pending
+        self._pending: list[dict] = []
+        self._condition = threading.Condition()
+        self._stopped = False
+        self._thread: Optional[threading.Thread] = None
+
+    def record(self, row: dict) -> None:
+        with self._condition:
+            if len(self._pending) >= self.max_pending:
+                metrics.RUN_HISTORY_LOST.inc()
+                return
+            self._pending.append(row)
+            if len(self._pending) >= self.batch_size:
+                self._condition.notify()
+
+    def flush(self) -> int:
+        """
+        Inserts all waiting rows, returns their number
+        """
+        with self._condition:
+            rows, self._pending = self._pending, []
+        if not rows:
+            return 0
+        try:
+            with self.session_factory() as db:
+                db.execute(insert(models.RunHistory), rows)
+                db.commit()
+        except Exception:
+            metrics.RUN_HISTORY_LOST.inc(len(rows))
+            raise
+        return len(rows)
+
+    def start(self) -> None:
+        with self._condition:
+            if self._thread is not None:
+                return
+            self._stopped = False
+            self._thread = threading.Thread(target=self._write, name="run-history-writer", daemon=True)
+        self._thread.start()
+
+    def stop(self, timeout: Optional[float] = None) -> None:
+        """
+        Stops background thread after inserting waiting rows
+        """
+        with self._condition:
+            thread = self._thread
+            if thread is None:
+                return
+            self._stopped = True
+            self._condition.notify()
+        thread.join(timeout)
+        self._thread = None
+
+    def __len__(self) -> int:
+        return len(self._pending)
+
+    def _write(self) -> None:
+        while True:
+            with self._condition:
+                if not self._stopped and len(self._pending) < self.batch_size:
+                    self._condition.wait(self.flush_interval)
+                stopped = self._stopped
+            try:
+                self.flush()
+            except Exception:
+                logger.exception("Run history could not be saved")
+            if stopped:
+                return
+
+
+def record_run(
+    plan: WorkflowPlan,
+    duration: float,
+    nodes_path: Optional[list[dict]] = None,
+    error: Optional[str] = None
+) -> None:
+    """
+    Records run of compiled Workflow plan, with path of successful run or error of failed one
+    """
+    record_workflow_run(
+        plan.workflow_id,
+        plan.version,
+        duration=duration,
+        nodes_ids=[node["id"] for node in nodes_path] if nodes_path is not None else None,
+        error=error
+    )
+
+
+def record_workflow_run(
+    workflow_id: int,
+    version: int,
+    duration: float,
+    nodes_ids: Optional[list[int]] = None,
+    error: Optional[str] = None
+) -> None:
+    """
+    Records run of Workflow version, e.g. served from cache without compiled plan
+    """
+    if not settings.RUN_HISTORY_ENABLED:
+        return
+    writer.record({
+        "workflow_id": workflow_id,
+        "version": version,
+        "nodes_ids": nodes_ids,
+        "error": error,
+        "duration_ms": duration * 1000,
+        "created_at": datetime.now(timezone.utc),
+    })
+
+
+def start_writer() -> None:
+    """
+    Starts background thread of writer, called on app startup
+    """
+    writer.start()
+
+
+def stop_writer() -> None:
+    writer.stop()
+
+
+writer = RunHistoryWriter(
+    session_factory=get_session_factory(),
+    batch_size=settings.RUN_HISTORY_BATCH_SIZE,
+    flush_interval=settings.RUN_HISTORY_FLUSH_INTERVAL,
+    max_pending=settings.RUN_HISTORY_MAX_PENDING
+)
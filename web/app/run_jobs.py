@@ -0,0 +1,350 @@
+"""
+Run jobs: Workflow runs (single or bulk) executed in background, so runs longer than HTTP timeout of gateway
+can be requested and their results polled.
+
+Jobs are stored in `run_job` table and run by pool of worker threads (`RUN_JOBS_WORKERS`) of standalone worker
+processes (`python -m app.run_jobs`), or of API processes with `RUN_JOBS_IN_API`. Workers are separate from threads
+serving requests, so heavy runs are bounded and cannot starve interactive requests.
+Workers take jobs from `queue`:
+    `PostgresRunJobQueue`: queued jobs are claimed from table with `FOR UPDATE SKIP LOCKED`, so jobs are shared
+        by all processes running workers.
+    `MemoryRunJobQueue`: IDs of jobs are queued in memory, jobs are run only by API process which created them
+        and are left queued (or running) if it stops.
+Claimed job is leased to its worker for `RUN_JOBS_LEASE_SECONDS` and the lease is renewed while job is running.
+Running job which lease expired (its worker was killed) is claimed again from Postgres queue, results of worker
+which lost its job are not saved.
+"""
+import contextlib
+import logging
+import queue as queue_module
+import threading
+
+from abc import ABC, abstractmethod
+from datetime import datetime, timedelta
+from typing import Callable, Iterator, NamedTuple, Optional
+
+from sqlalchemy import and_, func, or_, select, update
+from sqlalchemy.orm import Session
+
+from . import models
+from . import plans
+from . import run_history
+from . import schemas
+from . import services
+from .config import settings
+from .db import get_session_factory
+
+logger = logging.getLogger(__name__)
+
+SessionFactory = Callable[[], Session]
+
+
+class ClaimedJob(NamedTuple):
+    id: int
+    workflow_ids: list[int]
+    parallel: bool
+    # Identifies claim, job claimed again after its lease expired gets new start
+    started_at: datetime
+
+
+def get_lease_expiry():
+    return func.now() + timedelta(seconds=settings.RUN_JOBS_LEASE_SECONDS)
+
+
+def claim_job_statement():
+    """
+    Returns UPDATE statement setting job as running and returning its data, job is selected by caller
+    """
+    return update(models.RunJob) \
+        .values(
+            status=models.RunJob.RunJobStatusEnum.running,
+            started_at=func.now(),
+            lease_expires_at=get_lease_expiry()
+        ) \
+        .returning(models.RunJob.id, models.RunJob.workflow_ids, models.RunJob.parallel, models.RunJob.started_at)
+
+
+def filter_claimed_job(statement, job: ClaimedJob):
+    """
+    Filters statement to job while it is still claimed by worker, i.e. it was not claimed again by another worker
+    """
+    return statement.filter(
+        models.RunJob.id == job.id,
+        models.RunJob.status == models.RunJob.RunJobStatusEnum.running,
+        models.RunJob.started_at == job.started_at
+    )
+
+
+class RunJobQueue(ABC):
+    @abstractmethod
+    def put(self, job_id: int) -> None:
+        """
+        Notifies workers about job committed as queued
+        """
+
+    @abstractmethod
+    def claim(self, session_factory: SessionFactory, timeout: float) -> Optional[ClaimedJob]:
+        """
+        Sets the oldest queued (or reclaimable) job as running and returns it, waits up to `timeout` seconds
+        for job to be queued
+        """
+
+    def wake(self) -> None:
+        """
+        Interrupts workers waiting for jobs (e.g. when they are stopped)
+        """
+
+
+class PostgresRunJobQueue(RunJobQueue):
+    def __init__(self) -> None:
+        # Set by jobs queued by this process, so local workers do not wait for next poll
+        self._queued = threading.Event()
+
+    def put(self, job_id: int) -> None:
+        self._queued.set()
+
+    def claim(self, session_factory: SessionFactory, timeout: float) -> Optional[ClaimedJob]:
+        job = self._claim(session_factory)
+        if job is None and self._queued.wait(timeout):
+            self._queued.clear()
+            job = self._claim(session_factory)
+        return job
+
+    def wake(self) -> None:
+        self._queued.set()
+
+    @staticmethod
+    def _claim(session_factory: SessionFactory) -> Optional[ClaimedJob]:
+        job_id = select(models.RunJob.id) \
+            .filter(
+                or_(
+                    models.RunJob.status == models.RunJob.RunJobStatusEnum.queued,
+                    and_(
+                        models.RunJob.status == models.RunJob.RunJobStatusEnum.running,
+                        models.RunJob.lease_expires_at < func.now()
+                    )
+                )
+            ) \
+            .order_by(models.RunJob.id) \
+            .limit(1) \
+            .with_for_update(skip_locked=True) \
+            .scalar_subquery()
+        with session_factory() as db:
+            row = db.execute(claim_job_statement().filter(models.RunJob.id == job_id)).first()
+            db.commit()
+        return ClaimedJob(*row) if row is not None else None
+
+
+class MemoryRunJobQueue(RunJobQueue):
+    def __init__(self) -> None:
+        self._job_ids: queue_module.SimpleQueue[Optional[int]] = queue_module.SimpleQueue()
+
+    def put(self, job_id: int) -> None:
+        self._job_ids.put(job_id)
+
+    def claim(self, session_factory: SessionFactory, timeout: float) -> Optional[ClaimedJob]:
+        try:
+            job_id = self._job_ids.get(timeout=timeout)
+        except queue_module.Empty:
+            return None
+        if job_id is None:
+            return None
+        with session_factory() as db:
+            row = db.execute(
+                claim_job_statement().filter(
+                    models.RunJob.id == job_id,
+                    models.RunJob.status == models.RunJob.RunJobStatusEnum.queued
+                )
+            ).first()
+            db.commit()
+        return ClaimedJob(*row) if row is not None else None
+
+    def wake(self) -> None:
+        self._job_ids.put(None)
+
+
+def create_job(workflow_ids: list[int], db: Session, parallel: bool = False) -> models.RunJob:
+    """
+    Saves queued job and notifies workers about it
+    """
+    job = models.RunJob(workflow_ids=workflow_ids, parallel=parallel, status=models.RunJob.RunJobStatusEnum.queued)
+    db.add(job)
+    db.commit()
+    db.refresh(job)
+    queue.put(job.id)
+    return job
+
+
+def get_job_limits() -> plans.RunLimits:
+    return plans.get_run_limits(max_duration_ms=settings.RUN_JOBS_MAX_DURATION_MS)
+
+
+def renew_lease(job: ClaimedJob, session_factory: SessionFactory) -> bool:
+    """
+    Extends lease of running job, returns whether job is still claimed by worker
+    """
+    with session_factory() as db:
+        result = db.execute(
+            filter_claimed_job(update(models.RunJob), job).values(lease_expires_at=get_lease_expiry())
+        )
+        db.commit()
+    return result.rowcount > 0
+
+
+@contextlib.contextmanager
+def keep_lease(job: ClaimedJob, session_factory: SessionFactory) -> Iterator[None]:
+    """
+    Renews lease of job in background thread (three times per lease) while job is running
+    """
+    finished = threading.Event()
+
+    def renew() -> None:
+        while not finished.wait(settings.RUN_JOBS_LEASE_SECONDS / 3):
+            try:
+                if not renew_lease(job, session_factory):
+                    logger.warning("Run job %s was claimed by another worker", job.id)
+                    return
+            except Exception:
+                # Next attempt is made before lease expires
+                logger.exception("Lease of run job %s could not be renewed", job.id)
+
+    thread = threading.Thread(target=renew, name=f"run-job-lease-{job.id}", daemon=True)
+    thread.start()
+    try:
+        yield
+    finally:
+        finished.set()
+        thread.join()
+
+
+def execute_job(job: ClaimedJob, session_factory: SessionFactory) -> None:
+    """
+    Runs Workflows of claimed job and saves results, or error if job could not be run
+    """
+    try:
+        with keep_lease(job, session_factory):
+            # Session is closed before runs, so connection is not held while they are running
+            with session_factory() as db:
+                results = services.run_workflows_bulk(
+                    workflow_ids=job.workflow_ids,
+                    db=db,
+                    parallel=job.parallel,
+                    limits=get_job_limits()
+                )
+            values = {
+                "status": models.RunJob.RunJobStatusEnum.done,
+                "runs": [
+                    schemas.WorkflowRun(**result).model_dump(mode="json", exclude_none=True) for result in results
+                ],
+            }
+    except Exception as err:
+        logger.exception("Run job %s failed", job.id)
+        values = {"status": models.RunJob.RunJobStatusEnum.failed, "error": str(err)}
+
+    with session_factory() as db:
+        result = db.execute(
+            filter_claimed_job(update(models.RunJob), job)
+            .values(finished_at=func.now(), lease_expires_at=None, **values)
+        )
+        db.commit()
+    if result.rowcount == 0:
+        logger.warning("Results of run job %s are not saved, job was claimed by another worker", job.id)
+
+
+def process_next_job(
+    session_factory: SessionFactory,
+    timeout: float = 0,
+    job_queue: Optional[RunJobQueue] = None
+) -> bool:
+    """
+    Claims and runs the oldest queued job, returns whether any job was run
+    """
+    job = (job_queue or queue).claim(session_factory, timeout=timeout)
+    if job is None:
+        return False
+    execute_job(job, session_factory=session_factory)
+    return True
+
+
+class RunJobWorkers:
+    """
+    Pool of threads running jobs from queue
+    """
+
+    def __init__(self, job_queue: RunJobQueue, session_factory: SessionFactory, workers_count: int) -> None:
+        self.job_queue = job_queue
+        self.session_factory = session_factory
+        self.workers_count = workers_count
+        self._stopped = threading.Event()
+        self._threads: list[threading.Thread] = []
+
+    def start(self) -> None:
+        self._stopped.clear()
+        for i in range(self.workers_count):
+            thread = threading.Thread(target=self._work, name=f"run-job-{i}", daemon=True)
+            thread.start()
+            self._threads.append(thread)
+
+    def stop(self, timeout: Optional[float] = None) -> None:
+        """
+        Stops workers after their current jobs
+        """
+        self._stopped.set()
+        for _ in self._threads:
+            self.job_queue.wake()
+        for thread in self._threads:
+            thread.join(timeout)
+        self._threads.clear()
+
+    def _work(self) -> None:
+        while not self._stopped.is_set():
+            try:
+                process_next_job(
+                    self.session_factory,
+                    timeout=settings.RUN_JOBS_POLL_INTERVAL,
+                    job_queue=self.job_queue
+                )
+            except Exception:
+                # Queue cannot be read (e.g. DB is not available), next attempt is made after poll interval
+                logger.exception("Run jobs queue failed")
+                self._stopped.wait(settings.RUN_JOBS_POLL_INTERVAL)
+
+
+def start_workers() -> None:
+    """
+    Starts `RUN_JOBS_WORKERS` worker threads of API process if enabled, called on app startup
+    """
+    global workers
+    if not settings.RUN_JOBS_IN_API and settings.RUN_JOBS_QUEUE != "memory":
+        return
+    if workers is None and settings.RUN_JOBS_WORKERS > 0:
+        workers = RunJobWorkers(queue, session_factory=get_session_factory(), workers_count=settings.RUN_JOBS_WORKERS)
+        workers.start()
+
+
+def stop_workers() -> None:
+    global workers
+    if workers is not None:
+        workers.stop()
+        workers = None
+
+
+queue: RunJobQueue = MemoryRunJobQueue() if settings.RUN_JOBS_QUEUE == "memory" else PostgresRunJobQueue()
+workers: Optional[RunJobWorkers] = None
+
+
+if __name__ == "__main__":
+    # Standalone worker of Postgres queue, e.g. in separate container
+    logging.basicConfig(level=logging.INFO)
+    job_workers = RunJobWorkers(
+        queue,
+        session_factory=get_session_factory(),
+        workers_count=max(settings.RUN_JOBS_WORKERS, 1)
+    )
+    job_workers.start()
+    run_history.start_writer()
+    try:
+        threading.Event().wait()
+    except KeyboardInterrupt:
+        job_workers.stop()
+        run_history.stop_writer()
@@ -1,4 +1,4 @@
-from pydantic import BaseModel
+from pydantic import BaseModel, Field
 from datetime import datetime
 from typing import Optional
 
@@ -19,6 +19,12 @@ class NodeInCreate(BaseNode):
     type: models.Node.NodeTypeEnum
 
 
+class NodeInImport(BaseNode):
+    # Temporary ID used to link Nodes by Edges within imported Workflow
+    id: str
+    type: models.Node.NodeTypeEnum
+
+
 class NodeInUpdate(BaseNode):
     pass
 
@@ -33,6 +39,67 @@ class Graph(BaseModel):
     nodes: list[NodeOut]
 
 
+class WorkflowRunIn(BaseModel):
+    # Message Node ID -> status used during run instead of saved one
+    statuses: dict[int, models.Message.MessageStatusEnum] = {}
+
+
+class WorkflowRunsIn(BaseModel):
+    runs: list[WorkflowRunIn] = Field(min_length=1, max_length=1000)
+
+
+class GraphRun(BaseModel):
+    nodes: Optional[list[NodeOut]] = None
+    error: Optional[str] = None
+
+
+class GraphRuns(BaseModel):
+    workflow_id: int
+    runs: list[GraphRun]
+
+
+class WorkflowsRunIn(BaseModel):
+    workflow_ids: list[int] = Field(min_length=1, max_length=10000)
+    # Whether Workflows should be run by worker pool
+    parallel: bool = False
+
+
+class WorkflowRun(GraphRun):
+    workflow_id: int
+
+
+class RunJobIn(BaseModel):
+    workflow_ids: list[int] = Field(min_length=1, max_length=10000)
+    # Whether Workflows should be run by worker pool
+    parallel: bool = False
+
+
+class RunJobOut(BaseModel):
+    id: int
+    status: models.RunJob.RunJobStatusEnum
+    workflow_ids: list[int]
+    created_at: datetime
+    started_at: Optional[datetime] = None
+    finished_at: Optional[datetime] = None
+    # Results of Workflow runs in order of `workflow_ids`, once job is done
+    runs: Optional[list[WorkflowRun]] = None
+    # Error which made job fail
+    error: Optional[str] = None
+
+
+class RunHistoryOut(BaseModel):
+    id: int
+    workflow_id: int
+    # Workflow version which was run
+    version: int
+    # Nodes of path of successful run
+    nodes_ids: Optional[list[int]] = None
+    # Error of failed run
+    error: Optional[str] = None
+    duration_ms: float
+    created_at: datetime
+
+
 class BaseEdge(BaseModel):
     source_node_id: int
     target_node_id: int
@@ -46,6 +113,17 @@ class EdgeOut(BaseEdge):
     id: int
 
 
+class EdgesIn(BaseModel):
+    edges: list[EdgeIn] = Field(min_length=1, max_length=10000)
+
+
+class EdgeInImport(BaseModel):
+    # Temporary IDs of Nodes within imported Workflow
+    source_node_id: str
+    target_node_id: str
+    is_yes_condition: Optional[bool] = None
+
+
 class BaseWorkflow(BaseModel):
     name: str
 
@@ -61,5 +139,71 @@ class WorkflowOut(BaseWorkflow):
     created_at: datetime
 
 
+class WorkflowInImport(BaseWorkflow):
+    nodes: list[NodeInImport] = []
+    edges: list[EdgeInImport] = []
+
+
+class WorkflowImportOut(WorkflowOut):
+    # Temporary ID of Node -> ID of created Node
+    nodes_ids: dict[str, int]
+
+
+class WorkflowListOut(BaseWorkflow):
+    id: int
+    # Omitted in lightweight listing
+    nodes: Optional[list[NodeOut]] = None
+    edges: Optional[list[EdgeOut]] = None
+    created_at: datetime
+
+
 class WorkflowRunOut(WorkflowOut):
     nodes: list[NodeOut]
+
+
+class WorkflowPathOut(BaseModel):
+    # Message Node ID -> statuses of Message leading to this path, Messages not listed do not affect it
+    statuses: dict[int, list[models.Message.MessageStatusEnum]]
+    # Nodes of path, up to Node where run fails
+    nodes_ids: list[int]
+    error: Optional[str] = None
+
+
+class WorkflowPathsOut(BaseModel):
+    workflow_id: int
+    version: int
+    paths: list[WorkflowPathOut]
+
+
+class ValidationIssue(BaseModel):
+    code: str
+    message: str
+
+
+class WorkflowValidationOut(BaseModel):
+    workflow_id: int
+    version: int
+    # Workflow with errors cannot be run, warnings only make some runs fail
+    is_valid: bool
+    errors: list[ValidationIssue]
+    warnings: list[ValidationIssue]
+
+
+class PoolStatsOut(BaseModel):
+    size: int
+    checked_in: int
+    checked_out: int
+    overflow: int
+    checkouts: int
+    timeouts: int
+    # Seconds spent waiting for connection
+    wait_time_total: float
+    wait_time_max: float
+    wait_time_avg: float
+
+
+class PoolsStatsOut(BaseModel):
+    # Pools are per worker process, so stats of single worker are returned
+    pid: int
+    sync: PoolStatsOut
+    async_: PoolStatsOut = Field(alias="async")
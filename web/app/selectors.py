@@ -1,7 +1,14 @@
+from datetime import datetime
+from typing import Iterator, NamedTuple, Optional
+
 from fastapi import HTTPException, status
-from sqlalchemy.orm import Session
+from sqlalchemy import select, tuple_
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Query, Session, joinedload
+from sqlalchemy.orm.attributes import set_committed_value
 
 from . import models
+from . import utils
 
 
 def get_object_or_404(Model: models.Base, object_id: int, db: Session) -> models.Base:
@@ -20,3 +27,154 @@ def get_object_or_404(Model: models.Base, object_id: int, db: Session) -> models
     if not obj:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail=f"{Model.__name__} not found")
     return obj
+
+
+def get_run_history_page(
+    workflow_id: int,
+    db: Session,
+    since: Optional[datetime] = None,
+    until: Optional[datetime] = None,
+    before_id: Optional[int] = None,
+    limit: int = 50
+) -> list[models.RunHistory]:
+    """
+    Gets page of Workflow run history, newest runs first, using keyset pagination on run time and ID.
+
+    Args:
+        workflow_id: ID of Workflow (may be already deleted).
+        since: Only runs at or after this time are returned.
+        until: Only runs before this time are returned.
+        before_id: ID of the last run of previous page, first page is returned if not provided.
+        limit: Max number of runs in page.
+    """
+    query = db.query(models.RunHistory).filter(models.RunHistory.workflow_id == workflow_id)
+    if since is not None:
+        query = query.filter(models.RunHistory.created_at >= since)
+    if until is not None:
+        query = query.filter(models.RunHistory.created_at < until)
+    if before_id is not None:
+        before_created_at = select(models.RunHistory.created_at) \
+            .filter(models.RunHistory.id == before_id) \
+            .scalar_subquery()
+        query = query.filter(
+            tuple_(models.RunHistory.created_at, models.RunHistory.id) < tuple_(before_created_at, before_id)
+        )
+    return query.order_by(models.RunHistory.created_at.desc(), models.RunHistory.id.desc()).limit(limit).all()
+
+
+def get_workflows_page(query: Query, after_id: Optional[int], limit: int) -> list:
+    """
+    Gets page of Workflows using keyset pagination on Workflow ID.
+
+    Args:
+        query: Query selecting Workflow or its columns.
+        after_id: ID of the last Workflow of previous page, first page is returned if not provided.
+        limit: Max number of Workflows in page.
+
+    Returns:
+        Workflows with ID greater than `after_id`, ordered by ID.
+    """
+    if after_id is not None:
+        query = query.filter(models.Workflow.id > after_id)
+    return query.order_by(models.Workflow.id).limit(limit).all()
+
+
+async def aget_object_or_404(Model: models.Base, object_id: int, db: AsyncSession) -> models.Base:
+    """
+    Async version of `get_object_or_404`.
+
+    Args:
+        Model: Type of object that needs to be retrieved from database.
+        object_id: ID of the object to retrieve.
+        db: Async database session.
+
+    Returns:
+        The retrieved object if found, otherwise raises a 404 exception.
+    """
+    obj = (await db.execute(select(Model).filter(Model.id == object_id).limit(1))).scalar()
+    if not obj:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail=f"{Model.__name__} not found")
+    return obj
+
+
+class WorkflowGraph(NamedTuple):
+    nodes: list[models.Node]
+    edges: list[models.Edge]
+
+
+def get_workflows_graphs(workflow_ids: list[int], db: Session, with_nodes_data: bool = False) -> dict[int, WorkflowGraph]:
+    """
+    Gets Nodes and Edges of given Workflows using fixed number of queries, regardless of graphs size.
+
+    Args:
+        workflow_ids: IDs of Workflows which graphs need to be retrieved.
+        db: Database session.
+        with_nodes_data: Whether Message and Condition data of Nodes should be loaded in the same query.
+
+    Returns:
+        Mapping of Workflow ID to its Nodes and Edges, Edges are ordered by creation time.
+    """
+    graphs = {workflow_id: WorkflowGraph(nodes=[], edges=[]) for workflow_id in workflow_ids}
+    if not graphs:
+        return graphs
+
+    nodes_query = db.query(models.Node) \
+        .filter(models.Node.workflow_id.in_(graphs.keys())) \
+        .order_by(models.Node.id)
+    if with_nodes_data:
+        nodes_query = nodes_query.options(joinedload(models.Node.message), joinedload(models.Node.condition))
+    for node in nodes_query:
+        graphs[node.workflow_id].nodes.append(node)
+
+    edges_query = db.query(models.Edge) \
+        .filter(models.Edge.workflow_id.in_(graphs.keys())) \
+        .order_by(models.Edge.created_at, models.Edge.id)
+    for edge in edges_query:
+        graphs[edge.workflow_id].edges.append(edge)
+    return graphs
+
+
+def attach_workflows_graphs(workflows: list[models.Workflow], db: Session) -> list[models.Workflow]:
+    """
+    Populates `nodes` and `edges` of given Workflows without lazy loading them one by one
+    """
+    graphs = get_workflows_graphs([workflow.id for workflow in workflows], db=db)
+    for workflow in workflows:
+        graph = graphs[workflow.id]
+        set_committed_value(workflow, "nodes", graph.nodes)
+        workflow.edges = graph.edges
+    return workflows
+
+
+def iter_workflows_data(db: Session, batch_size: int) -> Iterator[dict]:
+    """
+    Iterates over all Workflows with their Nodes and Edges data, ordered by Workflow ID.
+
+    Workflows are read using server-side cursor, graphs are loaded per batch of Workflows,
+    so memory usage does not depend on the number of Workflows.
+    """
+    workflows = db.execute(
+        select(models.Workflow)
+        .order_by(models.Workflow.id)
+        .execution_options(yield_per=batch_size)
+    ).scalars()
+    for workflows_batch in workflows.partitions():
+        graphs = get_workflows_graphs(
+            [workflow.id for workflow in workflows_batch],
+            db=db,
+            with_nodes_data=True
+        )
+        for workflow in workflows_batch:
+            graph = graphs[workflow.id]
+            edges_targets = {edge.id: edge.target_node_id for edge in graph.edges}
+            yield {
+                "id": workflow.id,
+                "name": workflow.name,
+                "created_at": workflow.created_at,
+                "version": workflow.version,
+                "nodes": [utils.get_node_data(node, edges_targets) for node in graph.nodes],
+                "edges": [
+                    {"id": edge.id, "source_node_id": edge.source_node_id, "target_node_id": edge.target_node_id}
+                    for edge in graph.edges
+                ],
+            }
@@ -1,65 +1,841 @@
-import networkx as nx
+import functools
+import json
+import logging
+import threading
+import time
+
+from array import array
+from collections import Counter, defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from typing import Hashable, Iterable, Iterator, NamedTuple, Optional
 
 from fastapi import HTTPException, status
-from sqlalchemy import or_
-from sqlalchemy.orm import Session
+from sqlalchemy import insert, select, update
+from sqlalchemy.orm import Session, aliased, joinedload
 
+from . import decision_tables
+from . import metrics
 from . import models
+from . import plans
+from . import process_runs
+from . import response_cache
+from . import rules
+from . import run_history
 from . import schemas
-from . import utils
+from . import selectors
+from . import validation
+from .config import settings
+from .profiling import profile_phase
 from .selectors import get_object_or_404
 
+logger = logging.getLogger(__name__)
+
+
+def bump_workflow_version(workflow_id: int, db: Session) -> Optional[validation.Summary]:
+    """
+    Increments Workflow version within current transaction, so data cached for previous version is not reused.
+
+    Returns validation summary stored before the change, see `bump_workflows_versions`.
+    """
+    return bump_workflows_versions([workflow_id], db=db).get(workflow_id)
+
+
+def bump_workflows_versions(workflow_ids: Iterable[int], db: Session) -> dict[int, Optional[validation.Summary]]:
+    """
+    Increments versions of many Workflows within current transaction using single query.
+
+    Rows of Workflows stay locked until commit, so graphs read after bump cannot be changed by concurrent
+    transactions before validation summaries based on them are saved. Returns validation summaries of
+    Workflows stored before the change.
+    """
+    workflow_ids = sorted(workflow_ids)
+    if len(workflow_ids) > 1:
+        # Rows are locked in the same order by every transaction, so concurrent changes cannot deadlock
+        db.execute(
+            select(models.Workflow.id)
+            .filter(models.Workflow.id.in_(workflow_ids))
+            .order_by(models.Workflow.id)
+            .with_for_update()
+        )
+    rows = db.execute(
+        update(models.Workflow)
+        .filter(models.Workflow.id.in_(workflow_ids))
+        .values(version=models.Workflow.version + 1)
+        .returning(models.Workflow.id, models.Workflow.validation)
+        .execution_options(synchronize_session=False)
+    )
+    return dict(rows.all())
+
+
+def bump_nodes_workflows_versions(nodes_ids: Iterable[int], db: Session) -> dict[int, Optional[validation.Summary]]:
+    """
+    Increments versions of Workflows of given Nodes (see `bump_workflows_versions`), called before Nodes and Edges
+    are read for validation of change, so they cannot be changed by concurrent transactions in the meantime
+    """
+    workflow_ids = db.scalars(
+        select(models.Node.workflow_id).filter(models.Node.id.in_(nodes_ids)).distinct()
+    ).all()
+    return bump_workflows_versions(workflow_ids, db=db)
+
+
+def compute_workflows_validation(workflow_ids: Iterable[int], db: Session) -> dict[int, validation.Summary]:
+    """
+    Validates graphs of given Workflows without saving the results.
+
+    Only IDs and types of Nodes, Edges and Conditions are loaded (3 queries regardless of graphs size).
+    """
+    workflow_ids = list(workflow_ids)
+    if not workflow_ids:
+        return {}
+    db.flush()
+    nodes = defaultdict(list)
+    edges = defaultdict(list)
+    conditions = defaultdict(list)
+    for workflow_id, node_id, node_type in db.query(models.Node.workflow_id, models.Node.id, models.Node.type) \
+            .filter(models.Node.workflow_id.in_(workflow_ids)):
+        nodes[workflow_id].append((node_id, node_type))
+    for workflow_id, *edge in db.query(
+        models.Edge.workflow_id, models.Edge.id, models.Edge.source_node_id, models.Edge.target_node_id
+    ).filter(models.Edge.workflow_id.in_(workflow_ids)):
+        edges[workflow_id].append(edge)
+    for workflow_id, *condition in db.query(
+        models.Node.workflow_id, models.Condition.node_id, models.Condition.yes_edge_id, models.Condition.no_edge_id
+    ).join(models.Condition.node).filter(models.Node.workflow_id.in_(workflow_ids)):
+        conditions[workflow_id].append(condition)
+
+    return {
+        workflow_id: validation.validate_graph(nodes[workflow_id], edges[workflow_id], conditions[workflow_id])
+        for workflow_id in workflow_ids
+    }
+
+
+def save_workflows_validation(summaries: dict[int, Optional[validation.Summary]], db: Session) -> None:
+    """
+    Stores validation summaries of changed Workflows within current transaction, Workflows which summary
+    could not be updated incrementally (None) are validated from their graphs.
+
+    Must be called after rows of Workflows are locked by `bump_workflows_versions`.
+    """
+    summaries = {
+        **summaries,
+        **compute_workflows_validation(
+            [workflow_id for workflow_id, summary in summaries.items() if summary is None],
+            db=db
+        ),
+    }
+    if summaries:
+        db.execute(
+            update(models.Workflow),
+            [{"id": workflow_id, "validation": summary} for workflow_id, summary in summaries.items()]
+        )
+
+
+def get_workflow_validation(workflow_obj: models.Workflow, db: Session) -> validation.Summary:
+    """
+    Returns validation summary of Workflow, Workflow which was not validated yet is validated now
+    """
+    if workflow_obj.validation is not None:
+        return workflow_obj.validation
+    summary = compute_workflows_validation([workflow_obj.id], db=db)[workflow_obj.id]
+    # Summary is only saved if graph was not changed concurrently
+    db.query(models.Workflow) \
+        .filter(models.Workflow.id == workflow_obj.id, models.Workflow.version == workflow_obj.version) \
+        .update({models.Workflow.validation: summary}, synchronize_session=False)
+    db.commit()
+    return summary
+
+
+def invalidate_workflow_caches(workflow_id: int) -> None:
+    """
+    Drops compiled plan (and its decision table and packed form) and cached responses of changed Workflow,
+    must be called after commit
+    """
+    plans.plan_cache.invalidate(workflow_id)
+    decision_tables.decision_table_cache.invalidate(workflow_id)
+    process_runs.packed_plan_cache.invalidate(workflow_id)
+    response_cache.backend.invalidate(workflow_id)
+
+
+def validate_expression(expression: str) -> None:
+    """
+    Rejects Condition expression that cannot be parsed, so invalid rules never reach Workflow run
+    """
+    try:
+        rules.validate_expression(expression)
+    except ValueError as err:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(err))
+
+
+def get_cached_plans(
+    workflows: list[models.Workflow]
+) -> tuple[dict[int, plans.WorkflowPlan], list[models.Workflow]]:
+    """
+    Returns cached plans of given Workflows versions and Workflows which plans are not cached
+    """
+    workflows_plans = {}
+    missing_workflows = []
+    for workflow_obj in workflows:
+        plan = plans.plan_cache.get(workflow_obj.id, workflow_obj.version)
+        if plan is None:
+            metrics.plan_cache_misses.inc()
+            missing_workflows.append(workflow_obj)
+        else:
+            metrics.plan_cache_hits.inc()
+            workflows_plans[workflow_obj.id] = plan
+    return workflows_plans, missing_workflows
+
+
+def compile_loaded_plans(
+    workflows: list[models.Workflow],
+    graphs: dict[int, selectors.WorkflowGraph]
+) -> dict[int, plans.WorkflowPlan]:
+    """
+    Compiles and caches plans of given Workflows from their loaded graphs (with Nodes data), without DB access
+    """
+    workflows_plans = {}
+    for workflow_obj in workflows:
+        graph = graphs[workflow_obj.id]
+        with profile_phase("compile_plan"):
+            plan = plans.compile_plan(workflow_obj, nodes=graph.nodes, edges=graph.edges)
+        metrics.record_plan_compiled(len(graph.nodes), len(graph.edges))
+        plans.plan_cache.set(plan)
+        workflows_plans[workflow_obj.id] = plan
+    return workflows_plans
+
+
+def compile_workflows_plans(workflows: list[models.Workflow], db: Session) -> dict[int, plans.WorkflowPlan]:
+    """
+    Returns compiled execution plans of given Workflows versions, plans missing in cache are compiled from DB data
+    loaded for all of them at once
+    """
+    workflows_plans, missing_workflows = get_cached_plans(workflows)
+    graphs = selectors.get_workflows_graphs(
+        [workflow_obj.id for workflow_obj in missing_workflows],
+        db=db,
+        with_nodes_data=True
+    )
+    workflows_plans.update(compile_loaded_plans(missing_workflows, graphs))
+    return workflows_plans
+
+
+def get_workflow_plan(workflow_obj: models.Workflow, db: Session) -> plans.WorkflowPlan:
+    """
+    Returns compiled execution plan of given Workflow version, compiling it from DB data on cache miss
+    """
+    return compile_workflows_plans([workflow_obj], db=db)[workflow_obj.id]
+
+
+# Validation error code -> outcome of rejected run
+RUN_OUTCOMES_BY_VALIDATION_ERROR = {"no_start": "no_start", "no_end": "no_end", "end_unreachable": "dead_end"}
 
 
-def run_workflow(workflow_obj: models.Workflow, db: Session) -> None:
+def check_workflow_validation(workflow_obj: models.Workflow, record_run: bool = True) -> None:
     """
-    Converts data from DB into DiGraph and try finding path from start to end Node
+    Rejects run of Workflow which stored validation summary has errors, before its graph is loaded.
+    Rejected run is recorded in metrics if `record_run` is set.
     """
-    G = nx.DiGraph()
+    if workflow_obj.validation and workflow_obj.validation["errors"]:
+        error = workflow_obj.validation["errors"][0]
+        if record_run:
+            metrics.record_run(RUN_OUTCOMES_BY_VALIDATION_ERROR[error["code"]])
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=error["message"])
 
-    nodes = db.query(models.Node).filter(models.Node.workflow_id == workflow_obj.id)
-    start_node: models.Node = nodes.filter(models.Node.type == models.Node.NodeTypeEnum.start).first()
-    if start_node is None:
+
+def check_runnable_plan(plan: plans.WorkflowPlan, record_run: bool = True) -> None:
+    """
+    Validates that compiled Workflow has Start and End Nodes, see `check_workflow_validation`
+    """
+    if plan.start_node_id is None:
+        if record_run:
+            metrics.record_run("no_start")
         raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Workflow has no Start Node")
 
-    end_node: models.Node = nodes.filter(models.Node.type == models.Node.NodeTypeEnum.end).first()
-    if end_node is None:
+    if plan.end_node_id is None:
+        if record_run:
+            metrics.record_run("no_end")
         raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Workflow has no End Node")
 
-    # Fetch edges
-    nodes_ids = [node.id for node in nodes]
-    edges = db.query(models.Edge).filter(
-        or_(
-            models.Edge.source_node_id.in_(nodes_ids),
-            models.Edge.target_node_id.in_(nodes_ids)
-        )
-    ).order_by(models.Edge.created_at)
-
-    # Add Nodes to graph with additional data
-    for node in nodes:
-        node_data = {}
-        node_data["id"] = node.id
-        node_type = node.type
-        node_data["type"] = node_type
-        if node_type == models.Node.NodeTypeEnum.message:
-            node_data["status"] = node.message.status
-            node_data["text"] = node.message.text
-        if node_type == models.Node.NodeTypeEnum.condition:
-            node_data["expression"] = node.condition.expression
-            node_data["yes_node_id"] = getattr(node.condition.yes_edge, "target_node_id", None)
-            node_data["no_node_id"] = getattr(node.condition.no_edge, "target_node_id", None)
-        G.add_node(node.id, **node_data)
-
-    # Add Edges to graph
-    for edge in edges:
-        G.add_edge(edge.source_node_id, edge.target_node_id)
 
+def get_runnable_workflow_plan(
+    workflow_obj: models.Workflow,
+    db: Session,
+    record_run: bool = True
+) -> plans.WorkflowPlan:
+    """
+    Returns compiled plan of Workflow, validates that Workflow has Start and End Nodes.
+
+    Workflow which stored validation summary has errors is rejected before its graph is loaded.
+    Rejection is recorded in run metrics, unless plan is not used for a run (`record_run`).
+    """
+    check_workflow_validation(workflow_obj, record_run=record_run)
+    plan = get_workflow_plan(workflow_obj, db=db)
+    check_runnable_plan(plan, record_run=record_run)
+    return plan
+
+
+def find_run_path(
+    plan: plans.WorkflowPlan,
+    statuses: Optional[dict[int, models.Message.MessageStatusEnum]] = None,
+    limits: Optional[plans.RunLimits] = None
+) -> list[dict]:
+    """
+    Finds path of compiled Workflow plan (in its decision table, if it was built) and records outcome of the run
+    in metrics, runs with saved statuses are also recorded in run history
+    """
+    table = decision_tables.decision_table_cache.get(plan.workflow_id, plan.version)
+    started_at = time.perf_counter()
+    try:
+        if table is not None and table.tree is not None:
+            nodes_path = decision_tables.find_table_path(table, plan, statuses=statuses, limits=limits)
+        else:
+            nodes_path = plans.find_plan_path(plan, statuses=statuses, limits=limits)
+    except Exception as err:
+        if not statuses:
+            run_history.record_run(plan, duration=time.perf_counter() - started_at, error=str(err))
+        metrics.record_run(metrics.get_run_outcome(err))
+        raise
+    if not statuses:
+        run_history.record_run(plan, duration=time.perf_counter() - started_at, nodes_path=nodes_path)
+    metrics.record_run("success", path_length=len(nodes_path))
+    return nodes_path
+
+
+def find_workflow_path(plan: plans.WorkflowPlan, limits: Optional[plans.RunLimits] = None) -> list[dict]:
+    """
+    Finds path from start to end Node of runnable plan within run limits, run error is returned as 400
+    """
     try:
-        nodes_path = utils.find_path(G, start_node_id=start_node.id, end_node_id=end_node.id)
+        with profile_phase("find_path"):
+            return find_run_path(plan, limits=limits)
     except Exception as err:
         raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(err))
 
-    return nodes_path
+
+def run_workflow(
+    workflow_obj: models.Workflow,
+    db: Session,
+    limits: Optional[plans.RunLimits] = None
+) -> list[dict]:
+    """
+    Gets compiled plan of Workflow and try finding path from start to end Node within run limits
+    """
+    return find_workflow_path(get_runnable_workflow_plan(workflow_obj, db=db), limits=limits)
+
+
+def get_cached_run_json(workflow_obj: models.Workflow, limits: Optional[plans.RunLimits] = None) -> Optional[bytes]:
+    """
+    Returns cached run response of Workflow version, runs with limits other than default ones are not cached,
+    as their result depends on limits.
+
+    Run served from cache is recorded in run history and metrics, with path of cached run
+    (kept as packed Node IDs, so response does not have to be decoded).
+    """
+    if limits is not None:
+        return None
+    started_at = time.perf_counter()
+    content = response_cache.backend.get("run", workflow_obj.id, workflow_obj.version)
+    if content is None:
+        return None
+    packed_path = response_cache.backend.get("run_path", workflow_obj.id, workflow_obj.version)
+    if packed_path is not None:
+        nodes_ids = array("i", packed_path).tolist()
+    else:
+        # Evicted separately from response
+        nodes_ids = [node["id"] for node in json.loads(content)["nodes"]]
+    run_history.record_workflow_run(
+        workflow_obj.id,
+        workflow_obj.version,
+        duration=time.perf_counter() - started_at,
+        nodes_ids=nodes_ids
+    )
+    metrics.record_run("success", path_length=len(nodes_ids))
+    return content
+
+
+def run_plan_json(
+    workflow_obj: models.Workflow,
+    plan: plans.WorkflowPlan,
+    limits: Optional[plans.RunLimits] = None
+) -> bytes:
+    """
+    Runs runnable plan of Workflow and returns encoded run response, caching it (see `get_cached_run_json`)
+    """
+    nodes_path = find_workflow_path(plan, limits=limits)
+    with profile_phase("encode"):
+        content = response_cache.encode(schemas.Graph, {"workflow_id": workflow_obj.id, "nodes": nodes_path})
+    if limits is None:
+        response_cache.backend.set("run", workflow_obj.id, workflow_obj.version, content)
+        response_cache.backend.set(
+            "run_path",
+            workflow_obj.id,
+            workflow_obj.version,
+            array("i", [node["id"] for node in nodes_path]).tobytes()
+        )
+    return content
+
+
+def run_workflow_json(
+    workflow_obj: models.Workflow,
+    db: Session,
+    limits: Optional[plans.RunLimits] = None
+) -> bytes:
+    """
+    Returns encoded run response of Workflow version, Workflow is only run if response is not cached
+    """
+    content = get_cached_run_json(workflow_obj, limits=limits)
+    if content is None:
+        content = run_plan_json(workflow_obj, get_runnable_workflow_plan(workflow_obj, db=db), limits=limits)
+    return content
+
+
+def get_cached_workflows_json(
+    workflows: list[models.Workflow]
+) -> tuple[dict[int, bytes], list[models.Workflow]]:
+    """
+    Returns cached data of given Workflows versions and Workflows which data is not cached
+    """
+    contents = {}
+    missing_workflows = []
+    for workflow_obj in workflows:
+        content = response_cache.backend.get("workflow", workflow_obj.id, workflow_obj.version)
+        if content is None:
+            missing_workflows.append(workflow_obj)
+        else:
+            contents[workflow_obj.id] = content
+    return contents, missing_workflows
+
+
+def encode_workflows_json(
+    workflows: list[models.Workflow],
+    missing_workflows: list[models.Workflow],
+    contents: dict[int, bytes]
+) -> list[bytes]:
+    """
+    Encodes and caches data of Workflows with attached graphs which data was not cached, without DB access.
+
+    Returns data of all given Workflows, in their order.
+    """
+    for workflow_obj in missing_workflows:
+        with profile_phase("encode"):
+            content = response_cache.encode(schemas.WorkflowOut, workflow_obj)
+        response_cache.backend.set("workflow", workflow_obj.id, workflow_obj.version, content)
+        contents[workflow_obj.id] = content
+    return [contents[workflow_obj.id] for workflow_obj in workflows]
+
+
+def get_workflows_json(workflows: list[models.Workflow], db: Session) -> list[bytes]:
+    """
+    Returns encoded data of given Workflows versions with their Nodes and Edges.
+
+    Graphs are only loaded (at once) and encoded for Workflows which data is not cached.
+    """
+    contents, missing_workflows = get_cached_workflows_json(workflows)
+    selectors.attach_workflows_graphs(missing_workflows, db=db)
+    return encode_workflows_json(workflows, missing_workflows, contents)
+
+
+def run_workflow_batch(
+    workflow_obj: models.Workflow,
+    runs: list[schemas.WorkflowRunIn],
+    db: Session,
+    limits: Optional[plans.RunLimits] = None
+) -> list[dict]:
+    """
+    Finds path from start to end Node for every provided set of Message statuses.
+
+    Statuses are only used for the run and are not saved, every run gets either path or error.
+    Limits apply to every run separately.
+    """
+    return run_plan_batch(get_runnable_workflow_plan(workflow_obj, db=db), runs=runs, limits=limits)
+
+
+def run_plan_batch(
+    plan: plans.WorkflowPlan,
+    runs: list[schemas.WorkflowRunIn],
+    limits: Optional[plans.RunLimits] = None
+) -> list[dict]:
+    """
+    Runs runnable plan once per provided set of Message statuses, see `run_workflow_batch`
+    """
+    for run in runs:
+        try:
+            plans.validate_statuses(plan, statuses=run.statuses)
+        except ValueError as err:
+            raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(err))
+
+    # Building decision table pays off for many runs, single runs only use table built before
+    if len(runs) > 1:
+        with profile_phase("compile_decision_table"):
+            decision_tables.get_decision_table(plan)
+
+    results = []
+    with profile_phase("find_path"):
+        for run in runs:
+            try:
+                results.append({"nodes": find_run_path(plan, statuses=run.statuses, limits=limits)})
+            except Exception as err:
+                results.append({"error": str(err)})
+    return results
+
+
+def get_workflow_paths(workflow_obj: models.Workflow, db: Session) -> list[dict]:
+    """
+    Lists all paths of Workflow version with statuses of Messages leading to them, using its decision table.
+
+    Workflow which cannot be run is rejected the same way as its runs, without recording them in metrics.
+    """
+    plan = get_runnable_workflow_plan(workflow_obj, db=db, record_run=False)
+    table = decision_tables.get_decision_table(plan)
+    if table.tree is None:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Workflow has more than {settings.DECISION_TABLE_MAX_PATHS} paths"
+        )
+    nodes = plan.nodes
+    return [
+        {
+            "statuses": {nodes[index]["id"]: message_statuses for index, message_statuses in table_path.statuses.items()},
+            "nodes_ids": [nodes[index]["id"] for index in table_path.path],
+            "error": table_path.error[1] if table_path.error is not None else None,
+        }
+        for table_path in table.paths
+    ]
+
+
+def run_plan(workflow_id: int, plan: Optional[plans.WorkflowPlan], limits: Optional[plans.RunLimits] = None) -> dict:
+    """
+    Finds path from start to end Node of compiled Workflow plan, returns path or error instead of raising it
+    """
+    if plan is None:
+        return {"workflow_id": workflow_id, "error": "Workflow not found"}
+    if plan.start_node_id is None:
+        metrics.record_run("no_start")
+        return {"workflow_id": workflow_id, "error": "Workflow has no Start Node"}
+    if plan.end_node_id is None:
+        metrics.record_run("no_end")
+        return {"workflow_id": workflow_id, "error": "Workflow has no End Node"}
+    try:
+        return {"workflow_id": workflow_id, "nodes": find_run_path(plan, limits=limits)}
+    except Exception as err:
+        return {"workflow_id": workflow_id, "error": str(err)}
+
+
+def get_bulk_run_executor() -> ThreadPoolExecutor:
+    """
+    Returns worker pool shared by bulk runs, created on first use
+    """
+    global bulk_run_executor
+    with bulk_run_executor_lock:
+        if bulk_run_executor is None:
+            bulk_run_executor = ThreadPoolExecutor(
+                max_workers=settings.BULK_RUN_WORKERS,
+                thread_name_prefix="bulk-run"
+            )
+    return bulk_run_executor
+
+
+bulk_run_executor: Optional[ThreadPoolExecutor] = None
+bulk_run_executor_lock = threading.Lock()
+
+
+def run_workflows_bulk(
+    workflow_ids: list[int],
+    db: Session,
+    parallel: bool = False,
+    limits: Optional[plans.RunLimits] = None
+) -> Iterator[dict]:
+    """
+    Runs many Workflows, their Nodes and Edges are loaded together using fixed number of queries.
+
+    All DB work is done before returning, so results can be consumed after session is closed.
+    Results are yielded in order of provided IDs, each of them contains either path or error.
+    """
+    workflows = db.query(models.Workflow).filter(models.Workflow.id.in_(workflow_ids)).all()
+    workflows_plans = compile_workflows_plans(workflows, db=db)
+    plans_list = [workflows_plans.get(workflow_id) for workflow_id in workflow_ids]
+
+    if parallel and settings.BULK_RUN_PROCESSES > 0:
+        return run_plans_in_processes(workflow_ids, plans_list, limits=limits)
+    run = functools.partial(run_plan, limits=limits)
+    if parallel and settings.BULK_RUN_WORKERS > 1:
+        return get_bulk_run_executor().map(run, workflow_ids, plans_list)
+    return map(run, workflow_ids, plans_list)
+
+
+def run_plans_in_processes(
+    workflow_ids: list[int],
+    plans_list: list[Optional[plans.WorkflowPlan]],
+    limits: Optional[plans.RunLimits] = None
+) -> Iterator[dict]:
+    """
+    Runs compiled plans by pool of worker processes, see `process_runs`. Plans are sent before returning,
+    results are yielded in order of provided IDs as soon as their chunk is done.
+
+    Plans which cannot be run (missing, without Start or End Node) are handled by `run_plan` without sending them.
+    Runs of chunk which failed in worker process (e.g. process died or result could not be sent back) get error,
+    so response is not cut off.
+    """
+    runs = process_runs.submit_plans(
+        [
+            plan for plan in plans_list
+            if plan is not None and plan.start_node_id is not None and plan.end_node_id is not None
+        ],
+        limits=limits
+    )
+
+    def get_results() -> Iterator[dict]:
+        failed_futures = set()
+        for workflow_id, plan in zip(workflow_ids, plans_list):
+            run = runs.get(workflow_id)
+            if run is None:
+                yield run_plan(workflow_id, plan, limits=limits)
+                continue
+            try:
+                outcome, result, duration = run.result()
+            except Exception as err:
+                if run.future not in failed_futures:
+                    failed_futures.add(run.future)
+                    logger.exception("Bulk run chunk failed in worker process")
+                metrics.record_run("error")
+                yield {"workflow_id": workflow_id, "error": f"Run failed in worker process: {err}"}
+                continue
+            if outcome == "success":
+                nodes_path = process_runs.unpack_path(plan, result)
+                run_history.record_run(plan, duration=duration, nodes_path=nodes_path)
+                metrics.record_run(outcome, path_length=len(nodes_path))
+                yield {"workflow_id": workflow_id, "nodes": nodes_path}
+            else:
+                run_history.record_run(plan, duration=duration, error=result)
+                metrics.record_run(outcome)
+                yield {"workflow_id": workflow_id, "error": result}
+
+    return get_results()
+
+
+def validate_node_data(node: schemas.NodeInCreate | schemas.NodeInImport) -> None:
+    """
+    Validates parameters required by given Node type
+    """
+    if node.type == models.Node.NodeTypeEnum.message:
+        if not node.status or not node.text:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail="Status and text required for Message Node"
+            )
+    elif node.type == models.Node.NodeTypeEnum.condition:
+        if not node.expression:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail="Expression required for Condition Node"
+            )
+        validate_expression(node.expression)
+
+
+class NodeInfo(NamedTuple):
+    workflow_id: Optional[int]
+    type: models.Node.NodeTypeEnum
+
+
+class EdgesValidator:
+    """
+    Validates Edges against rules of linked Nodes types without querying DB, so many Edges
+    (including conflicts between them) can be validated at once.
+
+    Args:
+        nodes: Node ID (or any other key identifying the Node) -> Node data, for every Node linked by validated Edges.
+        edges: Source and target Node IDs of existing Edges which source or target Node is linked by validated Edges.
+    """
+
+    def __init__(self, nodes: dict[Hashable, NodeInfo], edges: Iterable[tuple[Hashable, Hashable]]) -> None:
+        self.nodes = nodes
+        self.linked_nodes = set()
+        self.targets_count = Counter()
+        for source_node_id, target_node_id in edges:
+            self.register(source_node_id, target_node_id)
+
+    def register(self, source_node_id: Hashable, target_node_id: Hashable) -> None:
+        self.linked_nodes.add(frozenset((source_node_id, target_node_id)))
+        self.targets_count[source_node_id] += 1
+
+    def add(self, source_node_id: Hashable, target_node_id: Hashable, is_yes_condition: Optional[bool]) -> None:
+        """
+        Validates if Edge can link given Nodes, considering Edges validated before, and registers it
+        """
+        if source_node_id == target_node_id:
+            raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Nodes must be 2 different values")
+
+        # Check if Edge already exists
+        if frozenset((source_node_id, target_node_id)) in self.linked_nodes:
+            raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Edge with these nodes already exists")
+
+        # Validate if Nodes exist
+        target_node = self.nodes.get(target_node_id)
+        source_node = self.nodes.get(source_node_id)
+        if target_node is None or source_node is None:
+            raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Node not found")
+
+        # Validation related to Node types
+        if target_node.workflow_id != source_node.workflow_id:
+            raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Cannot link nodes from different workflows")
+
+        if target_node.type == models.Node.NodeTypeEnum.start:
+            raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Start Node cannot have source node")
+
+        targets_count = self.targets_count[source_node_id]
+        if source_node.type == models.Node.NodeTypeEnum.start and targets_count >= 1:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail="Start Node cannot have more than one target node"
+            )
+
+        if source_node.type == models.Node.NodeTypeEnum.message and targets_count >= 1:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail="Message Node cannot have more than one target node"
+            )
+
+        if source_node.type == models.Node.NodeTypeEnum.condition and targets_count >= 2:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail="Condition Node cannot have more than two target nodes"
+            )
+
+        if target_node.type == models.Node.NodeTypeEnum.condition and \
+            source_node.type not in [models.Node.NodeTypeEnum.message, models.Node.NodeTypeEnum.condition]:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail="Condition Node can only have Message or Condition as source Nodes"
+            )
+
+        if source_node.type == models.Node.NodeTypeEnum.end:
+            raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="End Node cannot have target nodes")
+
+        if source_node.type == models.Node.NodeTypeEnum.condition and is_yes_condition is None:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail="Field 'is_yes_condition' required for this Edge"
+            )
+
+        self.register(source_node_id, target_node_id)
+
+
+def get_edge_change(edge: schemas.EdgeIn, edges_validator: EdgesValidator) -> validation.EdgeChange:
+    """
+    Describes Edge validated by `edges_validator` for incremental validation of Workflow
+    """
+    source_node = edges_validator.nodes[edge.source_node_id]
+    return validation.EdgeChange(
+        source_node_id=edge.source_node_id,
+        source_type=source_node.type,
+        target_type=edges_validator.nodes[edge.target_node_id].type,
+        target_has_targets=edges_validator.targets_count[edge.target_node_id] > 0,
+        branch=("yes" if edge.is_yes_condition else "no")
+        if source_node.type == models.Node.NodeTypeEnum.condition else None
+    )
+
+
+def import_workflow(workflow: schemas.WorkflowInImport, db: Session) -> tuple[models.Workflow, dict[str, int]]:
+    """
+    Creates Workflow with all its Nodes and Edges in single transaction.
+
+    Validates whole graph in memory using the same rules as Nodes and Edges creation,
+    then inserts all rows using bulk inserts.
+
+    Returns:
+        Created Workflow and mapping of Nodes IDs provided by client to IDs of created Nodes.
+    """
+    # Validate Nodes
+    nodes_info = {}
+    for node in workflow.nodes:
+        if node.id in nodes_info:
+            raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=f"Node ID '{node.id}' is not unique")
+        validate_node_data(node)
+        nodes_info[node.id] = NodeInfo(workflow_id=None, type=node.type)
+    for node_type in [models.Node.NodeTypeEnum.start, models.Node.NodeTypeEnum.end]:
+        if sum(node_info.type == node_type for node_info in nodes_info.values()) > 1:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail=f"Only one {node_type.name.title()} Node allowed in single workflow."
+            )
+
+    # Validate Edges
+    edges_validator = EdgesValidator(nodes=nodes_info, edges=[])
+    for edge in workflow.edges:
+        edges_validator.add(edge.source_node_id, edge.target_node_id, edge.is_yes_condition)
+
+    # Create Workflow
+    workflow_obj = models.Workflow(name=workflow.name)
+    db.add(workflow_obj)
+    db.flush()
+
+    # Create Nodes and their Messages and Conditions
+    nodes_ids = {}
+    if workflow.nodes:
+        created_nodes_ids = db.scalars(
+            insert(models.Node).returning(models.Node.id, sort_by_parameter_order=True),
+            [{"workflow_id": workflow_obj.id, "type": node.type} for node in workflow.nodes]
+        ).all()
+        nodes_ids = dict(zip([node.id for node in workflow.nodes], created_nodes_ids))
+    messages = [
+        {"node_id": nodes_ids[node.id], "status": node.status, "text": node.text}
+        for node in workflow.nodes if node.type == models.Node.NodeTypeEnum.message
+    ]
+    if messages:
+        db.execute(insert(models.Message), messages)
+    conditions = [
+        {"node_id": nodes_ids[node.id], "expression": node.expression}
+        for node in workflow.nodes if node.type == models.Node.NodeTypeEnum.condition
+    ]
+    if conditions:
+        db.execute(insert(models.Condition), conditions)
+
+    # Create Edges and link them with Conditions
+    if workflow.edges:
+        created_edges_ids = db.scalars(
+            insert(models.Edge).returning(models.Edge.id, sort_by_parameter_order=True),
+            [
+                {
+                    "workflow_id": workflow_obj.id,
+                    "source_node_id": nodes_ids[edge.source_node_id],
+                    "target_node_id": nodes_ids[edge.target_node_id]
+                }
+                for edge in workflow.edges
+            ]
+        ).all()
+        link_conditions_edges(
+            [
+                (nodes_ids[edge.source_node_id], edge_id, edge.is_yes_condition)
+                for edge, edge_id in zip(workflow.edges, created_edges_ids)
+                if nodes_info[edge.source_node_id].type == models.Node.NodeTypeEnum.condition
+            ],
+            db=db
+        )
+
+    # Workflow is not visible to other transactions yet, so it is not locked
+    save_workflows_validation({workflow_obj.id: None}, db=db)
+    db.commit()
+    db.refresh(workflow_obj)
+    return workflow_obj, nodes_ids
+
+
+def link_conditions_edges(conditions_edges: list[tuple[int, int, bool]], db: Session) -> None:
+    """
+    Sets "yes" or "no" Edges of Conditions using single bulk update.
+
+    Args:
+        conditions_edges: Condition Node ID, Edge ID and whether Edge is "yes" Edge, for every linked Edge.
+        db: Database session.
+    """
+    conditions = {}
+    for node_id, edge_id, is_yes_condition in conditions_edges:
+        condition = conditions.setdefault(node_id, {"node_id": node_id})
+        condition["yes_edge_id" if is_yes_condition else "no_edge_id"] = edge_id
+    # Bulk update by primary key requires the same set of columns in every row, so rows are grouped by it
+    rows_by_columns = defaultdict(list)
+    for condition in conditions.values():
+        rows_by_columns[tuple(sorted(condition))].append(condition)
+    for rows in rows_by_columns.values():
+        db.execute(update(models.Condition), rows)
 
 
 def create_node(node: schemas.NodeInCreate, db: Session) -> models.Node:
@@ -71,6 +847,7 @@ def create_node(node: schemas.NodeInCreate, db: Session) -> models.Node:
 
     # Check if workflow exists
     get_object_or_404(models.Workflow, object_id=node.workflow_id, db=db)
+    validate_node_data(node)
 
     # Create Node
     node_obj = models.Node(workflow_id=node.workflow_id, type=node.type)
@@ -78,32 +855,29 @@ def create_node(node: schemas.NodeInCreate, db: Session) -> models.Node:
 
     # Additional logic depending on provided Node type
     if node.type in [models.Node.NodeTypeEnum.start, models.Node.NodeTypeEnum.end]:
-        if db.query(models.Node).filter(models.Node.type == node.type).first():
+        if db.query(models.Node).filter(
+            models.Node.workflow_id == node.workflow_id,
+            models.Node.type == node.type
+        ).first():
             raise HTTPException(
                     status_code=status.HTTP_400_BAD_REQUEST,
                     detail=f"Only one {node.type.name.title()} Node allowed in single workflow."
                 )
     if node.type == models.Node.NodeTypeEnum.message:
-        if not node.status or not node.text:
-            raise HTTPException(
-                status_code=status.HTTP_400_BAD_REQUEST,
-                detail="Status and text required for Message Node"
-            )
         message_obj = models.Message(node=node_obj, status=node.status, text=node.text)
         db.add(message_obj)
         node_obj.text = message_obj.text
         node_obj.status =  message_obj.status
     elif node.type == models.Node.NodeTypeEnum.condition:
-        if not node.expression:
-            raise HTTPException(
-                status_code=status.HTTP_400_BAD_REQUEST,
-                detail="Expression required for Condition Node"
-            )
         condition_obj = models.Condition(node=node_obj, expression=node.expression)
         db.add(condition_obj)
         node_obj.expression = condition_obj.expression
 
+    db.flush()
+    summary = bump_workflow_version(node.workflow_id, db=db)
+    save_workflows_validation({node.workflow_id: validation.add_node(summary, node_obj.id, node.type)}, db=db)
     db.commit()
+    invalidate_workflow_caches(node.workflow_id)
     db.refresh(node_obj)
     return node_obj
 
@@ -121,6 +895,7 @@ def update_node(node_id: int, node_data: schemas.NodeInUpdate, db: Session) -> m
     # Perform update
     if node_obj.type == models.Node.NodeTypeEnum.condition:
         if node_data.expression:
+            validate_expression(node_data.expression)
             node_obj.condition.expression = node_data.expression
         node_obj.expression = node_obj.condition.expression
     elif node_obj.type == models.Node.NodeTypeEnum.message:
@@ -131,7 +906,9 @@ def update_node(node_id: int, node_data: schemas.NodeInUpdate, db: Session) -> m
         node_obj.status = node_obj.message.status
         node_obj.text = node_obj.message.text
 
+    bump_workflow_version(node_obj.workflow_id, db=db)
     db.commit()
+    invalidate_workflow_caches(node_obj.workflow_id)
     db.refresh(node_obj)
     return node_obj
 
@@ -145,74 +922,162 @@ def create_edge(edge: schemas.EdgeIn, db: Session) -> models.Edge:
     if edge.source_node_id == edge.target_node_id:
         raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Nodes must be 2 different values")
 
-    # Check if Edge already exists
-    if db.query(models.Edge)   \
-        .filter(or_(
-            (models.Edge.source_node_id == edge.source_node_id) &
-            (models.Edge.target_node_id == edge.target_node_id),
-            (models.Edge.source_node_id == edge.target_node_id) &
-            (models.Edge.target_node_id == edge.source_node_id)
-        )).first():
-        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Edge with these nodes already exists")
-
-    # Validate if objects exsit in DB
-    target_node: models.Node = get_object_or_404(models.Node, object_id=edge.target_node_id, db=db)
-    source_node: models.Node = get_object_or_404(models.Node, object_id=edge.source_node_id, db=db)
-
-    # Validation related to Node types
-    if target_node.workflow_id != source_node.workflow_id:
-        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Cannot link nodes from different workflows")
-
-    if target_node.type == models.Node.NodeTypeEnum.start:
-        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Start Node cannot have source node")
-
-    if source_node.type == models.Node.NodeTypeEnum.start:
-        if db.query(models.Edge).filter(models.Edge.source_node_id == edge.source_node_id).first() is not None:
-            raise HTTPException(
-                status_code=status.HTTP_400_BAD_REQUEST,
-                detail="Start Node cannot have more than one target node"
-            )
-
-    if source_node.type == models.Node.NodeTypeEnum.message:
-        if db.query(models.Edge).filter(models.Edge.source_node_id == edge.source_node_id).first() is not None:
-            raise HTTPException(
-                status_code=status.HTTP_400_BAD_REQUEST,
-                detail="Message Node cannot have more than one target node"
-            )
-
-    if source_node.type == models.Node.NodeTypeEnum.condition:
-        if db.query(models.Edge).filter(models.Edge.source_node_id == edge.source_node_id).count() >= 2:
-            raise HTTPException(
-                status_code=status.HTTP_400_BAD_REQUEST,
-                detail="Condition Node cannot have more than two target nodes"
-            )
-
-    if target_node.type == models.Node.NodeTypeEnum.condition and \
-        source_node.type not in [models.Node.NodeTypeEnum.message, models.Node.NodeTypeEnum.condition]:
-        raise HTTPException(
-            status_code=status.HTTP_400_BAD_REQUEST,
-            detail="Condition Node can only have Message or Condition as source Nodes"
+    # Validate Edge against Nodes and their existing Edges, read once Workflow is locked
+    summaries = bump_nodes_workflows_versions([edge.source_node_id, edge.target_node_id], db=db)
+    try:
+        nodes = db.query(models.Node) \
+            .filter(models.Node.id.in_([edge.source_node_id, edge.target_node_id])) \
+            .options(joinedload(models.Node.condition)) \
+            .all()
+        edges_validator = EdgesValidator(
+            nodes={node.id: NodeInfo(workflow_id=node.workflow_id, type=node.type) for node in nodes},
+            edges=db.query(models.Edge.source_node_id, models.Edge.target_node_id)
+                .filter(models.Edge.source_node_id.in_([edge.source_node_id, edge.target_node_id]))
         )
-
-    if source_node.type == models.Node.NodeTypeEnum.end:
-        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="End Node cannot have target nodes")
+        edges_validator.add(edge.source_node_id, edge.target_node_id, edge.is_yes_condition)
+    except HTTPException:
+        # Releases lock of Workflow
+        db.rollback()
+        raise
+    source_node = next(node for node in nodes if node.id == edge.source_node_id)
 
     # Create Edge
-    edge_obj = models.Edge(source_node_id=edge.source_node_id, target_node_id=edge.target_node_id)
+    edge_obj = models.Edge(
+        workflow_id=source_node.workflow_id,
+        source_node_id=edge.source_node_id,
+        target_node_id=edge.target_node_id
+    )
     db.add(edge_obj)
 
     # Additional logic for Condition, link Condition with created Edge
     if source_node.type == models.Node.NodeTypeEnum.condition:
-        if edge.is_yes_condition is False:
-            source_node.condition.no_edge = edge_obj
-        elif edge.is_yes_condition is True:
+        if edge.is_yes_condition:
             source_node.condition.yes_edge = edge_obj
         else:
-            raise HTTPException(
-                status_code=status.HTTP_400_BAD_REQUEST,
-                detail="Field 'is_yes_condition' required for this Edge"
-            )
+            source_node.condition.no_edge = edge_obj
 
+    save_workflows_validation(
+        {
+            source_node.workflow_id: validation.add_edges(
+                summaries.get(source_node.workflow_id), [get_edge_change(edge, edges_validator)]
+            )
+        },
+        db=db
+    )
     db.commit()
+    invalidate_workflow_caches(source_node.workflow_id)
     db.refresh(edge_obj)
     return edge_obj
+
+
+def create_edges(edges: list[schemas.EdgeIn], db: Session) -> list[models.Edge]:
+    """
+    Creates many edges at once.
+
+    Loads all linked Nodes and their existing Edges once, validates every Edge with the same rules
+    as single Edge creation (including conflicts between provided Edges) and inserts all of them together.
+    Nothing is created if any of Edges is invalid.
+    """
+    linked_nodes_ids = {edge.source_node_id for edge in edges} | {edge.target_node_id for edge in edges}
+    # Nodes and Edges are read once Workflows are locked
+    summaries = bump_nodes_workflows_versions(linked_nodes_ids, db=db)
+    try:
+        nodes_info = {
+            node_id: NodeInfo(workflow_id=workflow_id, type=node_type)
+            for node_id, workflow_id, node_type in db.query(models.Node.id, models.Node.workflow_id, models.Node.type)
+                .filter(models.Node.id.in_(linked_nodes_ids))
+        }
+        edges_validator = EdgesValidator(
+            nodes=nodes_info,
+            edges=db.query(models.Edge.source_node_id, models.Edge.target_node_id)
+                .filter(models.Edge.source_node_id.in_(linked_nodes_ids))
+        )
+        for edge in edges:
+            edges_validator.add(edge.source_node_id, edge.target_node_id, edge.is_yes_condition)
+    except HTTPException:
+        # Releases locks of Workflows
+        db.rollback()
+        raise
+
+    # Create Edges and link them with Conditions
+    edges_objs = db.scalars(
+        insert(models.Edge).returning(models.Edge, sort_by_parameter_order=True),
+        [
+            {
+                "workflow_id": nodes_info[edge.source_node_id].workflow_id,
+                "source_node_id": edge.source_node_id,
+                "target_node_id": edge.target_node_id
+            }
+            for edge in edges
+        ]
+    ).all()
+    link_conditions_edges(
+        [
+            (edge.source_node_id, edge_obj.id, edge.is_yes_condition)
+            for edge, edge_obj in zip(edges, edges_objs)
+            if nodes_info[edge.source_node_id].type == models.Node.NodeTypeEnum.condition
+        ],
+        db=db
+    )
+
+    edges_changes = defaultdict(list)
+    for edge in edges:
+        edges_changes[nodes_info[edge.source_node_id].workflow_id].append(get_edge_change(edge, edges_validator))
+    workflow_ids = set(edges_changes)
+    save_workflows_validation(
+        {
+            workflow_id: validation.add_edges(summaries.get(workflow_id), edges_changes[workflow_id])
+            for workflow_id in workflow_ids
+        },
+        db=db
+    )
+    db.commit()
+    for workflow_id in workflow_ids:
+        invalidate_workflow_caches(workflow_id)
+    return edges_objs
+
+
+def delete_workflow(workflow_id: int, db: Session) -> None:
+    """
+    Deletes Workflow together with its Nodes and Edges
+    """
+    db.query(models.Workflow).filter(models.Workflow.id == workflow_id).delete()
+    db.commit()
+    invalidate_workflow_caches(workflow_id)
+
+
+def delete_node(node_id: int, db: Session) -> None:
+    """
+    Deletes Node together with its Edges
+    """
+    workflow_id = db.query(models.Node.workflow_id).filter(models.Node.id == node_id).scalar()
+    if workflow_id is None:
+        return
+    db.query(models.Node).filter(models.Node.id == node_id).delete()
+    bump_workflow_version(workflow_id, db=db)
+    # Node deletion removes its Edges too, so whole graph is validated
+    save_workflows_validation({workflow_id: None}, db=db)
+    db.commit()
+    invalidate_workflow_caches(workflow_id)
+
+
+def delete_edge(edge_id: int, db: Session) -> None:
+    """
+    Deletes Edge, Condition linked by this Edge loses its "yes" or "no" target
+    """
+    source_node = aliased(models.Node)
+    target_node = aliased(models.Node)
+    edge = db.query(models.Edge.workflow_id, models.Edge.source_node_id, source_node.type, target_node.type) \
+        .join(source_node, models.Edge.source_node) \
+        .join(target_node, models.Edge.target_node) \
+        .filter(models.Edge.id == edge_id) \
+        .first()
+    if edge is None:
+        return
+    workflow_id, source_node_id, source_type, target_type = edge
+    db.query(models.Edge).filter(models.Edge.id == edge_id).delete()
+    summary = bump_workflow_version(workflow_id, db=db)
+    edge_change = validation.EdgeChange(source_node_id, source_type, target_type, target_has_targets=True)
+    save_workflows_validation({workflow_id: validation.remove_edge(summary, edge_change)}, db=db)
+    db.commit()
+    invalidate_workflow_caches(workflow_id)
@@ -1,25 +1,48 @@
 import pytest
 
 from fastapi.testclient import TestClient
-from sqlalchemy import create_engine
+from sqlalchemy import create_engine, event
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+from sqlalchemy.pool import NullPool
 from sqlalchemy.orm import sessionmaker, Session
-from typing import Generator
+from typing import Callable, Generator
 
+from .. import decision_tables
 from .. import models
+from .. import plans
+from .. import process_runs
+from .. import response_cache
+from .. import run_history
 from .. import schemas
+from ..async_main import app as async_app
 from ..main import app
-from ..db import get_db, Base
+from ..db import get_async_db, get_async_url, get_db, get_session_factory, Base
 from ..config import settings
 
 
 engine = create_engine(settings.TESTS_DB_URL)
 TestSessionLocal = sessionmaker(bind=engine, autocommit=False, autoflush=False)
+# TestClient may run every request in new event loop, so async connections cannot be reused
+async_engine = create_async_engine(get_async_url(settings.TESTS_DB_URL), poolclass=NullPool)
+TestAsyncSessionLocal = async_sessionmaker(bind=async_engine, autoflush=False, expire_on_commit=False)
 
 
 @pytest.fixture(scope="function")
 def session() -> Generator[Session, None, None]:
     Base.metadata.drop_all(bind=engine)
     Base.metadata.create_all(bind=engine)
+    # IDs and versions start over in recreated tables, so cached plans and responses would be matched by mistake
+    plans.plan_cache.clear()
+    decision_tables.decision_table_cache.clear()
+    process_runs.packed_plan_cache.clear()
+    response_cache.backend.clear()
+    # Runs recorded by test are only saved to tests DB when test flushes them
+    run_history.writer = run_history.RunHistoryWriter(
+        session_factory=TestSessionLocal,
+        batch_size=settings.RUN_HISTORY_BATCH_SIZE,
+        flush_interval=settings.RUN_HISTORY_FLUSH_INTERVAL,
+        max_pending=settings.RUN_HISTORY_MAX_PENDING
+    )
     session = TestSessionLocal()
     try:
         yield session
@@ -35,8 +58,21 @@ def client(session) -> Generator[TestClient, None, None]:
         finally:
             pass
     app.dependency_overrides[get_db] = override_get_db
+    app.dependency_overrides[get_session_factory] = lambda: lambda: session
     yield TestClient(app=app)
 
+@pytest.fixture(scope="function")
+def async_client(client) -> Generator[TestClient, None, None]:
+    """
+    Client of async app, endpoints without async version are served by sync app of `client` fixture
+    """
+    async def override_get_async_db():
+        async with TestAsyncSessionLocal() as db:
+            yield db
+    async_app.dependency_overrides[get_async_db] = override_get_async_db
+    yield TestClient(app=async_app)
+
+
 @pytest.fixture(scope="function")
 def test_workflow(session: Session) -> models.Workflow:
     """
@@ -100,30 +136,35 @@ def test_workflow_data(session: Session, test_workflow) -> dict:
     # Create edges
     edges = [
         models.Edge(
+            workflow=workflow,
             source_node=start_node,
             target_node=msg_node1
         ),
         models.Edge(
+            workflow=workflow,
             source_node=msg_node1,
             target_node=condition_node1
         ),
         models.Edge(
+            workflow=workflow,
             source_node=msg_node2,
             target_node=end_node
         ),
         models.Edge(
+            workflow=workflow,
             source_node=msg_node3,
             target_node=end_node
         ),
         models.Edge(
+            workflow=workflow,
             source_node=msg_node4,
             target_node=end_node
         ),
     ]
-    yes_edge1 = models.Edge(source_node=condition_node1, target_node=msg_node2)
-    no_edge1 = models.Edge(source_node=condition_node1, target_node=condition_node2)
-    yes_edge2 = models.Edge(source_node=condition_node2, target_node=msg_node3)
-    no_edge2 = models.Edge(source_node=condition_node2, target_node=msg_node4)
+    yes_edge1 = models.Edge(workflow=workflow, source_node=condition_node1, target_node=msg_node2)
+    no_edge1 = models.Edge(workflow=workflow, source_node=condition_node1, target_node=condition_node2)
+    yes_edge2 = models.Edge(workflow=workflow, source_node=condition_node2, target_node=msg_node3)
+    no_edge2 = models.Edge(workflow=workflow, source_node=condition_node2, target_node=msg_node4)
     edges += [yes_edge1, yes_edge2, no_edge1, no_edge2]
 
     condition_node1.condition.yes_edge = yes_edge1
@@ -156,3 +197,72 @@ def test_workflow_data(session: Session, test_workflow) -> dict:
         "msg_node4": msg_node4.id,
         "end_node": end_node.id
     }
+
+
+@pytest.fixture(scope="function")
+def workflow_factory(session: Session) -> Callable[[int], models.Workflow]:
+    """
+    Fixture that creates Workflows with chain of given number of Message and Condition Nodes pairs.
+
+    Every Condition leads to the next Message by "yes" edge and to End Node by "no" edge.
+    """
+    def create_workflow(size: int) -> models.Workflow:
+        workflow = models.Workflow(name=f"Chain {size}")
+        start_node = models.Node(workflow=workflow, type=models.Node.NodeTypeEnum.start)
+        end_node = models.Node(workflow=workflow, type=models.Node.NodeTypeEnum.end)
+        session.add_all([workflow, start_node, end_node])
+
+        previous_node = start_node
+        for i in range(size):
+            msg_node = models.Node(workflow=workflow, type=models.Node.NodeTypeEnum.message)
+            condition_node = models.Node(workflow=workflow, type=models.Node.NodeTypeEnum.condition)
+            edge = models.Edge(workflow=workflow, source_node=previous_node, target_node=msg_node)
+            no_edge = models.Edge(workflow=workflow, source_node=condition_node, target_node=end_node)
+            session.add_all([
+                msg_node,
+                condition_node,
+                models.Message(node=msg_node, status=models.Message.MessageStatusEnum.sent, text=f"Message {i}"),
+                models.Condition(node=condition_node, expression='text != ""', no_edge=no_edge),
+                edge,
+                models.Edge(workflow=workflow, source_node=msg_node, target_node=condition_node),
+                no_edge,
+            ])
+            if previous_node.type == models.Node.NodeTypeEnum.condition:
+                previous_node.condition.yes_edge = edge
+            previous_node = condition_node
+
+        # Last Condition leads to End Node regardless of the result
+        if previous_node.type == models.Node.NodeTypeEnum.condition:
+            previous_node.condition.yes_edge = previous_node.condition.no_edge
+        session.commit()
+        session.refresh(workflow)
+        return workflow
+    return create_workflow
+
+
+@pytest.fixture(scope="function")
+def queries_counter() -> Generator[list[str], None, None]:
+    """
+    Fixture that collects SQL statements executed by tests DB engine
+    """
+    statements = []
+
+    def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        statements.append(statement)
+
+    event.listen(engine, "before_cursor_execute", before_cursor_execute)
+    try:
+        yield statements
+    finally:
+        event.remove(engine, "before_cursor_execute", before_cursor_execute)
+
+
+@pytest.fixture(scope="function")
+def process_pool() -> Generator[None, None, None]:
+    """
+    Fixture that shuts down worker processes started by test
+    """
+    try:
+        yield
+    finally:
+        process_runs.shutdown_process_executor()
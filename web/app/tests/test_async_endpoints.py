@@ -0,0 +1,90 @@
+import asyncio
+
+from sqlalchemy.orm import Session
+
+from .conftest import TestClient
+from .. import models
+from .. import services
+from ..async_main import app
+
+
+class TestGetWorkflow:
+    def test_success(self, async_client: TestClient, session: Session, test_workflow_data):
+        response = async_client.get(app.url_path_for("get_workflow", workflow_id=test_workflow_data["workflow_id"]))
+        assert response.status_code == 200
+        json = response.json()
+        assert json["id"] == test_workflow_data["workflow_id"]
+        assert len(json["nodes"]) == 8
+        assert len(json["edges"]) == 9
+
+    def test_not_found(self, async_client: TestClient, session: Session):
+        response = async_client.get(app.url_path_for("get_workflow", workflow_id=1))
+        assert response.status_code == 404
+        assert response.json() == {"detail": "Workflow not found"}
+
+
+class TestCreateWorkflow:
+    def test_success(self, async_client: TestClient, session: Session):
+        response = async_client.post(app.url_path_for("create_workflow"), json={"name": "test"})
+        assert response.status_code == 201
+        workflow = session.query(models.Workflow).first()
+        json = response.json()
+        assert type(json.pop("created_at")) is str
+        assert json == {"id": workflow.id, "name": "test", "nodes": [], "edges": []}
+
+
+class TestRunWorkflow:
+    def test_success(self, async_client: TestClient, session: Session, test_workflow_data):
+        response = async_client.get(app.url_path_for("run_workflow", workflow_id=test_workflow_data["workflow_id"]))
+        assert response.status_code == 200
+        assert [node["id"] for node in response.json()["nodes"]] == [
+            test_workflow_data["start_node"],
+            test_workflow_data["msg_node1"],
+            test_workflow_data["condition_node1"],
+            test_workflow_data["condition_node2"],
+            test_workflow_data["msg_node3"],
+            test_workflow_data["end_node"],
+        ]
+
+    def test_not_on_event_loop(self, async_client: TestClient, session: Session, test_workflow_data, monkeypatch):
+        # Path finding and encoding are CPU-bound, so they must not block event loop thread
+        threads = []
+
+        def find_run_path(*args, **kwargs):
+            try:
+                asyncio.get_running_loop()
+                threads.append("event loop")
+            except RuntimeError:
+                threads.append("threadpool")
+            return original_find_run_path(*args, **kwargs)
+
+        original_find_run_path = services.find_run_path
+        monkeypatch.setattr(services, "find_run_path", find_run_path)
+        workflow_id = test_workflow_data["workflow_id"]
+        response = async_client.get(app.url_path_for("run_workflow", workflow_id=workflow_id))
+        assert response.status_code == 200
+        response = async_client.post(
+            app.url_path_for("run_workflow_batch", workflow_id=workflow_id),
+            json={"runs": [{"statuses": {test_workflow_data["msg_node1"]: "pending"}}]}
+        )
+        assert response.status_code == 200
+        assert threads == ["threadpool", "threadpool"]
+
+
+class TestCreateNode:
+    def test_success(self, async_client: TestClient, session: Session, test_workflow):
+        response = async_client.post(
+            app.url_path_for("create_node"),
+            json={"workflow_id": test_workflow.id, "type": "message", "status": "sent", "text": "test"}
+        )
+        node = session.query(models.Node).first()
+        assert response.status_code == 201
+        assert response.json() == {"id": node.id, "type": "message", "status": "sent", "text": "test"}
+
+
+class TestSyncEndpoints:
+    def test_export(self, async_client: TestClient, session: Session, test_workflow_data):
+        # Export has no async version and is served by mounted sync app
+        response = async_client.get("/api/workflows/export")
+        assert response.status_code == 200
+        assert response.headers["content-type"] == "application/x-ndjson"
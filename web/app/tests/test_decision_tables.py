@@ -0,0 +1,133 @@
+import itertools
+
+import pytest
+
+from fastapi.testclient import TestClient
+from prometheus_client import REGISTRY
+
+from benchmarks.workloads import SHAPES, WorkflowBuilder, build_models
+from .. import decision_tables
+from .. import models
+from .. import plans
+from ..main import app
+
+
+def generate_cycle(size: int) -> dict:
+    """
+    Chain of Messages and Conditions, "no" edge of the last Condition leads back to the first Message
+    """
+    builder = WorkflowBuilder(name=f"Cycle {size}")
+    builder.add_edge("start", builder.add_message("msg0"))
+    for i in range(size):
+        builder.add_edge(f"msg{i}", builder.add_condition(f"condition{i}"))
+        if i < size - 1:
+            builder.add_edge(f"condition{i}", builder.add_message(f"msg{i + 1}"))
+    builder.add_edge(f"condition{size - 1}", "end")
+    builder.add_edge(f"condition{size - 1}", "msg0", is_yes_condition=False)
+    # The first Condition has no "no" edge
+    return builder.build()
+
+
+def generate_diamonds(size: int) -> dict:
+    """
+    Both edges of every Condition lead to separate Messages joined by Message checked by the next Condition,
+    so Workflow has 2 ** size paths
+    """
+    builder = WorkflowBuilder(name=f"Diamonds {size}")
+    builder.add_edge("start", builder.add_message("msg0"))
+    builder.add_edge("msg0", builder.add_condition("condition0"))
+    for i in range(1, size + 1):
+        builder.add_edge(f"condition{i - 1}", builder.add_message(f"yes{i}"), is_yes_condition=True)
+        builder.add_edge(f"condition{i - 1}", builder.add_message(f"no{i}"), is_yes_condition=False)
+        builder.add_edge(f"yes{i}", builder.add_message(f"msg{i}"))
+        builder.add_edge(f"no{i}", f"msg{i}")
+        if i < size:
+            builder.add_edge(f"msg{i}", builder.add_condition(f"condition{i}"))
+        else:
+            builder.add_edge(f"msg{i}", "end")
+    return builder.build()
+
+
+def run(func, *args, **kwargs):
+    try:
+        return func(*args, **kwargs)
+    except ValueError as err:
+        return type(err), str(err)
+
+
+@pytest.mark.parametrize("document", [
+    SHAPES["chain"](4),
+    SHAPES["tree"](2),
+    SHAPES["fan_in"](4),
+    generate_cycle(3),
+    generate_diamonds(3),
+])
+def test_same_as_find_plan_path(document: dict):
+    workflow, nodes, edges = build_models(document)
+    plan = plans.compile_plan(workflow, nodes=nodes, edges=edges)
+    table = decision_tables.compile_decision_table(plan, max_paths=100)
+
+    messages_ids = [node.id for node in nodes if node.type == models.Node.NodeTypeEnum.message]
+    found_paths = set()
+    for messages_statuses in itertools.product(models.Message.MessageStatusEnum, repeat=len(messages_ids)):
+        statuses = dict(zip(messages_ids, messages_statuses))
+        for limits in [None, plans.RunLimits(max_steps=5, max_duration=0)]:
+            path = run(decision_tables.find_table_path, table, plan, statuses=statuses, limits=limits)
+            assert path == run(plans.find_plan_path, plan, statuses=statuses, limits=limits)
+            if limits is None:
+                found_paths.add(tuple(node["id"] for node in path) if isinstance(path, list) else path)
+    # Every path of table is reachable
+    assert len(found_paths) == len(table.paths)
+
+
+def test_too_many_paths():
+    workflow, nodes, edges = build_models(generate_diamonds(3))
+    plan = plans.compile_plan(workflow, nodes=nodes, edges=edges)
+    assert len(decision_tables.compile_decision_table(plan, max_paths=8).paths) == 8
+    with pytest.raises(decision_tables.TooManyPathsError):
+        decision_tables.compile_decision_table(plan, max_paths=7)
+
+
+def test_get_workflow_paths(client: TestClient):
+    response = client.post(app.url_path_for("import_workflow"), json=SHAPES["chain"](2))
+    workflow_id, nodes_ids = response.json()["id"], response.json()["nodes_ids"]
+
+    response = client.get(app.url_path_for("get_workflow_paths", workflow_id=workflow_id))
+    assert response.status_code == 200
+    paths = response.json()["paths"]
+    # Condition reached through Condition is decided by the same Message, so status of "msg1" does not matter
+    assert len(paths) == 2
+    path_to_end = {
+        "statuses": {str(nodes_ids["msg0"]): ["sent"]},
+        "nodes_ids": [nodes_ids[node_id] for node_id in ["start", "msg0", "condition0", "msg1", "condition1", "end"]]
+    }
+    assert path_to_end in paths
+    assert {
+        "statuses": {str(nodes_ids["msg0"]): ["pending", "opened"]},
+        "nodes_ids": [nodes_ids[node_id] for node_id in ["start", "msg0", "condition0", "end"]]
+    } in paths
+
+    # "What-if" runs are found in the table
+    response = client.post(
+        app.url_path_for("run_workflow_batch", workflow_id=workflow_id),
+        json={"runs": [{"statuses": {nodes_ids["msg0"]: "pending"}}, {"statuses": {}}]}
+    )
+    assert [[node["id"] for node in run["nodes"]] for run in response.json()["runs"]] == [
+        [nodes_ids[node_id] for node_id in ["start", "msg0", "condition0", "end"]],
+        path_to_end["nodes_ids"],
+    ]
+
+
+def test_get_paths_of_invalid_workflow(client: TestClient):
+    document = SHAPES["chain"](2)
+    document["nodes"] = [node for node in document["nodes"] if node["type"] != "start"]
+    document["edges"] = [edge for edge in document["edges"] if edge["source_node_id"] != "start"]
+    response = client.post(app.url_path_for("import_workflow"), json=document)
+    workflow_id = response.json()["id"]
+
+    runs_count = REGISTRY.get_sample_value("workflow_runs_total", {"outcome": "no_start"}) or 0.0
+    response = client.get(app.url_path_for("get_workflow_paths", workflow_id=workflow_id))
+    assert response.status_code == 400
+    assert response.json() == {"detail": "Workflow has no Start Node"}
+    # Listing paths is not a run
+    assert (REGISTRY.get_sample_value("workflow_runs_total", {"outcome": "no_start"}) or 0.0) == runs_count
@@ -1,11 +1,24 @@
 import json
+import pytest
+import time
 
-from sqlalchemy import or_
+from concurrent.futures import Future, ThreadPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from fastapi import HTTPException
+from prometheus_client import REGISTRY
+from sqlalchemy import or_, select, text
+from sqlalchemy.exc import OperationalError
 from sqlalchemy.orm import Session
 
-from .conftest import TestClient
+from .conftest import TestClient, TestSessionLocal
 from .. import models
+from .. import plans
+from .. import process_runs
+from .. import response_cache
 from .. import schemas
+from .. import services
+from .. import validation
+from ..config import settings
 from ..main import app
 
 
@@ -31,6 +44,55 @@ class TestGetAllWorkflows:
             [json.loads(schemas.WorkflowOut(**workflow_data, nodes=nodes_data, edges=edges_data).model_dump_json(exclude_none=True))]
 
 
+    def test_pagination(self, client: TestClient, session: Session):
+        workflows = [models.Workflow(name=f"Test {i}") for i in range(3)]
+        session.add_all(workflows)
+        session.commit()
+        workflows_ids = [workflow.id for workflow in workflows]
+
+        response = client.get(app.url_path_for("get_all_workflows"), params={"limit": 2})
+        assert response.status_code == 200
+        assert [workflow["id"] for workflow in response.json()] == workflows_ids[:2]
+
+        response = client.get(app.url_path_for("get_all_workflows"), params={"limit": 2, "after_id": workflows_ids[1]})
+        assert response.status_code == 200
+        assert [workflow["id"] for workflow in response.json()] == workflows_ids[2:]
+
+    def test_without_graph(self, client: TestClient, session: Session, test_workflow_data):
+        response = client.get(app.url_path_for("get_all_workflows"), params={"with_graph": False})
+        assert response.status_code == 200
+        json = response.json()
+        assert type(json[0].pop("created_at")) is str
+        assert json == [{"id": test_workflow_data["workflow_id"], "name": "Test"}]
+
+
+class TestExportWorkflows:
+    def test_success(self, client: TestClient, session: Session, test_workflow_data, workflow_factory, monkeypatch):
+        # Read Workflows from cursor one by one
+        monkeypatch.setattr(settings, "EXPORT_BATCH_SIZE", 1)
+        chain_workflow_id = workflow_factory(2).id
+        response = client.get(app.url_path_for("export_workflows"))
+        assert response.status_code == 200
+        assert response.headers["content-type"] == "application/x-ndjson"
+        lines = [json.loads(line) for line in response.text.splitlines()]
+        assert [line["id"] for line in lines] == [test_workflow_data["workflow_id"], chain_workflow_id]
+        assert len(lines[0]["nodes"]) == 8
+        assert len(lines[0]["edges"]) == 9
+        assert lines[0]["nodes"][1] == {
+            "id": test_workflow_data["msg_node1"],
+            "type": "message",
+            "status": "opened",
+            "text": "hello"
+        }
+        assert lines[0]["nodes"][2] == {
+            "id": test_workflow_data["condition_node1"],
+            "type": "condition",
+            "expression": 'status == "sent"',
+            "yes_node_id": test_workflow_data["msg_node2"],
+            "no_node_id": test_workflow_data["condition_node2"],
+        }
+
+
 class TestCreateWorkflow:
     def test_success(self, client: TestClient, session: Session):
         response = client.post(app.url_path_for("create_workflow"), json={"name": "test"})
@@ -41,6 +103,57 @@ class TestCreateWorkflow:
         assert json == {"id": workflow.id, "name": "test", "nodes": [], "edges": []}
 
 
+class TestImportWorkflow:
+    graph = {
+        "name": "Imported",
+        "nodes": [
+            {"id": "start", "type": "start"},
+            {"id": "msg1", "type": "message", "status": "opened", "text": "hello"},
+            {"id": "condition1", "type": "condition", "expression": 'status == "opened"'},
+            {"id": "msg2", "type": "message", "status": "pending", "text": "How are you?"},
+            {"id": "msg3", "type": "message", "status": "pending", "text": "Do you like pets?"},
+            {"id": "end", "type": "end"},
+        ],
+        "edges": [
+            {"source_node_id": "start", "target_node_id": "msg1"},
+            {"source_node_id": "msg1", "target_node_id": "condition1"},
+            {"source_node_id": "condition1", "target_node_id": "msg2", "is_yes_condition": True},
+            {"source_node_id": "condition1", "target_node_id": "msg3", "is_yes_condition": False},
+            {"source_node_id": "msg2", "target_node_id": "end"},
+            {"source_node_id": "msg3", "target_node_id": "end"},
+        ]
+    }
+
+    def test_success(self, client: TestClient, session: Session):
+        response = client.post(app.url_path_for("import_workflow"), json=self.graph)
+        assert response.status_code == 201
+        json = response.json()
+        nodes_ids = json["nodes_ids"]
+        assert set(nodes_ids) == {node["id"] for node in self.graph["nodes"]}
+        assert json["name"] == "Imported"
+        assert [node["id"] for node in json["nodes"]] == [nodes_ids[node["id"]] for node in self.graph["nodes"]]
+        assert len(json["edges"]) == 6
+        assert session.query(models.Edge).filter(models.Edge.workflow_id == json["id"]).count() == 6
+        condition = session.get(models.Condition, nodes_ids["condition1"])
+        assert condition.yes_edge.target_node_id == nodes_ids["msg2"]
+        assert condition.no_edge.target_node_id == nodes_ids["msg3"]
+
+        response = client.get(app.url_path_for("run_workflow", workflow_id=json["id"]))
+        assert response.status_code == 200
+        assert [node["id"] for node in response.json()["nodes"]] == \
+            [nodes_ids[node_id] for node_id in ["start", "msg1", "condition1", "msg2", "end"]]
+
+    def test_invalid_edge(self, client: TestClient, session: Session):
+        graph = {
+            **self.graph,
+            "edges": self.graph["edges"] + [{"source_node_id": "msg2", "target_node_id": "msg3"}]
+        }
+        response = client.post(app.url_path_for("import_workflow"), json=graph)
+        assert response.status_code == 400
+        assert response.json() == {"detail": "Message Node cannot have more than one target node"}
+        assert session.query(models.Workflow).count() == 0
+
+
 class TestGetWorkflow:
     def test_success(self, client: TestClient, session: Session, test_workflow_data):
         # Prepare workflow data to compare
@@ -63,6 +176,75 @@ class TestGetWorkflow:
             json.loads(schemas.WorkflowOut(**workflow_data, nodes=nodes_data, edges=edges_data).model_dump_json(exclude_none=True))
 
 
+class TestResponseCache:
+    @pytest.mark.parametrize("endpoint", ["get_workflow", "run_workflow"])
+    def test_cached_and_invalidated(self, client: TestClient, test_workflow_data, queries_counter, endpoint):
+        url = app.url_path_for(endpoint, workflow_id=test_workflow_data["workflow_id"])
+        response = client.get(url)
+        assert response.status_code == 200
+
+        queries_counter.clear()
+        cached_response = client.get(url)
+        assert cached_response.json() == response.json()
+        # Only Workflow is selected, without its nodes and edges
+        assert len([statement for statement in queries_counter if statement.startswith("SELECT")]) == 1
+
+        response = client.patch(
+            app.url_path_for("update_node", node_id=test_workflow_data["msg_node1"]),
+            json={"text": "changed"}
+        )
+        assert response.status_code == 200
+        assert len(response_cache.backend) == 0
+        response = client.get(url)
+        assert response.status_code == 200
+        if endpoint == "run_workflow":
+            assert response.json()["nodes"][1]["text"] == "changed"
+
+    def test_list(self, client: TestClient, test_workflow_data, workflow_factory):
+        workflow = workflow_factory(2)
+        response = client.get(app.url_path_for("get_workflow", workflow_id=workflow.id))
+        assert response.status_code == 200
+
+        # Cached Workflow is reused in listing, the other one is loaded
+        response = client.get(app.url_path_for("get_all_workflows"))
+        assert response.status_code == 200
+        assert [workflow_data["id"] for workflow_data in response.json()] == \
+            [test_workflow_data["workflow_id"], workflow.id]
+        assert response.json()[1] == client.get(app.url_path_for("get_workflow", workflow_id=workflow.id)).json()
+
+
+class TestConditionalGet:
+    @pytest.mark.parametrize("endpoint", ["get_workflow", "run_workflow"])
+    def test_not_modified(self, client: TestClient, test_workflow_data, queries_counter, endpoint):
+        url = app.url_path_for(endpoint, workflow_id=test_workflow_data["workflow_id"])
+        response = client.get(url)
+        assert response.status_code == 200
+        etag = response.headers["ETag"]
+        assert etag == f'"{test_workflow_data["workflow_id"]}-1"'
+
+        queries_counter.clear()
+        response = client.get(url, headers={"If-None-Match": f'"other", W/{etag}'})
+        assert response.status_code == 304
+        assert response.headers["ETag"] == etag
+        assert response.content == b""
+        # Only Workflow is selected, without its nodes and edges
+        assert len([statement for statement in queries_counter if statement.startswith("SELECT")]) == 1
+
+    @pytest.mark.parametrize("endpoint", ["get_workflow", "run_workflow"])
+    def test_modified(self, client: TestClient, test_workflow_data, endpoint):
+        url = app.url_path_for(endpoint, workflow_id=test_workflow_data["workflow_id"])
+        etag = client.get(url).headers["ETag"]
+        response = client.patch(
+            app.url_path_for("update_node", node_id=test_workflow_data["msg_node1"]),
+            json={"status": "sent"}
+        )
+        assert response.status_code == 200
+
+        response = client.get(url, headers={"If-None-Match": etag})
+        assert response.status_code == 200
+        assert response.headers["ETag"] != etag
+
+
 class TestDeleteWorkflow:
     def test_success(self, client: TestClient, session: Session, test_workflow):
         assert session.query(models.Workflow).count() == 1
@@ -70,6 +252,12 @@ class TestDeleteWorkflow:
         assert response.status_code == 204
         assert session.query(models.Workflow).count() == 0
 
+    def test_with_graph(self, client: TestClient, session: Session, test_workflow_data):
+        response = client.delete(app.url_path_for("delete_workflow", workflow_id=test_workflow_data["workflow_id"]))
+        assert response.status_code == 204
+        assert session.query(models.Node).count() == 0
+        assert session.query(models.Edge).count() == 0
+
 
 class TestRunWorkflow:
     def test_success(self, client: TestClient, session: Session, test_workflow_data):
@@ -88,6 +276,407 @@ class TestRunWorkflow:
             ]
         }
 
+    def test_plan_cached_and_invalidated(self, client: TestClient, session: Session, test_workflow_data):
+        workflow_id = test_workflow_data["workflow_id"]
+        response = client.get(app.url_path_for("run_workflow", workflow_id=workflow_id))
+        assert response.status_code == 200
+        workflow_obj = session.get(models.Workflow, workflow_id)
+        assert plans.plan_cache.get(workflow_id, workflow_obj.version) is not None
+
+        # Removing edge to End Node must not leave stale plan in use
+        edge = session.query(models.Edge).filter(
+            models.Edge.source_node_id == test_workflow_data["msg_node3"]
+        ).first()
+        response = client.delete(app.url_path_for("delete_edge", edge_id=edge.id))
+        assert response.status_code == 204
+        session.refresh(workflow_obj)
+        assert workflow_obj.version == 2
+        assert plans.plan_cache.get(workflow_id, workflow_obj.version) is None
+
+        response = client.get(app.url_path_for("run_workflow", workflow_id=workflow_id))
+        assert response.status_code == 400
+        assert response.json() == {
+            "detail": f"No end node at the end of the path or edge missing. Node id: {test_workflow_data['msg_node3']}"
+        }
+
+
+class TestRunWorkflowLimits:
+    def test_max_steps(self, client: TestClient, test_workflow_data):
+        url = app.url_path_for("run_workflow", workflow_id=test_workflow_data["workflow_id"])
+        response = client.get(url, params={"max_steps": 6})
+        assert response.status_code == 200
+        etag = response.headers["ETag"]
+
+        # Requested limits are applied even if Workflow was not changed
+        response = client.get(url, params={"max_steps": 3}, headers={"If-None-Match": etag})
+        assert response.status_code == 400
+        assert response.json() == {"detail": "Run exceeded limit of 3 steps"}
+
+        response = client.get(url, params={"max_steps": settings.RUN_MAX_STEPS + 1})
+        assert response.status_code == 422
+
+    def test_cycle(self, client: TestClient):
+        graph = {
+            "name": "Cycle",
+            "nodes": [
+                {"id": "start", "type": "start"},
+                {"id": "msg1", "type": "message", "status": "sent", "text": "hello"},
+                {"id": "condition1", "type": "condition", "expression": 'status == "sent"'},
+                {"id": "msg2", "type": "message", "status": "pending", "text": "Are you there?"},
+                {"id": "end", "type": "end"},
+            ],
+            "edges": [
+                {"source_node_id": "start", "target_node_id": "msg1"},
+                {"source_node_id": "msg1", "target_node_id": "condition1"},
+                {"source_node_id": "condition1", "target_node_id": "msg2", "is_yes_condition": True},
+                {"source_node_id": "condition1", "target_node_id": "end", "is_yes_condition": False},
+                {"source_node_id": "msg2", "target_node_id": "msg1"},
+            ]
+        }
+        response = client.post(app.url_path_for("import_workflow"), json=graph)
+        assert response.status_code == 201
+        workflow_id, nodes_ids = response.json()["id"], response.json()["nodes_ids"]
+
+        response = client.get(app.url_path_for("run_workflow", workflow_id=workflow_id))
+        assert response.status_code == 400
+        assert response.json() == {
+            "detail": f"Path returns to the same state, run would never end. Node id: {nodes_ids['msg1']}"
+        }
+
+        # With "no" status of the first Message run leaves the cycle
+        response = client.post(
+            app.url_path_for("run_workflow_batch", workflow_id=workflow_id),
+            json={"runs": [{"statuses": {nodes_ids["msg1"]: "pending"}}, {"statuses": {}}]},
+            params={"max_steps": 10}
+        )
+        assert response.status_code == 200
+        runs = response.json()["runs"]
+        assert [node["id"] for node in runs[0]["nodes"]] == [nodes_ids[node_id] for node_id in ["start", "msg1", "condition1", "end"]]
+        assert "run would never end" in runs[1]["error"]
+
+
+class TestGetWorkflowValidation:
+    def test_updated_on_change(self, client: TestClient, session: Session, test_workflow, queries_counter):
+        nodes_ids = {}
+        for node_type in ["start", "end"]:
+            response = client.post(
+                app.url_path_for("create_node"),
+                json={"workflow_id": test_workflow.id, "type": node_type}
+            )
+            nodes_ids[node_type] = response.json()["id"]
+
+        response = client.get(app.url_path_for("get_workflow_validation", workflow_id=test_workflow.id))
+        assert response.status_code == 200
+        assert response.json() == {
+            "workflow_id": test_workflow.id,
+            "version": 3,
+            "is_valid": False,
+            "errors": [{"code": "end_unreachable", "message": "End Node is not reachable from Start Node"}],
+            "warnings": []
+        }
+
+        # Run is rejected without loading Nodes and Edges
+        queries_counter.clear()
+        response = client.get(app.url_path_for("run_workflow", workflow_id=test_workflow.id))
+        assert response.status_code == 400
+        assert response.json() == {"detail": "End Node is not reachable from Start Node"}
+        assert len([statement for statement in queries_counter if statement.startswith("SELECT")]) == 1
+
+        response = client.post(
+            app.url_path_for("create_edge"),
+            json={"source_node_id": nodes_ids["start"], "target_node_id": nodes_ids["end"]}
+        )
+        assert response.status_code == 201
+        response = client.get(app.url_path_for("get_workflow_validation", workflow_id=test_workflow.id))
+        assert response.json()["is_valid"] is True
+
+        response = client.delete(app.url_path_for("delete_node", node_id=nodes_ids["end"]))
+        assert response.status_code == 204
+        response = client.get(app.url_path_for("get_workflow_validation", workflow_id=test_workflow.id))
+        assert response.json()["errors"] == [{"code": "no_end", "message": "Workflow has no End Node"}]
+
+    def test_incremental_updates(self, client: TestClient, session: Session, test_workflow, queries_counter):
+        # Number of requests which validated whole graph
+        full_validations = []
+
+        def create(url_name: str, **data) -> int:
+            queries_counter.clear()
+            response = client.post(app.url_path_for(url_name), json=data)
+            assert response.status_code == 201
+            full_validations.append(any("FROM condition JOIN node" in statement for statement in queries_counter))
+            return response.json()["id"]
+
+        def assert_summary_up_to_date() -> None:
+            session.expire_all()
+            summary = session.get(models.Workflow, test_workflow.id).validation
+            assert summary == services.compute_workflows_validation([test_workflow.id], db=session)[test_workflow.id]
+
+        client.get(app.url_path_for("get_workflow_validation", workflow_id=test_workflow.id))
+        nodes_ids = {}
+        edges_ids = {}
+        for name, node_type, data in [
+            ("start", "start", {}),
+            ("msg1", "message", {"status": "sent", "text": "Hello"}),
+            ("condition", "condition", {"expression": 'status == "sent"'}),
+            ("msg2", "message", {"status": "sent", "text": "Bye"}),
+            ("msg3", "message", {"status": "sent", "text": "Bye"}),
+            ("msg4", "message", {"status": "sent", "text": "Bye"}),
+        ]:
+            nodes_ids[name] = create("create_node", workflow_id=test_workflow.id, type=node_type, **data)
+            assert_summary_up_to_date()
+        for name, source, target, is_yes_condition in [
+            ("start-msg1", "start", "msg1", None),
+            ("msg1-condition", "msg1", "condition", None),
+            ("condition-msg2", "condition", "msg2", True),
+            ("msg2-msg3", "msg2", "msg3", None),
+            ("msg3-msg4", "msg3", "msg4", None),
+        ]:
+            edges_ids[name] = create(
+                "create_edge",
+                source_node_id=nodes_ids[source],
+                target_node_id=nodes_ids[target],
+                is_yes_condition=is_yes_condition
+            )
+            assert_summary_up_to_date()
+        # Graph was not loaded while Workflow was built forward
+        assert not any(full_validations)
+
+        # Cycle is only checked when target Node links other Nodes
+        edges_ids["msg4-msg2"] = create(
+            "create_edge",
+            source_node_id=nodes_ids["msg4"],
+            target_node_id=nodes_ids["msg2"]
+        )
+        assert_summary_up_to_date()
+        assert full_validations[-1]
+
+        nodes_ids["end"] = create("create_node", workflow_id=test_workflow.id, type="end")
+        assert_summary_up_to_date()
+        edges_ids["condition-end"] = create(
+            "create_edge",
+            source_node_id=nodes_ids["condition"],
+            target_node_id=nodes_ids["end"],
+            is_yes_condition=False
+        )
+        assert_summary_up_to_date()
+
+        for name in ["msg4-msg2", "condition-end", "msg2-msg3", "start-msg1"]:
+            client.delete(app.url_path_for("delete_edge", edge_id=edges_ids[name]))
+            assert_summary_up_to_date()
+        client.delete(app.url_path_for("delete_node", node_id=nodes_ids["start"]))
+        assert_summary_up_to_date()
+
+    def test_change_locks_workflow(self, session: Session, test_workflow):
+        # Graph is only read for validation once Workflow row is locked by version bump
+        services.bump_workflow_version(test_workflow.id, db=session)
+        with TestSessionLocal() as db:
+            with pytest.raises(OperationalError):
+                db.execute(
+                    select(models.Workflow)
+                    .filter(models.Workflow.id == test_workflow.id)
+                    .with_for_update(nowait=True)
+                )
+        session.rollback()
+
+    @pytest.mark.parametrize("concurrent_edge, detail", [
+        ("target", None),
+        ("reverse", "Edge with these nodes already exists"),
+    ])
+    def test_edge_validated_after_lock(
+        self, client: TestClient, session: Session, test_workflow, monkeypatch, concurrent_edge, detail
+    ):
+        nodes_ids = []
+        for _ in range(3):
+            response = client.post(
+                app.url_path_for("create_node"),
+                json={"workflow_id": test_workflow.id, "type": "message", "status": "sent", "text": "Hello"}
+            )
+            nodes_ids.append(response.json()["id"])
+        source_node_id, target_node_id, other_node_id = nodes_ids
+        edges_changes = []
+        add_edges = validation.add_edges
+
+        def record_edges_changes(summary, changes):
+            edges_changes.extend(changes)
+            return add_edges(summary, changes)
+
+        def create_edge() -> models.Edge:
+            edge = schemas.EdgeIn(source_node_id=source_node_id, target_node_id=target_node_id)
+            with TestSessionLocal() as db:
+                return services.create_edge(edge, db=db)
+
+        monkeypatch.setattr(validation, "add_edges", record_edges_changes)
+
+        # Concurrent transaction adds Edge to Workflow locked by it, while Edge of test waits for the lock
+        with TestSessionLocal() as db, ThreadPoolExecutor(max_workers=1) as executor:
+            services.bump_workflow_version(test_workflow.id, db=db)
+            future = executor.submit(create_edge)
+            while not future.done() and not db.scalar(text("SELECT count(*) FROM pg_locks WHERE NOT granted")):
+                time.sleep(0.01)
+            db.add(models.Edge(
+                workflow_id=test_workflow.id,
+                source_node_id=target_node_id,
+                target_node_id=other_node_id if concurrent_edge == "target" else source_node_id
+            ))
+            db.commit()
+
+        if detail is None:
+            future.result()
+            # Target got its target before lock was released
+            [edge_change] = edges_changes
+            assert edge_change.target_has_targets
+        else:
+            with pytest.raises(HTTPException) as exc_info:
+                future.result()
+            assert exc_info.value.status_code == 400
+            assert exc_info.value.detail == detail
+
+    def test_not_validated_yet(self, client: TestClient, session: Session, test_workflow_data):
+        workflow_obj = session.get(models.Workflow, test_workflow_data["workflow_id"])
+        assert workflow_obj.validation is None
+
+        response = client.get(app.url_path_for("get_workflow_validation", workflow_id=workflow_obj.id))
+        assert response.status_code == 200
+        assert response.json()["is_valid"] is True
+        session.refresh(workflow_obj)
+        assert workflow_obj.validation == {"errors": response.json()["errors"], "warnings": response.json()["warnings"]}
+
+
+class TestRunWorkflowBatch:
+    def test_success(self, client: TestClient, session: Session, test_workflow_data):
+        msg_node1 = test_workflow_data["msg_node1"]
+        response = client.post(
+            app.url_path_for("run_workflow_batch", workflow_id=test_workflow_data["workflow_id"]),
+            json={"runs": [{}, {"statuses": {msg_node1: "sent"}}]}
+        )
+        assert response.status_code == 200
+        json = response.json()
+        assert json["workflow_id"] == test_workflow_data["workflow_id"]
+        assert [[node["id"] for node in run["nodes"]] for run in json["runs"]] == [
+            [
+                test_workflow_data["start_node"],
+                msg_node1,
+                test_workflow_data["condition_node1"],
+                test_workflow_data["condition_node2"],
+                test_workflow_data["msg_node3"],
+                test_workflow_data["end_node"],
+            ],
+            [
+                test_workflow_data["start_node"],
+                msg_node1,
+                test_workflow_data["condition_node1"],
+                test_workflow_data["msg_node2"],
+                test_workflow_data["end_node"],
+            ],
+        ]
+        assert json["runs"][1]["nodes"][1]["status"] == "sent"
+        # Statuses are not saved
+        assert session.get(models.Message, msg_node1).status == models.Message.MessageStatusEnum.opened
+
+    def test_not_message_node(self, client: TestClient, session: Session, test_workflow_data):
+        response = client.post(
+            app.url_path_for("run_workflow_batch", workflow_id=test_workflow_data["workflow_id"]),
+            json={"runs": [{"statuses": {test_workflow_data["end_node"]: "sent"}}]}
+        )
+        assert response.status_code == 400
+        assert response.json() == {
+            "detail": f"Node with ID of {test_workflow_data['end_node']} is not a Message Node of this Workflow"
+        }
+
+
+class TestRunWorkflowsBulk:
+    @pytest.mark.parametrize("parallel, processes", [(False, 0), (True, 0), (True, 2)])
+    def test_success(
+        self,
+        client: TestClient,
+        session: Session,
+        test_workflow_data,
+        workflow_factory,
+        process_pool,
+        monkeypatch,
+        parallel,
+        processes
+    ):
+        monkeypatch.setattr(settings, "BULK_RUN_PROCESSES", processes)
+        chain_workflow = workflow_factory(3)
+        missing_workflow_id = chain_workflow.id + 1000
+        response = client.post(
+            app.url_path_for("run_workflows_bulk"),
+            json={
+                "workflow_ids": [test_workflow_data["workflow_id"], missing_workflow_id, chain_workflow.id],
+                "parallel": parallel
+            }
+        )
+        assert response.status_code == 200
+        assert response.headers["content-type"] == "application/x-ndjson"
+        lines = [json.loads(line) for line in response.text.splitlines()]
+        assert [line["workflow_id"] for line in lines] == \
+            [test_workflow_data["workflow_id"], missing_workflow_id, chain_workflow.id]
+        assert [node["id"] for node in lines[0]["nodes"]] == [
+            test_workflow_data["start_node"],
+            test_workflow_data["msg_node1"],
+            test_workflow_data["condition_node1"],
+            test_workflow_data["condition_node2"],
+            test_workflow_data["msg_node3"],
+            test_workflow_data["end_node"],
+        ]
+        assert lines[1] == {"workflow_id": missing_workflow_id, "error": "Workflow not found"}
+        assert len(lines[2]["nodes"]) == 8
+
+    def test_worker_process_failure(self, client: TestClient, session: Session, workflow_factory, monkeypatch):
+        def submit_plans(workflows_plans, limits=None):
+            future = Future()
+            future.set_exception(BrokenProcessPool("A process in the process pool was terminated abruptly"))
+            return {plan.workflow_id: process_runs.ProcessRun(future, 0) for plan in workflows_plans}
+
+        monkeypatch.setattr(settings, "BULK_RUN_PROCESSES", 2)
+        monkeypatch.setattr(process_runs, "submit_plans", submit_plans)
+        workflow_ids = [workflow_factory(3).id, workflow_factory(3).id]
+        response = client.post(
+            app.url_path_for("run_workflows_bulk"),
+            json={"workflow_ids": workflow_ids, "parallel": True}
+        )
+        assert response.status_code == 200
+        # Every Workflow gets its line
+        assert [json.loads(line) for line in response.text.splitlines()] == [
+            {
+                "workflow_id": workflow_id,
+                "error": "Run failed in worker process: A process in the process pool was terminated abruptly"
+            }
+            for workflow_id in workflow_ids
+        ]
+
+    @pytest.mark.parametrize("parallel, processes", [(False, 0), (True, 2)])
+    def test_limits(
+        self,
+        client: TestClient,
+        session: Session,
+        test_workflow_data,
+        workflow_factory,
+        process_pool,
+        monkeypatch,
+        parallel,
+        processes
+    ):
+        monkeypatch.setattr(settings, "BULK_RUN_PROCESSES", processes)
+        chain_workflow = workflow_factory(3)
+        response = client.post(
+            app.url_path_for("run_workflows_bulk"),
+            json={"workflow_ids": [test_workflow_data["workflow_id"], chain_workflow.id], "parallel": parallel},
+            params={"max_steps": 6}
+        )
+        assert response.status_code == 200
+        lines = [json.loads(line) for line in response.text.splitlines()]
+        assert len(lines[0]["nodes"]) == 6
+        assert lines[1] == {"workflow_id": chain_workflow.id, "error": "Run exceeded limit of 6 steps"}
+
+        response = client.post(
+            app.url_path_for("run_workflows_bulk"),
+            json={"workflow_ids": [chain_workflow.id]},
+            params={"max_steps": settings.RUN_MAX_STEPS + 1}
+        )
+        assert response.status_code == 422
+
 
 class TestCreateNode:
     def test_success(self, client: TestClient, session: Session, test_workflow):
@@ -96,6 +685,30 @@ class TestCreateNode:
         assert response.status_code == 201
         assert response.json() == {"id": node.id, "type": "start"}
 
+    @pytest.mark.parametrize("node_type", ["start", "end"])
+    def test_single_start_end(self, client: TestClient, session: Session, test_workflow_data, node_type):
+        response = client.post(
+            app.url_path_for("create_node"),
+            json={"workflow_id": test_workflow_data["workflow_id"], "type": node_type}
+        )
+        assert response.status_code == 400
+        assert response.json() == {"detail": f"Only one {node_type.title()} Node allowed in single workflow."}
+
+        # Other Workflows have their own Start and End Nodes
+        workflow_obj = models.Workflow(name="Other")
+        session.add(workflow_obj)
+        session.commit()
+        response = client.post(app.url_path_for("create_node"), json={"workflow_id": workflow_obj.id, "type": node_type})
+        assert response.status_code == 201
+
+    def test_invalid_expression(self, client: TestClient, session: Session, test_workflow):
+        response = client.post(
+            app.url_path_for("create_node"),
+            json={"workflow_id": test_workflow.id, "type": "condition", "expression": 'status == "sent'}
+        )
+        assert response.status_code == 400
+        assert response.json()["detail"].startswith("Invalid expression: ")
+
 
 class TestUpdateNode:
     def test_success(self, client: TestClient, session: Session, test_workflow):
@@ -118,6 +731,14 @@ class TestUpdateNode:
             "text": "new"
         }
 
+    def test_invalid_expression(self, client: TestClient, session: Session, test_workflow_data):
+        node_id = test_workflow_data["condition_node1"]
+        response = client.patch(app.url_path_for("update_node", node_id=node_id), json={"expression": "status =="})
+        assert response.status_code == 400
+        assert response.json()["detail"].startswith("Invalid expression: ")
+        session.expire_all()
+        assert session.get(models.Condition, node_id).expression == 'status == "sent"'
+
 
 class TestDeleteNode:
     def test_success(self, client: TestClient, session: Session, test_workflow):
@@ -144,16 +765,152 @@ class TestCreateEdge:
         assert response.status_code == 201
         edge = session.query(models.Edge).first()
         assert response.json() == {"id": edge.id, "source_node_id": start_node.id, "target_node_id": end_node.id}
+        assert edge.workflow_id == test_workflow.id
+
+    def test_invalid(self, client: TestClient, session: Session, test_workflow_data):
+        response = client.post(app.url_path_for("create_edge"), json={
+            "source_node_id": test_workflow_data["msg_node2"],
+            "target_node_id": test_workflow_data["msg_node3"],
+        })
+        assert response.status_code == 400
+        assert response.json() == {"detail": "Message Node cannot have more than one target node"}
+
+        response = client.post(app.url_path_for("create_edge"), json={
+            "source_node_id": test_workflow_data["msg_node2"],
+            "target_node_id": test_workflow_data["msg_node2"] + 1000,
+        })
+        assert response.status_code == 404
+        assert response.json() == {"detail": "Node not found"}
+
+
+class TestCreateEdges:
+    def create_nodes(self, session: Session, workflow: models.Workflow) -> dict[str, models.Node]:
+        nodes = {
+            "start": models.Node(workflow_id=workflow.id, type="start"),
+            "msg": models.Node(workflow_id=workflow.id, type="message"),
+            "condition": models.Node(workflow_id=workflow.id, type="condition"),
+            "end": models.Node(workflow_id=workflow.id, type="end"),
+        }
+        session.add_all(nodes.values())
+        session.add_all([
+            models.Message(node=nodes["msg"], status=models.Message.MessageStatusEnum.sent, text="test"),
+            models.Condition(node=nodes["condition"], expression='status == "sent"'),
+        ])
+        session.commit()
+        return nodes
+
+    def test_success(self, client: TestClient, session: Session, test_workflow):
+        nodes = self.create_nodes(session, test_workflow)
+        edges = [
+            {"source_node_id": nodes["start"].id, "target_node_id": nodes["msg"].id},
+            {"source_node_id": nodes["msg"].id, "target_node_id": nodes["condition"].id},
+            {"source_node_id": nodes["condition"].id, "target_node_id": nodes["end"].id, "is_yes_condition": True},
+        ]
+        response = client.post(app.url_path_for("create_edges"), json={"edges": edges})
+        assert response.status_code == 201
+        edges_objs = session.query(models.Edge).order_by(models.Edge.id).all()
+        assert response.json() == [
+            {"id": edge.id, "source_node_id": edge.source_node_id, "target_node_id": edge.target_node_id}
+            for edge in edges_objs
+        ]
+        assert [(edge.source_node_id, edge.target_node_id) for edge in edges_objs] == \
+            [(edge["source_node_id"], edge["target_node_id"]) for edge in edges]
+        assert {edge.workflow_id for edge in edges_objs} == {test_workflow.id}
+        condition = session.get(models.Condition, nodes["condition"].id)
+        assert condition.yes_edge_id == edges_objs[2].id
+        assert condition.no_edge_id is None
+
+        response = client.get(app.url_path_for("run_workflow", workflow_id=test_workflow.id))
+        assert response.status_code == 200
+        assert [node["id"] for node in response.json()["nodes"]] == \
+            [nodes[key].id for key in ["start", "msg", "condition", "end"]]
+
+    def test_conflict_in_batch(self, client: TestClient, session: Session, test_workflow):
+        nodes = self.create_nodes(session, test_workflow)
+        response = client.post(app.url_path_for("create_edges"), json={"edges": [
+            {"source_node_id": nodes["start"].id, "target_node_id": nodes["msg"].id},
+            {"source_node_id": nodes["start"].id, "target_node_id": nodes["end"].id},
+        ]})
+        assert response.status_code == 400
+        assert response.json() == {"detail": "Start Node cannot have more than one target node"}
+        assert session.query(models.Edge).count() == 0
 
 
 class TestDeleteEdge:
     def test_success(self, client: TestClient, session: Session, test_workflow):
         start_node = models.Node(workflow_id=test_workflow.id, type="start")
         end_node = models.Node(workflow_id=test_workflow.id, type="end")
-        edge = models.Edge(source_node=start_node, target_node=end_node)
+        edge = models.Edge(workflow=test_workflow, source_node=start_node, target_node=end_node)
         session.add_all([start_node, end_node, edge])
         session.commit()
 
         response = client.delete(app.url_path_for("delete_edge", edge_id=edge.id))
         assert response.status_code == 204
         assert session.query(models.Edge).count() == 0
+
+
+class TestQueriesCount:
+    @pytest.mark.parametrize("endpoint", ["get_all_workflows", "get_workflow", "run_workflow"])
+    def test_constant_for_graph_size(self, client: TestClient, workflow_factory, queries_counter, endpoint):
+        queries_count = []
+        for size in [1, 5, 25]:
+            workflow = workflow_factory(size)
+            queries_counter.clear()
+            if endpoint == "get_all_workflows":
+                response = client.get(app.url_path_for(endpoint))
+            else:
+                response = client.get(app.url_path_for(endpoint, workflow_id=workflow.id))
+            assert response.status_code == 200
+            queries_count.append(len(queries_counter))
+        assert len(set(queries_count)) == 1
+
+
+class TestGetPoolsStats:
+    def test_success(self, client: TestClient):
+        response = client.get(app.url_path_for("get_pools_stats"))
+        assert response.status_code == 200
+        json = response.json()
+        assert set(json) == {"pid", "sync", "async"}
+        assert set(json["sync"]) == {
+            "size", "checked_in", "checked_out", "overflow", "checkouts", "timeouts",
+            "wait_time_total", "wait_time_max", "wait_time_avg"
+        }
+        assert json["sync"]["size"] == settings.DB_POOL_SIZE
+
+
+class TestGetMetrics:
+    def get_runs_count(self, outcome: str) -> float:
+        return REGISTRY.get_sample_value("workflow_runs_total", {"outcome": outcome}) or 0.0
+
+    def test_success(self, client: TestClient, session: Session, test_workflow_data):
+        runs_count = self.get_runs_count("success")
+        response = client.get(app.url_path_for("run_workflow", workflow_id=test_workflow_data["workflow_id"]))
+        assert response.status_code == 200
+        assert self.get_runs_count("success") == runs_count + 1
+
+        response = client.get(app.url_path_for("get_metrics"))
+        assert response.status_code == 200
+        assert response.headers["content-type"].startswith("text/plain")
+        assert 'http_request_duration_seconds_count{method="GET",route="/api/workflows/{workflow_id}/run",status="200"}' \
+            in response.text
+        assert "workflow_run_path_length_bucket" in response.text
+        assert "workflow_graph_nodes_bucket" in response.text
+        assert 'db_pool_connections{engine="sync",state="size"}' in response.text
+
+    def test_run_outcomes(self, client: TestClient, session: Session, test_workflow):
+        no_start_count = self.get_runs_count("no_start")
+        response = client.get(app.url_path_for("run_workflow", workflow_id=test_workflow.id))
+        assert response.status_code == 400
+        assert self.get_runs_count("no_start") == no_start_count + 1
+
+        # Start Node without Edge to End Node
+        session.add_all([
+            models.Node(workflow_id=test_workflow.id, type="start"),
+            models.Node(workflow_id=test_workflow.id, type="end"),
+        ])
+        test_workflow.version += 1
+        session.commit()
+        dead_end_count = self.get_runs_count("dead_end")
+        response = client.get(app.url_path_for("run_workflow", workflow_id=test_workflow.id))
+        assert response.status_code == 400
+        assert self.get_runs_count("dead_end") == dead_end_count + 1
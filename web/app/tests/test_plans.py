@@ -0,0 +1,78 @@
+import pytest
+
+from sqlalchemy.orm import Session
+
+from .. import models
+from .. import plans
+from .. import selectors
+from .. import utils
+
+
+def get_workflow_data(session: Session, workflow_id: int):
+    workflow_obj = session.get(models.Workflow, workflow_id)
+    graph = selectors.get_workflows_graphs([workflow_id], db=session, with_nodes_data=True)[workflow_id]
+    return workflow_obj, graph
+
+
+def test_find_plan_path_same_as_find_path(session: Session, test_workflow_data):
+    workflow_obj, graph = get_workflow_data(session, test_workflow_data["workflow_id"])
+    G = utils.build_graph(graph.nodes, graph.edges)
+    plan = plans.compile_plan(workflow_obj, nodes=graph.nodes, edges=graph.edges)
+
+    assert plan.start_node_id == test_workflow_data["start_node"]
+    assert plan.end_node_id == test_workflow_data["end_node"]
+    assert plans.find_plan_path(plan) == utils.find_path(
+        G,
+        start_node_id=test_workflow_data["start_node"],
+        end_node_id=test_workflow_data["end_node"]
+    )
+
+
+def test_find_plan_path_chain(session: Session, workflow_factory):
+    workflow_obj, graph = get_workflow_data(session, workflow_factory(50).id)
+    G = utils.build_graph(graph.nodes, graph.edges)
+    plan = plans.compile_plan(workflow_obj, nodes=graph.nodes, edges=graph.edges)
+
+    path = plans.find_plan_path(plan)
+    assert len(path) == 102
+    assert path == utils.find_path(G, start_node_id=plan.start_node_id, end_node_id=plan.end_node_id)
+
+
+def test_plan_cache(session: Session, test_workflow_data):
+    workflow_obj, graph = get_workflow_data(session, test_workflow_data["workflow_id"])
+    plan = plans.compile_plan(workflow_obj, nodes=graph.nodes, edges=graph.edges)
+    plan_cache = plans.PlanCache(maxsize=1)
+
+    plan_cache.set(plan)
+    assert plan_cache.get(plan.workflow_id, plan.version) is plan
+    assert plan_cache.get(plan.workflow_id, plan.version + 1) is None
+    assert len(plan_cache) == 0
+
+
+def test_find_plan_path_limits(session: Session, workflow_factory, monkeypatch):
+    workflow_obj, graph = get_workflow_data(session, workflow_factory(50).id)
+    plan = plans.compile_plan(workflow_obj, nodes=graph.nodes, edges=graph.edges)
+
+    assert len(plans.find_plan_path(plan, limits=plans.RunLimits(max_steps=102, max_duration=0))) == 102
+    with pytest.raises(plans.RunLimitExceededError, match="Run exceeded limit of 101 steps"):
+        plans.find_plan_path(plan, limits=plans.RunLimits(max_steps=101, max_duration=0))
+
+    monkeypatch.setattr(plans, "DURATION_CHECK_INTERVAL", 1)
+    with pytest.raises(plans.RunLimitExceededError, match="Run exceeded time limit"):
+        plans.find_plan_path(plan, limits=plans.RunLimits(max_steps=1000, max_duration=1e-9))
+
+
+def test_find_plan_path_cycle(session: Session, test_workflow_data):
+    workflow_obj, graph = get_workflow_data(session, test_workflow_data["workflow_id"])
+    # Message at the end of the path leads back to the first Message instead of End Node
+    edge = next(edge for edge in graph.edges if edge.source_node_id == test_workflow_data["msg_node3"])
+    edge.target_node_id = test_workflow_data["msg_node1"]
+    G = utils.build_graph(graph.nodes, graph.edges)
+    plan = plans.compile_plan(workflow_obj, nodes=graph.nodes, edges=graph.edges)
+
+    message = f"Path returns to the same state, run would never end. Node id: {test_workflow_data['msg_node1']}"
+    with pytest.raises(plans.CycleError) as exc_info:
+        plans.find_plan_path(plan)
+    assert str(exc_info.value) == message
+    with pytest.raises(ValueError, match=message):
+        utils.find_path(G, start_node_id=plan.start_node_id, end_node_id=plan.end_node_id)
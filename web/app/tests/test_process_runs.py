@@ -0,0 +1,91 @@
+import dataclasses
+import functools
+import os
+import pickle
+
+from concurrent.futures.process import BrokenProcessPool
+
+import pytest
+
+from benchmarks.workloads import SHAPES, WorkflowBuilder, build_models
+from .. import plans
+from .. import process_runs
+from ..config import settings
+
+
+def compile_document(document: dict, workflow_id: int = 1) -> plans.WorkflowPlan:
+    workflow, nodes, edges = build_models(document)
+    workflow.id = workflow_id
+    return plans.compile_plan(workflow, nodes=nodes, edges=edges)
+
+
+def generate_invalid_condition() -> dict:
+    builder = WorkflowBuilder(name="Invalid condition")
+    builder.add_edge("start", builder.add_message("msg0"))
+    builder.add_edge("msg0", builder.add_condition("condition0"))
+    builder.add_edge("condition0", "end")
+    document = builder.build()
+    document["nodes"][-1]["expression"] = "missing_field == 1"
+    return document
+
+
+@pytest.fixture(autouse=True)
+def clear_plan_caches():
+    # Packed plans are run in tests process, where every generated Workflow has the same ID and version
+    process_runs.packed_plan_cache.clear()
+    process_runs.worker_plan_cache.clear()
+
+
+@pytest.mark.parametrize("name", SHAPES)
+def test_run_packed_plans(name: str):
+    plan = compile_document(SHAPES[name](5))
+    packed_plan = pickle.loads(pickle.dumps(process_runs.pack_plan(plan)))
+
+    [(outcome, result, _)] = process_runs.run_packed_plans([packed_plan])
+    assert outcome == "success"
+    assert process_runs.unpack_path(plan, result) == plans.find_plan_path(plan)
+
+
+def test_run_packed_plans_error():
+    plan = compile_document(generate_invalid_condition())
+    with pytest.raises(plans.InvalidConditionError) as exc_info:
+        plans.find_plan_path(plan)
+
+    [(outcome, result, _)] = process_runs.run_packed_plans([process_runs.pack_plan(plan)])
+    assert outcome == "invalid_condition"
+    assert result == str(exc_info.value)
+
+
+def test_packed_plan_size():
+    plan = compile_document(SHAPES["chain"](100))
+    # Plan with all Nodes data, without parsed rules which cannot be sent
+    plan_data = dataclasses.replace(plan, node_indexes=dict(plan.node_indexes), rules=())
+    assert len(pickle.dumps(process_runs.pack_plan(plan))) < len(pickle.dumps(plan_data)) * 0.8
+
+
+def test_submit_plans(process_pool, monkeypatch):
+    monkeypatch.setattr(settings, "BULK_RUN_PROCESSES", 2)
+    workflows_plans = [compile_document(SHAPES[name](5), workflow_id=i) for i, name in enumerate(SHAPES, start=1)]
+    workflows_plans.append(compile_document(generate_invalid_condition(), workflow_id=len(workflows_plans) + 1))
+
+    runs = process_runs.submit_plans(workflows_plans, chunk_size=2)
+    assert list(runs) == [plan.workflow_id for plan in workflows_plans]
+    for plan in workflows_plans[:-1]:
+        outcome, result, _ = runs[plan.workflow_id].result()
+        assert outcome == "success"
+        assert process_runs.unpack_path(plan, result) == plans.find_plan_path(plan)
+    assert runs[workflows_plans[-1].workflow_id].result().outcome == "invalid_condition"
+
+
+def test_broken_executor_discarded(process_pool, monkeypatch):
+    monkeypatch.setattr(settings, "BULK_RUN_PROCESSES", 1)
+    executor = process_runs.get_process_executor()
+    future = executor.submit(os._exit, 1)
+    future.add_done_callback(functools.partial(process_runs.discard_broken_executor, executor))
+    with pytest.raises(BrokenProcessPool):
+        future.result()
+
+    # Next bulk run starts new pool
+    assert process_runs.get_process_executor() is not executor
+    plan = compile_document(SHAPES["chain"](5))
+    assert process_runs.submit_plans([plan])[plan.workflow_id].result().outcome == "success"
@@ -0,0 +1,73 @@
+import json
+import logging
+import pstats
+
+import pytest
+
+from fastapi import Depends, FastAPI
+from fastapi.testclient import TestClient
+from sqlalchemy.orm import Session
+
+from .. import models
+from .. import schemas
+from .. import selectors
+from .. import services
+from ..config import settings
+from ..db import get_db
+from ..profiling import setup_profiling
+
+
+@pytest.fixture(scope="function")
+def profiled_client(session: Session) -> TestClient:
+    """
+    Client of app with profiling enabled, serving Workflow run endpoint
+    """
+    profiled_app = FastAPI()
+    setup_profiling(profiled_app)
+
+    @profiled_app.get("/api/workflows/{workflow_id}/run")
+    def run_workflow(workflow_id: int, db: Session = Depends(get_db)) -> schemas.Graph:
+        workflow_obj = selectors.get_object_or_404(models.Workflow, object_id=workflow_id, db=db)
+        return {"workflow_id": workflow_id, "nodes": services.run_workflow(workflow_obj=workflow_obj, db=db)}
+
+    profiled_app.dependency_overrides[get_db] = lambda: session
+    return TestClient(app=profiled_app)
+
+
+def parse_server_timing(header: str) -> dict[str, dict[str, str]]:
+    metrics = {}
+    for metric in header.split(", "):
+        name, *params = metric.split(";")
+        metrics[name] = dict(param.split("=", 1) for param in params)
+    return metrics
+
+
+class TestProfiling:
+    def test_server_timing(self, profiled_client: TestClient, test_workflow_data):
+        response = profiled_client.get(f"/api/workflows/{test_workflow_data['workflow_id']}/run")
+        assert response.status_code == 200
+        metrics = parse_server_timing(response.headers["Server-Timing"])
+        assert set(metrics) == {"sql", "endpoint", "compile_plan", "find_path", "serialize", "total"}
+        # Workflow, its Nodes and Edges
+        assert metrics["sql"]["desc"] == '"3 statements"'
+        assert float(metrics["endpoint"]["dur"]) <= float(metrics["total"]["dur"])
+
+    def test_log(self, profiled_client: TestClient, test_workflow_data, caplog):
+        with caplog.at_level(logging.INFO, logger="app.profiling"):
+            profiled_client.get(f"/api/workflows/{test_workflow_data['workflow_id']}/run")
+        log_data = json.loads(caplog.records[-1].getMessage())
+        assert log_data["path"] == f"/api/workflows/{test_workflow_data['workflow_id']}/run"
+        assert log_data["status"] == 200
+        assert log_data["sql_count"] == 3
+        assert "find_path_ms" in log_data
+        assert "profile_path" not in log_data
+
+    def test_slow_request_stats(self, profiled_client: TestClient, test_workflow_data, caplog, monkeypatch, tmp_path):
+        monkeypatch.setattr(settings, "PROFILING_SAMPLE_RATE", 1.0)
+        monkeypatch.setattr(settings, "PROFILING_SLOW_REQUEST_MS", 0)
+        monkeypatch.setattr(settings, "PROFILING_DIR", str(tmp_path))
+        with caplog.at_level(logging.INFO, logger="app.profiling"):
+            profiled_client.get(f"/api/workflows/{test_workflow_data['workflow_id']}/run")
+        profile_path = json.loads(caplog.records[-1].getMessage())["profile_path"]
+        stats = pstats.Stats(profile_path)
+        assert any(function_name == "find_plan_path" for _, _, function_name in stats.stats)
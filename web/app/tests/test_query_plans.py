@@ -0,0 +1,15 @@
+from sqlalchemy.orm import Session
+
+from benchmarks.explain_queries import pin_planner, explain, get_hot_queries, get_unindexed_scans, seed_graphs
+
+
+def test_hot_queries_use_indexes(session: Session):
+    connection = session.connection()
+    # Small dataset is enough, as planner is pinned to use indexes wherever they can serve query
+    data = seed_graphs(connection, workflows_count=200, nodes_count=20)
+    pin_planner(connection)
+    unindexed_scans = {
+        name: get_unindexed_scans(connection, explain(connection, statement))
+        for name, statement in get_hot_queries(data).items()
+    }
+    assert unindexed_scans == {name: [] for name in unindexed_scans}
@@ -0,0 +1,41 @@
+from .. import response_cache
+
+
+def test_memory_cache_versions():
+    cache = response_cache.MemoryResponseCache(max_bytes=100)
+    cache.set("workflow", 1, 2, b"v2")
+    # Older version never replaces newer one
+    cache.set("workflow", 1, 1, b"v1")
+    assert cache.get("workflow", 1, 2) == b"v2"
+    assert cache.get("run", 1, 2) is None
+    assert cache.get("workflow", 1, 3) is None
+    assert len(cache) == 0
+
+
+def test_memory_cache_size_limit():
+    cache = response_cache.MemoryResponseCache(max_bytes=10)
+    cache.set("workflow", 1, 1, b"12345")
+    cache.set("workflow", 2, 1, b"12345")
+    cache.get("workflow", 1, 1)
+    cache.set("workflow", 3, 1, b"12345")
+    # The least recently used entry is evicted
+    assert cache.get("workflow", 2, 1) is None
+    assert cache.get("workflow", 1, 1) == b"12345"
+    assert cache.size == 10
+
+    cache.set("workflow", 4, 1, b"12345678901")
+    assert cache.get("workflow", 4, 1) is None
+
+
+def test_memory_cache_invalidate_and_ttl(monkeypatch):
+    cache = response_cache.MemoryResponseCache(max_bytes=100, ttl=60)
+    cache.set("workflow", 1, 1, b"workflow")
+    cache.set("run", 1, 1, b"run")
+    cache.set("run", 2, 1, b"run")
+    cache.invalidate(1)
+    assert len(cache) == 1
+    assert cache.size == 3
+
+    now = response_cache.time.monotonic()
+    monkeypatch.setattr(response_cache.time, "monotonic", lambda: now + 61)
+    assert cache.get("run", 2, 1) is None
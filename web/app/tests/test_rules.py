@@ -0,0 +1,28 @@
+import pytest
+import rule_engine
+
+from .. import models
+from ..rules import compile_rule, get_rules_cache_info, validate_expression
+
+
+def test_compile_rule():
+    compile_rule.cache_clear()
+    rule = compile_rule('status == "sent"')
+    assert isinstance(rule, rule_engine.Rule)
+    assert compile_rule('status == "sent"') is rule
+    assert get_rules_cache_info()["hits"] == 1
+    assert get_rules_cache_info()["misses"] == 1
+    assert get_rules_cache_info()["currsize"] == 1
+
+
+def test_validate_expression():
+    validate_expression('text == "hello"')
+    with pytest.raises(ValueError) as exception:
+        validate_expression('text == ')
+    assert str(exception.value).startswith("Invalid expression: ")
+
+
+def test_compile_rule_enum_value():
+    rule = compile_rule('status == "opened"')
+    assert rule.matches({"status": models.Message.MessageStatusEnum.opened})
+    assert not rule.matches({"status": models.Message.MessageStatusEnum.sent})
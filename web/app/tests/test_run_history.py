@@ -0,0 +1,142 @@
+import time
+
+import pytest
+
+from datetime import datetime, timedelta, timezone
+from prometheus_client import REGISTRY
+from sqlalchemy.orm import Session
+
+from .conftest import TestClient, TestSessionLocal
+from .. import models
+from .. import response_cache
+from .. import run_history
+from ..main import app
+
+
+def record_runs(workflow_id: int, started_at: datetime, count: int) -> None:
+    for i in range(count):
+        run_history.writer.record({
+            "workflow_id": workflow_id,
+            "version": 1,
+            "nodes_ids": [1, 2],
+            "error": None,
+            "duration_ms": 1.0,
+            "created_at": started_at + timedelta(minutes=i),
+        })
+    run_history.writer.flush()
+
+
+class TestRunHistory:
+    def test_recorded_runs(self, client: TestClient, session: Session, test_workflow_data):
+        workflow_id = test_workflow_data["workflow_id"]
+        run_url = app.url_path_for("run_workflow", workflow_id=workflow_id)
+        client.get(run_url)
+        client.get(run_url, params={"max_steps": 2})
+        # "What-if" runs are not recorded
+        client.post(
+            app.url_path_for("run_workflow_batch", workflow_id=workflow_id),
+            json={"runs": [{"statuses": {test_workflow_data["msg_node1"]: "pending"}}]}
+        )
+        assert len(run_history.writer) == 2
+        assert run_history.writer.flush() == 2
+
+        response = client.get(app.url_path_for("get_run_history", workflow_id=workflow_id))
+        assert response.status_code == 200
+        failed_run, run = response.json()
+        assert failed_run["error"] == "Run exceeded limit of 2 steps"
+        assert "nodes_ids" not in failed_run
+        assert run["version"] == 1
+        assert run["nodes_ids"] == [
+            test_workflow_data["start_node"],
+            test_workflow_data["msg_node1"],
+            test_workflow_data["condition_node1"],
+            test_workflow_data["condition_node2"],
+            test_workflow_data["msg_node3"],
+            test_workflow_data["end_node"],
+        ]
+        assert run["duration_ms"] >= 0
+
+    @pytest.mark.parametrize("path_evicted", [False, True])
+    def test_cached_runs(self, client: TestClient, session: Session, test_workflow_data, path_evicted):
+        workflow_id = test_workflow_data["workflow_id"]
+        run_url = app.url_path_for("run_workflow", workflow_id=workflow_id)
+        response = client.get(run_url)
+        if path_evicted:
+            response_cache.backend.invalidate(workflow_id)
+            response_cache.backend.set("run", workflow_id, 1, response.content)
+        runs_count = REGISTRY.get_sample_value("workflow_runs_total", {"outcome": "success"})
+
+        # Runs served from cache are recorded too
+        assert client.get(run_url).content == response.content
+        assert REGISTRY.get_sample_value("workflow_runs_total", {"outcome": "success"}) == runs_count + 1
+        assert run_history.writer.flush() == 2
+        response = client.get(app.url_path_for("get_run_history", workflow_id=workflow_id))
+        cached_run, run = response.json()
+        assert cached_run["version"] == 1
+        assert cached_run["nodes_ids"] == run["nodes_ids"]
+        assert len(cached_run["nodes_ids"]) == 6
+
+    def test_pagination(self, client: TestClient, session: Session):
+        started_at = datetime(2026, 1, 1, tzinfo=timezone.utc)
+        record_runs(1, started_at=started_at, count=5)
+        record_runs(2, started_at=started_at, count=1)
+        url = app.url_path_for("get_run_history", workflow_id=1)
+
+        first_page = client.get(url, params={"limit": 2}).json()
+        assert [run["created_at"] for run in first_page] == ["2026-01-01T00:04:00Z", "2026-01-01T00:03:00Z"]
+        next_page = client.get(url, params={"limit": 2, "before_id": first_page[-1]["id"]}).json()
+        assert [run["created_at"] for run in next_page] == ["2026-01-01T00:02:00Z", "2026-01-01T00:01:00Z"]
+
+        runs = client.get(url, params={
+            "since": (started_at + timedelta(minutes=1)).isoformat(),
+            "until": (started_at + timedelta(minutes=3)).isoformat(),
+        }).json()
+        assert [run["created_at"] for run in runs] == ["2026-01-01T00:02:00Z", "2026-01-01T00:01:00Z"]
+
+    def test_writer_batches(self, session: Session, queries_counter):
+        writer = run_history.RunHistoryWriter(
+            session_factory=TestSessionLocal,
+            batch_size=3,
+            flush_interval=60,
+            max_pending=4
+        )
+        writer.start()
+        try:
+            for i in range(3):
+                writer.record({
+                    "workflow_id": 1,
+                    "version": 1,
+                    "nodes_ids": None,
+                    "error": "Error",
+                    "duration_ms": 1.0,
+                    "created_at": datetime.now(timezone.utc),
+                })
+            for _ in range(100):
+                if session.query(models.RunHistory).count() == 3:
+                    break
+                time.sleep(0.05)
+            assert session.query(models.RunHistory).count() == 3
+            # Rows of batch are inserted by single statement
+            assert len([statement for statement in queries_counter if statement.startswith("INSERT")]) == 1
+        finally:
+            writer.stop(timeout=5)
+
+    def test_writer_max_pending(self, session: Session):
+        writer = run_history.RunHistoryWriter(
+            session_factory=TestSessionLocal,
+            batch_size=10,
+            flush_interval=60,
+            max_pending=2
+        )
+        for _ in range(3):
+            writer.record({
+                "workflow_id": 1,
+                "version": 1,
+                "nodes_ids": None,
+                "error": "Error",
+                "duration_ms": 1.0,
+                "created_at": datetime.now(timezone.utc),
+            })
+        assert len(writer) == 2
+        assert writer.flush() == 2
+        assert session.query(models.RunHistory).count() == 2
@@ -0,0 +1,182 @@
+import time
+
+import pytest
+
+from datetime import timedelta
+from sqlalchemy import func, select, update
+from sqlalchemy.orm import Session
+
+from .conftest import TestClient, TestSessionLocal
+from .. import models
+from .. import run_jobs
+from .. import services
+from ..config import settings
+from ..main import app
+
+
+@pytest.fixture(params=["postgres", "memory"])
+def job_queue(request, monkeypatch) -> run_jobs.RunJobQueue:
+    job_queue = run_jobs.PostgresRunJobQueue() if request.param == "postgres" else run_jobs.MemoryRunJobQueue()
+    monkeypatch.setattr(run_jobs, "queue", job_queue)
+    return job_queue
+
+
+def get_run_job(client: TestClient, session: Session, run_job_id: int) -> dict:
+    # Job is updated by worker session
+    session.expire_all()
+    response = client.get(app.url_path_for("get_run_job", run_job_id=run_job_id))
+    assert response.status_code == 200
+    return response.json()
+
+
+class TestRunJobs:
+    def test_workflow_run_job(self, client: TestClient, session: Session, test_workflow_data, job_queue):
+        workflow_id = test_workflow_data["workflow_id"]
+        response = client.post(app.url_path_for("create_workflow_run_job", workflow_id=workflow_id))
+        assert response.status_code == 202
+        job = response.json()
+        assert job["status"] == "queued"
+        assert job["workflow_ids"] == [workflow_id]
+        assert response.headers["Location"] == app.url_path_for("get_run_job", run_job_id=job["id"])
+        assert get_run_job(client, session, job["id"])["status"] == "queued"
+
+        assert run_jobs.process_next_job(TestSessionLocal)
+        assert not run_jobs.process_next_job(TestSessionLocal)
+        job = get_run_job(client, session, job["id"])
+        assert job["status"] == "done"
+        assert job["started_at"] <= job["finished_at"]
+        [run] = job["runs"]
+        assert run["workflow_id"] == workflow_id
+        assert [node["id"] for node in run["nodes"]] == [
+            test_workflow_data["start_node"],
+            test_workflow_data["msg_node1"],
+            test_workflow_data["condition_node1"],
+            test_workflow_data["condition_node2"],
+            test_workflow_data["msg_node3"],
+            test_workflow_data["end_node"],
+        ]
+
+    def test_bulk_run_job(self, client: TestClient, session: Session, workflow_factory, job_queue):
+        chain_workflow = workflow_factory(3)
+        missing_workflow_id = chain_workflow.id + 1000
+        response = client.post(
+            app.url_path_for("create_run_job"),
+            json={"workflow_ids": [chain_workflow.id, missing_workflow_id]}
+        )
+        assert response.status_code == 202
+
+        assert run_jobs.process_next_job(TestSessionLocal)
+        runs = get_run_job(client, session, response.json()["id"])["runs"]
+        assert len(runs[0]["nodes"]) == 8
+        assert runs[1] == {"workflow_id": missing_workflow_id, "error": "Workflow not found"}
+
+    def test_failed_job(self, client: TestClient, session: Session, test_workflow_data, job_queue, monkeypatch):
+        def run_workflows_bulk(*args, **kwargs):
+            raise RuntimeError("Connection lost")
+
+        monkeypatch.setattr(services, "run_workflows_bulk", run_workflows_bulk)
+        response = client.post(
+            app.url_path_for("create_workflow_run_job", workflow_id=test_workflow_data["workflow_id"])
+        )
+        assert run_jobs.process_next_job(TestSessionLocal)
+        job = get_run_job(client, session, response.json()["id"])
+        assert job["status"] == "failed"
+        assert job["error"] == "Connection lost"
+        assert "runs" not in job
+
+    def test_not_found(self, client: TestClient, session: Session):
+        response = client.post(app.url_path_for("create_workflow_run_job", workflow_id=1))
+        assert response.status_code == 404
+        assert response.json() == {"detail": "Workflow not found"}
+        response = client.get(app.url_path_for("get_run_job", run_job_id=1))
+        assert response.status_code == 404
+        assert response.json() == {"detail": "RunJob not found"}
+
+    def test_skip_locked(self, client: TestClient, session: Session, test_workflow_data):
+        job_queue = run_jobs.PostgresRunJobQueue()
+        first_job = run_jobs.create_job([test_workflow_data["workflow_id"]], db=session)
+        second_job = run_jobs.create_job([test_workflow_data["workflow_id"]], db=session)
+
+        # Job locked by another worker is skipped
+        with TestSessionLocal() as db:
+            db.execute(select(models.RunJob).filter(models.RunJob.id == first_job.id).with_for_update())
+            assert job_queue.claim(TestSessionLocal, timeout=0).id == second_job.id
+            assert job_queue.claim(TestSessionLocal, timeout=0) is None
+        assert job_queue.claim(TestSessionLocal, timeout=0).id == first_job.id
+
+    def test_reclaim_expired_lease(self, client: TestClient, session: Session, test_workflow_data, monkeypatch):
+        job_queue = run_jobs.PostgresRunJobQueue()
+        job_obj = run_jobs.create_job([test_workflow_data["workflow_id"]], db=session)
+        stopped_job = job_queue.claim(TestSessionLocal, timeout=0)
+        assert stopped_job.id == job_obj.id
+        # Job is not claimed again while its lease is valid
+        assert job_queue.claim(TestSessionLocal, timeout=0) is None
+
+        # Worker stopped without renewing lease
+        session.execute(
+            update(models.RunJob)
+            .filter(models.RunJob.id == job_obj.id)
+            .values(lease_expires_at=func.now() - timedelta(seconds=1))
+        )
+        session.commit()
+        job = job_queue.claim(TestSessionLocal, timeout=0)
+        assert job.id == job_obj.id
+        assert job.started_at > stopped_job.started_at
+        assert not run_jobs.renew_lease(stopped_job, TestSessionLocal)
+        assert run_jobs.renew_lease(job, TestSessionLocal)
+
+        run_jobs.execute_job(job, TestSessionLocal)
+        assert get_run_job(client, session, job_obj.id)["status"] == "done"
+
+        # Results of worker which lost the job are not saved
+        def run_workflows_bulk(*args, **kwargs):
+            raise RuntimeError("Connection lost")
+
+        monkeypatch.setattr(services, "run_workflows_bulk", run_workflows_bulk)
+        run_jobs.execute_job(stopped_job, TestSessionLocal)
+        assert get_run_job(client, session, job_obj.id)["status"] == "done"
+
+    def test_lease_renewed(self, client: TestClient, session: Session, test_workflow_data, monkeypatch):
+        monkeypatch.setattr(settings, "RUN_JOBS_LEASE_SECONDS", 0.3)
+        job_queue = run_jobs.PostgresRunJobQueue()
+        run_jobs.create_job([test_workflow_data["workflow_id"]], db=session)
+        job = job_queue.claim(TestSessionLocal, timeout=0)
+        with run_jobs.keep_lease(job, TestSessionLocal):
+            time.sleep(1)
+            # Lease of running job is renewed, so it is not claimed again
+            assert job_queue.claim(TestSessionLocal, timeout=0) is None
+
+        time.sleep(0.5)
+        assert job_queue.claim(TestSessionLocal, timeout=0).id == job.id
+
+    @pytest.mark.parametrize("queue_name, in_api, started", [
+        ("postgres", False, False),
+        ("postgres", True, True),
+        ("memory", False, True),
+    ])
+    def test_start_workers(self, monkeypatch, queue_name, in_api, started):
+        monkeypatch.setattr(settings, "RUN_JOBS_QUEUE", queue_name)
+        monkeypatch.setattr(settings, "RUN_JOBS_IN_API", in_api)
+        monkeypatch.setattr(run_jobs, "queue", run_jobs.MemoryRunJobQueue())
+        monkeypatch.setattr(run_jobs, "get_session_factory", lambda: TestSessionLocal)
+        run_jobs.start_workers()
+        try:
+            assert (run_jobs.workers is not None) == started
+        finally:
+            run_jobs.stop_workers()
+
+    def test_workers(self, client: TestClient, session: Session, test_workflow_data, job_queue):
+        workers = run_jobs.RunJobWorkers(job_queue, session_factory=TestSessionLocal, workers_count=2)
+        workers.start()
+        try:
+            response = client.post(
+                app.url_path_for("create_workflow_run_job", workflow_id=test_workflow_data["workflow_id"])
+            )
+            for _ in range(100):
+                job = get_run_job(client, session, response.json()["id"])
+                if job["status"] == "done":
+                    break
+                time.sleep(0.05)
+            assert job["status"] == "done"
+        finally:
+            workers.stop(timeout=5)
@@ -0,0 +1,55 @@
+from ..models import Node
+from ..validation import EdgeChange, add_edges, add_node, remove_edge, validate_graph
+
+
+def test_valid_graph():
+    nodes = [(1, Node.NodeTypeEnum.start), (2, Node.NodeTypeEnum.condition), (3, Node.NodeTypeEnum.end)]
+    edges = [(1, 1, 2), (2, 2, 3)]
+    assert validate_graph(nodes, edges, conditions=[(2, 2, None)]) == {
+        "errors": [],
+        "warnings": [{"code": "incomplete_condition", "message": "Condition Node 2 has no 'no' edge"}]
+    }
+
+
+def test_unguarded_cycle():
+    nodes = [
+        (1, Node.NodeTypeEnum.start),
+        (2, Node.NodeTypeEnum.message),
+        (3, Node.NodeTypeEnum.condition),
+        (4, Node.NodeTypeEnum.message),
+        (5, Node.NodeTypeEnum.message),
+        (6, Node.NodeTypeEnum.end),
+    ]
+    # 2 -> 3 -> 2 is guarded by Condition, 4 -> 5 -> 4 is not
+    edges = [(1, 1, 2), (2, 2, 3), (3, 3, 2), (4, 3, 4), (5, 4, 5), (6, 5, 4)]
+    summary = validate_graph(nodes, edges, conditions=[(3, 3, 4)])
+    assert summary["errors"] == [{"code": "end_unreachable", "message": "End Node is not reachable from Start Node"}]
+    assert summary["warnings"] == [{"code": "unguarded_cycle", "message": "Cycle without Condition Node: 4, 5"}]
+
+
+def test_incremental_changes():
+    nodes = [(1, Node.NodeTypeEnum.start), (2, Node.NodeTypeEnum.condition)]
+    edges = [(1, 1, 2)]
+    summary = validate_graph(nodes, edges, conditions=[(2, None, None)])
+
+    nodes.append((3, Node.NodeTypeEnum.end))
+    summary = add_node(summary, 3, Node.NodeTypeEnum.end)
+    assert summary == validate_graph(nodes, edges, conditions=[(2, None, None)])
+
+    # End Node may become reachable, so whole graph has to be validated
+    edge = EdgeChange(2, Node.NodeTypeEnum.condition, Node.NodeTypeEnum.end, target_has_targets=False, branch="yes")
+    assert add_edges(summary, [edge]) is None
+    edges.append((2, 2, 3))
+    summary = validate_graph(nodes, edges, conditions=[(2, 2, None)])
+
+    nodes.append((4, Node.NodeTypeEnum.message))
+    summary = add_node(summary, 4, Node.NodeTypeEnum.message)
+    edge = EdgeChange(2, Node.NodeTypeEnum.condition, Node.NodeTypeEnum.message, target_has_targets=False, branch="no")
+    summary = add_edges(summary, [edge])
+    edges.append((3, 2, 4))
+    assert summary == validate_graph(nodes, edges, conditions=[(2, 2, 3)])
+
+    # Removed Edge may be in path to End Node
+    edge = EdgeChange(1, Node.NodeTypeEnum.start, Node.NodeTypeEnum.condition, target_has_targets=True)
+    assert remove_edge(summary, edge) is None
+    assert add_node(None, 5, Node.NodeTypeEnum.message) is None
@@ -0,0 +1,24 @@
+import pytest
+
+from fastapi.testclient import TestClient
+
+from benchmarks.workloads import SHAPES, build_models
+from .. import plans
+from .. import utils
+from ..main import app
+
+
+@pytest.mark.parametrize("shape", SHAPES)
+def test_workload_runs(client: TestClient, shape: str):
+    document = SHAPES[shape](3)
+    workflow, nodes, edges = build_models(document)
+    plan = plans.compile_plan(workflow, nodes=nodes, edges=edges)
+    path = utils.find_path(utils.build_graph(nodes, edges), plan.start_node_id, plan.end_node_id)
+    assert plans.find_plan_path(plan) == path
+
+    response = client.post(app.url_path_for("import_workflow"), json=document)
+    assert response.status_code == 201
+    workflow_id = response.json()["id"]
+    response = client.get(app.url_path_for("run_workflow", workflow_id=workflow_id))
+    assert response.status_code == 200
+    assert len(response.json()["nodes"]) == len(path)
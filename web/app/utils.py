@@ -1,22 +1,94 @@
+from typing import Iterable, Optional
+
 import networkx as nx
-import rule_engine
 
 from . import models
+from .rules import compile_rule
+
+
+def get_workflow_etag(workflow: models.Workflow) -> str:
+    """
+    Returns strong ETag of Workflow data, changed by every mutation of its graph (which bumps version)
+    """
+    return f'"{workflow.id}-{workflow.version}"'
+
+
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    """
+    Checks whether `If-None-Match` header value matches ETag (weak comparison, as required for the header)
+    """
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+    return any(tag.strip().removeprefix("W/") == etag for tag in if_none_match.split(","))
+
+
+def get_node_data(node: models.Node, edges_targets: dict[int, int]) -> dict[any, any]:
+    """
+    Collects Node data used during Workflow run.
+
+    Args:
+        node: Node with loaded Message and Condition data.
+        edges_targets: Mapping of Workflow Edges IDs to their target Node IDs.
+    """
+    # Every ORM attribute is read once, reads are the main cost of compiling large Workflows
+    node_type = node.type
+    node_data = {"id": node.id, "type": node_type}
+    if node_type == models.Node.NodeTypeEnum.message:
+        message = node.message
+        node_data["status"] = message.status
+        node_data["text"] = message.text
+    elif node_type == models.Node.NodeTypeEnum.condition:
+        condition = node.condition
+        node_data["expression"] = condition.expression
+        node_data["yes_node_id"] = edges_targets.get(condition.yes_edge_id)
+        node_data["no_node_id"] = edges_targets.get(condition.no_edge_id)
+    return node_data
+
+
+def build_graph(nodes: Iterable[models.Node], edges: Iterable[models.Edge]) -> nx.DiGraph:
+    """
+    Converts Workflow Nodes and Edges (ordered by creation time) into DiGraph
+    """
+    G = nx.DiGraph()
+    edges = list(edges)
+    edges_targets = {edge.id: edge.target_node_id for edge in edges}
+    for node in nodes:
+        G.add_node(node.id, **get_node_data(node, edges_targets))
+    for edge in edges:
+        G.add_edge(edge.source_node_id, edge.target_node_id)
+    return G
 
 
-def find_path(G: nx.DiGraph, start_node_id: int, end_node_id: int) -> list[dict[any, any]]:
+def find_path(
+    G: nx.DiGraph,
+    start_node_id: int,
+    end_node_id: int,
+    max_steps: Optional[int] = None
+) -> list[dict[any, any]]:
     """
-    Go through the graph and find the path to end node
+    Go through the graph and find the path to end node, fails if path returns to the same state
+    or gets longer than `max_steps`
     """
     path = []
+    visited_states = set()
     previous_message_node_id = None
     current_node_id = start_node_id
 
     while True:
         path.append(current_node_id)
+        if max_steps is not None and len(path) > max_steps:
+            raise ValueError(f"Run exceeded limit of {max_steps} steps")
         if current_node_id == end_node_id:
             break  # End of graph
 
+        # Next Node is determined by current Node and preceding Message only
+        state = (current_node_id, previous_message_node_id)
+        if state in visited_states:
+            raise ValueError(f"Path returns to the same state, run would never end. Node id: {current_node_id}")
+        visited_states.add(state)
+
         successors = list(G.successors(current_node_id))
         if not successors:
             raise ValueError(f"No end node at the end of the path or edge missing. Node id: {current_node_id}")
@@ -29,7 +101,7 @@ def find_path(G: nx.DiGraph, start_node_id: int, end_node_id: int) -> list[dict[
             # Handle Condition logic
             if previous_message_node_id is None:
                 raise ValueError(f"No message found for condition with ID of {neighbor_node_id}")
-            rule = rule_engine.Rule(node_data["expression"])
+            rule = compile_rule(node_data["expression"])
             previous_message_data = G.nodes[previous_message_node_id]
             try:
                 rule_match = rule.matches(previous_message_data)
@@ -51,3 +123,4 @@ def find_path(G: nx.DiGraph, start_node_id: int, end_node_id: int) -> list[dict[
     for node_id in path:
         result.append(G.nodes[node_id])
     return result
+
@@ -0,0 +1,173 @@
+"""
+Validation of Workflow graph structure, stored on Workflow as summary and kept up to date by every graph change.
+
+Errors make every run of Workflow fail, so runs of Workflow with errors are rejected without loading its graph.
+Warnings only make some runs fail, depending on Message statuses (e.g. Condition without "no" edge).
+
+Most changes update stored summary without loading graph (`add_node`, `add_edges`, `remove_edge`), whole graph
+is only validated (`validate_graph`) when change can affect reachability of End Node or cycles.
+"""
+from collections import defaultdict
+from typing import Iterable, NamedTuple, Optional
+
+import networkx as nx
+
+from . import models
+
+
+Summary = dict[str, list[dict[str, str]]]
+
+
+def get_issue(code: str, message: str) -> dict[str, str]:
+    return {"code": code, "message": message}
+
+
+def get_errors(has_start: bool, has_end: bool, end_reachable: bool) -> list[dict[str, str]]:
+    errors = []
+    if not has_start:
+        errors.append(get_issue("no_start", "Workflow has no Start Node"))
+    if not has_end:
+        errors.append(get_issue("no_end", "Workflow has no End Node"))
+    if has_start and has_end and not end_reachable:
+        errors.append(get_issue("end_unreachable", "End Node is not reachable from Start Node"))
+    return errors
+
+
+def get_incomplete_condition_issues(node_id: int, branches: Iterable[str] = ("yes", "no")) -> list[dict[str, str]]:
+    return [
+        get_issue("incomplete_condition", f"Condition Node {node_id} has no '{branch}' edge") for branch in branches
+    ]
+
+
+def has_issue(issues: list[dict[str, str]], code: str) -> bool:
+    return any(issue["code"] == code for issue in issues)
+
+
+def validate_graph(
+    nodes: Iterable[tuple[int, models.Node.NodeTypeEnum]],
+    edges: Iterable[tuple[int, int, int]],
+    conditions: Iterable[tuple[int, Optional[int], Optional[int]]],
+) -> Summary:
+    """
+    Validates structure of Workflow graph.
+
+    Args:
+        nodes: ID and type of every Workflow Node.
+        edges: ID, source and target Node IDs of every Workflow Edge.
+        conditions: Node ID, "yes" and "no" Edge IDs of every Workflow Condition.
+
+    Returns:
+        Validation summary with lists of errors and warnings, each of them with code and message.
+    """
+    G = nx.DiGraph()
+    nodes_by_type = defaultdict(list)
+    for node_id, node_type in nodes:
+        G.add_node(node_id, type=node_type)
+        nodes_by_type[node_type].append(node_id)
+    edges_ids = set()
+    for edge_id, source_node_id, target_node_id in edges:
+        G.add_edge(source_node_id, target_node_id)
+        edges_ids.add(edge_id)
+
+    start_nodes = nodes_by_type[models.Node.NodeTypeEnum.start]
+    end_nodes = nodes_by_type[models.Node.NodeTypeEnum.end]
+    errors = get_errors(
+        has_start=bool(start_nodes),
+        has_end=bool(end_nodes),
+        end_reachable=bool(start_nodes and end_nodes) and end_nodes[0] in nx.descendants(G, start_nodes[0])
+    )
+
+    warnings = []
+    for node_id, yes_edge_id, no_edge_id in sorted(conditions):
+        warnings += get_incomplete_condition_issues(
+            node_id,
+            branches=[
+                branch for branch, edge_id in (("yes", yes_edge_id), ("no", no_edge_id)) if edge_id not in edges_ids
+            ]
+        )
+
+    # Only Conditions can lead out of cycle, run entering cycle without them never ends
+    unguarded_subgraph = G.subgraph(
+        node_id for node_id, node_type in G.nodes(data="type") if node_type != models.Node.NodeTypeEnum.condition
+    )
+    for component in sorted(map(sorted, nx.strongly_connected_components(unguarded_subgraph))):
+        if len(component) > 1:
+            nodes_ids = ", ".join(map(str, component))
+            warnings.append(get_issue("unguarded_cycle", f"Cycle without Condition Node: {nodes_ids}"))
+    return {"errors": errors, "warnings": warnings}
+
+
+def add_node(summary: Optional[Summary], node_id: int, node_type: models.Node.NodeTypeEnum) -> Optional[Summary]:
+    """
+    Returns summary of Workflow after adding Node (without Edges yet), None if Workflow was not validated yet.
+
+    Node IDs grow, so warnings of new Condition follow warnings of existing ones, as in `validate_graph`.
+    """
+    if summary is None:
+        return None
+    errors = summary["errors"]
+    warnings = summary["warnings"]
+    has_start = not has_issue(errors, "no_start")
+    has_end = not has_issue(errors, "no_end")
+    if node_type in (models.Node.NodeTypeEnum.start, models.Node.NodeTypeEnum.end):
+        # New Start or End Node has no Edges, so End Node cannot be reached
+        errors = get_errors(
+            has_start=has_start or node_type == models.Node.NodeTypeEnum.start,
+            has_end=has_end or node_type == models.Node.NodeTypeEnum.end,
+            end_reachable=False
+        )
+    elif node_type == models.Node.NodeTypeEnum.condition:
+        conditions_count = sum(warning["code"] == "incomplete_condition" for warning in warnings)
+        warnings = warnings[:conditions_count] + get_incomplete_condition_issues(node_id) + warnings[conditions_count:]
+    return {"errors": errors, "warnings": warnings}
+
+
+class EdgeChange(NamedTuple):
+    source_node_id: int
+    source_type: models.Node.NodeTypeEnum
+    target_type: models.Node.NodeTypeEnum
+    # Whether target Node links other Nodes, Edge to Node without targets cannot close cycle
+    target_has_targets: bool
+    # "yes" or "no" for Edge of Condition
+    branch: Optional[str] = None
+
+    @property
+    def is_unguarded(self) -> bool:
+        return models.Node.NodeTypeEnum.condition not in (self.source_type, self.target_type)
+
+
+def add_edges(summary: Optional[Summary], edges: Iterable[EdgeChange]) -> Optional[Summary]:
+    """
+    Returns summary of Workflow after adding Edges, None if whole graph has to be validated.
+
+    Added Edges can only make End Node reachable (checked only if it is not) and create cycles
+    (only possible between Nodes other than Conditions, when target Node links other Nodes).
+    """
+    if summary is None or has_issue(summary["errors"], "end_unreachable"):
+        return None
+    completed_issues = []
+    for edge in edges:
+        if edge.is_unguarded and edge.target_has_targets:
+            return None
+        if edge.branch is not None:
+            completed_issues += get_incomplete_condition_issues(edge.source_node_id, branches=[edge.branch])
+    return {
+        "errors": summary["errors"],
+        "warnings": [warning for warning in summary["warnings"] if warning not in completed_issues],
+    }
+
+
+def remove_edge(summary: Optional[Summary], edge: EdgeChange) -> Optional[Summary]:
+    """
+    Returns summary of Workflow after removing Edge, None if whole graph has to be validated.
+
+    Removed Edge can make reachable End Node unreachable, break cycle or leave Condition incomplete.
+    """
+    if summary is None:
+        return None
+    # Condition which Edge is removed may lose its "yes" or "no" Edge
+    if not summary["errors"] or edge.source_type == models.Node.NodeTypeEnum.condition:
+        return None
+    if edge.is_unguarded and has_issue(summary["warnings"], "unguarded_cycle"):
+        return None
+    return summary
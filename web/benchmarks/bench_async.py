@@ -0,0 +1,96 @@
+"""
+Compares requests per second of sync (`app.main:app`) and async (`app.async_main:app`) API at high concurrency.
+
+Both apps are started with uvicorn against database from `DB_URL`, benchmark Workflow (chain from `workloads`)
+is created with import endpoint.
+
+Usage (from `web` directory):
+    python -m benchmarks.bench_async --concurrency 200 --duration 10
+"""
+import argparse
+import asyncio
+import subprocess
+import sys
+import time
+
+import httpx
+
+from .workloads import generate_chain
+
+
+APPS = {
+    "sync": "app.main:app",
+    "async": "app.async_main:app",
+}
+
+
+def start_server(app: str, port: int) -> subprocess.Popen:
+    server = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", app, "--port", str(port), "--log-level", "warning"],
+    )
+    for _ in range(100):
+        try:
+            httpx.get(f"http://127.0.0.1:{port}/docs")
+            return server
+        except httpx.TransportError:
+            time.sleep(0.1)
+    server.terminate()
+    raise RuntimeError(f"Server of {app} did not start")
+
+
+async def load(base_url: str, paths: list[str], concurrency: int, duration: float) -> tuple[int, int]:
+    """
+    Sends requests from `concurrency` workers for `duration` seconds, returns number of successful and failed requests
+    """
+    succeeded = 0
+    failed = 0
+    deadline = time.perf_counter() + duration
+
+    async def worker(client: httpx.AsyncClient, worker_id: int) -> None:
+        nonlocal succeeded, failed
+        i = worker_id
+        while time.perf_counter() < deadline:
+            try:
+                response = await client.get(paths[i % len(paths)])
+                if response.status_code == 200:
+                    succeeded += 1
+                else:
+                    failed += 1
+            except httpx.HTTPError:
+                failed += 1
+            i += 1
+
+    limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+    async with httpx.AsyncClient(base_url=base_url, limits=limits, timeout=60) as client:
+        await asyncio.gather(*(worker(client, worker_id) for worker_id in range(concurrency)))
+    return succeeded, failed
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--concurrency", type=int, default=200, help="Number of concurrent requests")
+    parser.add_argument("--duration", type=float, default=10, help="Duration of load per app, seconds")
+    parser.add_argument("--messages", type=int, default=50, help="Number of Messages in benchmark Workflow")
+    parser.add_argument("--port", type=int, default=8100, help="Port of the first started server")
+    args = parser.parse_args()
+
+    print(f"Concurrency {args.concurrency}, {args.duration}s per app")
+    print(f"{'app':<8}{'requests/s':>12}{'failed':>10}")
+    for port, (name, app) in enumerate(APPS.items(), start=args.port):
+        server = start_server(app, port)
+        try:
+            base_url = f"http://127.0.0.1:{port}"
+            response = httpx.post(f"{base_url}/api/workflows/import", json=generate_chain(args.messages))
+            response.raise_for_status()
+            workflow_id = response.json()["id"]
+            paths = [f"/api/workflows/{workflow_id}/run", f"/api/workflows/{workflow_id}"]
+            succeeded, failed = asyncio.run(load(base_url, paths, args.concurrency, args.duration))
+            print(f"{name:<8}{succeeded / args.duration:>12.1f}{failed:>10}")
+            httpx.delete(f"{base_url}/api/workflows/{workflow_id}")
+        finally:
+            server.terminate()
+            server.wait()
+
+
+if __name__ == "__main__":
+    main()
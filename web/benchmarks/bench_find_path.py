@@ -0,0 +1,108 @@
+"""
+Compares Workflow run through networkx DiGraph (`utils.find_path`) with compiled plan (`plans.find_plan_path`).
+
+Usage (from `web` directory):
+    python -m benchmarks.bench_find_path --nodes 10000
+
+Chain of 10k Nodes, best of 50 runs (single CPU, timings vary by about 20% between runs):
+    networkx build + find_path      ~110 ms, 8.5 MiB peak
+    networkx find_path               ~32 ms, 883 KiB peak
+    plan compile + find_plan_path    ~80 ms, 3.9 MiB peak
+    plan find_plan_path (cached)     ~24 ms, 877 KiB peak
+Peak memory of run itself is the same for both (path and visited states), plan only saves building DiGraph.
+Compiling is dominated by reads of ORM attributes, so each of them is read once.
+"""
+import argparse
+import time
+import tracemalloc
+
+from app import models
+from app import plans
+from app import utils
+
+
+def generate_chain(nodes_count: int) -> tuple[models.Workflow, list[models.Node], list[models.Edge]]:
+    """
+    Generates in-memory Workflow with chain of Message and Condition Nodes, run goes through every Node
+    """
+    workflow = models.Workflow(id=1, name="Benchmark", version=1)
+    start_node = models.Node(id=1, workflow_id=1, type=models.Node.NodeTypeEnum.start)
+    nodes = [start_node]
+    edges = []
+
+    def add_edge(source_node: models.Node, target_node: models.Node) -> models.Edge:
+        edge = models.Edge(id=len(edges) + 1, workflow_id=1, source_node_id=source_node.id, target_node_id=target_node.id)
+        edges.append(edge)
+        return edge
+
+    previous_node = start_node
+    for _ in range((nodes_count - 2) // 2):
+        msg_node = models.Node(id=len(nodes) + 1, workflow_id=1, type=models.Node.NodeTypeEnum.message)
+        msg_node.message = models.Message(status=models.Message.MessageStatusEnum.sent, text="Hello")
+        condition_node = models.Node(id=len(nodes) + 2, workflow_id=1, type=models.Node.NodeTypeEnum.condition)
+        condition_node.condition = models.Condition(expression='text == "Hello"')
+        nodes += [msg_node, condition_node]
+        edge = add_edge(previous_node, msg_node)
+        if previous_node.type == models.Node.NodeTypeEnum.condition:
+            previous_node.condition.yes_edge_id = edge.id
+        add_edge(msg_node, condition_node)
+        previous_node = condition_node
+
+    end_node = models.Node(id=len(nodes) + 1, workflow_id=1, type=models.Node.NodeTypeEnum.end)
+    nodes.append(end_node)
+    edge = add_edge(previous_node, end_node)
+    if previous_node.type == models.Node.NodeTypeEnum.condition:
+        previous_node.condition.yes_edge_id = edge.id
+        previous_node.condition.no_edge_id = edge.id
+    return workflow, nodes, edges
+
+
+def measure(func, repeat: int) -> tuple[float, int]:
+    """
+    Returns best wall time (seconds) and peak of allocated memory (bytes) of single call
+    """
+    timings = []
+    for _ in range(repeat):
+        started_at = time.perf_counter()
+        func()
+        timings.append(time.perf_counter() - started_at)
+
+    tracemalloc.start()
+    func()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return min(timings), peak
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--nodes", type=int, default=10_000, help="Number of Nodes in generated Workflow")
+    parser.add_argument("--repeat", type=int, default=20, help="Number of timed runs of each case")
+    args = parser.parse_args()
+
+    workflow, nodes, edges = generate_chain(args.nodes)
+    G = utils.build_graph(nodes, edges)
+    plan = plans.compile_plan(workflow, nodes=nodes, edges=edges)
+    start_node_id, end_node_id = plan.start_node_id, plan.end_node_id
+    assert plans.find_plan_path(plan) == utils.find_path(G, start_node_id, end_node_id)
+
+    cases = {
+        # What every run did before plans: build DiGraph and walk it
+        "networkx build + find_path": lambda: utils.find_path(
+            utils.build_graph(nodes, edges), start_node_id, end_node_id
+        ),
+        "networkx find_path": lambda: utils.find_path(G, start_node_id, end_node_id),
+        "plan compile + find_plan_path": lambda: plans.find_plan_path(
+            plans.compile_plan(workflow, nodes=nodes, edges=edges)
+        ),
+        "plan find_plan_path (cached)": lambda: plans.find_plan_path(plan),
+    }
+    print(f"Workflow with {len(nodes)} nodes and {len(edges)} edges, best of {args.repeat} runs")
+    print(f"{'case':<32}{'time, ms':>12}{'peak memory, KiB':>20}")
+    for name, func in cases.items():
+        seconds, peak = measure(func, repeat=args.repeat)
+        print(f"{name:<32}{seconds * 1000:>12.2f}{peak / 1024:>20.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,119 @@
+"""
+Measures how bulk run of many compiled Workflow plans scales with number of worker processes (`process_runs`),
+compared to running them in one thread and on thread pool of the same size.
+
+Every Workflow is generated in memory (shape from `workloads`) with its own ID, so every plan is sent to workers.
+Cold run is the first run of pool which workers are already started, so it includes unpacking plans and
+parsing Condition expressions, warm runs reuse plans packed by benchmark process and unpacked by workers
+(as long as number of Workflows does not exceed `PLAN_CACHE_SIZE`).
+
+Usage (from `web` directory):
+    python -m benchmarks.bench_processes --workflows 500 --size 200 --processes 1 2 4 8 16 32
+"""
+import argparse
+import os
+import pickle
+import time
+
+from concurrent.futures import ThreadPoolExecutor
+
+from app import plans
+from app import process_runs
+from app.config import settings
+
+from .workloads import SHAPES, build_models
+
+
+def compile_plans(shape: str, size: int, workflows_count: int) -> list[plans.WorkflowPlan]:
+    workflow, nodes, edges = build_models(SHAPES[shape](size))
+    workflows_plans = []
+    for workflow_id in range(1, workflows_count + 1):
+        workflow.id = workflow_id
+        workflows_plans.append(plans.compile_plan(workflow, nodes=nodes, edges=edges))
+    return workflows_plans
+
+
+def run_in_processes(workflows_plans: list[plans.WorkflowPlan], chunk_size: int) -> list[list[dict]]:
+    runs = process_runs.submit_plans(workflows_plans, chunk_size=chunk_size)
+    return [process_runs.unpack_path(plan, runs[plan.workflow_id].result().result) for plan in workflows_plans]
+
+
+def measure(func, repeat: int) -> tuple[float, float]:
+    """
+    Returns wall time (seconds) of the first call and best time of next `repeat` calls
+    """
+    started_at = time.perf_counter()
+    func()
+    cold = time.perf_counter() - started_at
+    timings = []
+    for _ in range(repeat):
+        started_at = time.perf_counter()
+        func()
+        timings.append(time.perf_counter() - started_at)
+    return cold, min(timings)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--shape", choices=SHAPES, default="chain", help="Shape of generated Workflows")
+    parser.add_argument("--size", type=int, default=200, help="Size parameter of Workflow shape")
+    parser.add_argument("--workflows", type=int, default=500, help="Number of Workflows run at once")
+    parser.add_argument(
+        "--processes",
+        type=int,
+        nargs="+",
+        default=sorted({1, 2, 4, 8, 16, 32, os.cpu_count()}),
+        help="Numbers of worker processes to measure"
+    )
+    parser.add_argument(
+        "--chunk-size",
+        type=int,
+        default=settings.BULK_RUN_CHUNK_SIZE,
+        help="Max number of plans sent at once"
+    )
+    parser.add_argument("--repeat", type=int, default=5, help="Number of warm runs of each case")
+    args = parser.parse_args()
+
+    workflows_plans = compile_plans(args.shape, args.size, args.workflows)
+    expected_paths = [plans.find_plan_path(plan) for plan in workflows_plans]
+    packed_size = len(pickle.dumps(process_runs.pack_plan(workflows_plans[0])))
+    print(
+        f"{args.workflows} Workflows ({args.shape}, {len(workflows_plans[0].nodes)} nodes, "
+        f"{packed_size} bytes packed), {os.cpu_count()} CPUs, chunks of {args.chunk_size} plans"
+    )
+    print(f"{'case':<20}{'cold, ms':>12}{'warm, ms':>12}{'speedup':>10}{'efficiency':>12}")
+
+    _, serial_seconds = measure(lambda: [plans.find_plan_path(plan) for plan in workflows_plans], repeat=args.repeat)
+    print(f"{'serial':<20}{'':>12}{serial_seconds * 1000:>12.1f}{1:>10.2f}{1:>12.0%}")
+
+    for processes in args.processes:
+        with ThreadPoolExecutor(max_workers=processes) as executor:
+            _, seconds = measure(lambda: list(executor.map(plans.find_plan_path, workflows_plans)), repeat=args.repeat)
+        speedup = serial_seconds / seconds
+        print(
+            f"{f'{processes} threads':<20}{'':>12}{seconds * 1000:>12.1f}"
+            f"{speedup:>10.2f}{speedup / processes:>12.0%}"
+        )
+
+        settings.BULK_RUN_PROCESSES = processes
+        try:
+            # Workers are started before measuring
+            list(process_runs.get_process_executor().map(time.sleep, [0.1] * processes))
+            assert run_in_processes(workflows_plans, args.chunk_size) == expected_paths
+            process_runs.shutdown_process_executor()
+            list(process_runs.get_process_executor().map(time.sleep, [0.1] * processes))
+            cold_seconds, seconds = measure(
+                lambda: run_in_processes(workflows_plans, args.chunk_size),
+                repeat=args.repeat
+            )
+        finally:
+            process_runs.shutdown_process_executor()
+        speedup = serial_seconds / seconds
+        print(
+            f"{f'{processes} processes':<20}{cold_seconds * 1000:>12.1f}{seconds * 1000:>12.1f}"
+            f"{speedup:>10.2f}{speedup / processes:>12.0%}"
+        )
+
+
+if __name__ == "__main__":
+    main()
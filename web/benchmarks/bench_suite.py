@@ -0,0 +1,285 @@
+"""
+Benchmark suite of Workflow run engine, services and API on synthetic Workflows.
+
+For every Workflow shape from `workloads` measures:
+    engine: `utils.find_path` and `plans.find_plan_path` on in-memory Workflow,
+    service: `services.run_workflow` with cold and cached plan,
+    api: GET and POST endpoints called through ASGI app.
+
+Every case reports latency percentiles, peak of allocated memory and number of SQL statements per call.
+Results are written to JSON file, pass file of previous run as `--compare` to print the difference.
+Service and API cases use database from `DB_URL`, generated Workflows are deleted at the end.
+
+Usage (from `web` directory):
+    python -m benchmarks.bench_suite --output results.json
+    python -m benchmarks.bench_suite --output new.json --compare results.json
+"""
+import argparse
+import json
+import platform
+import statistics
+import subprocess
+import time
+import tracemalloc
+
+from datetime import datetime, timezone
+from typing import Any, Callable, Optional
+
+from fastapi.testclient import TestClient
+from sqlalchemy import event
+
+from app import db
+from app import models
+from app import plans
+from app import schemas
+from app import services
+from app import utils
+from app.main import app as main_app
+
+from .workloads import SHAPES, build_models
+
+
+class StatementsCounter:
+    """
+    Counts SQL statements executed by app DB engine
+    """
+
+    def __init__(self) -> None:
+        self.count = 0
+
+    def __enter__(self) -> "StatementsCounter":
+        event.listen(db.engine, "before_cursor_execute", self.before_cursor_execute)
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        event.remove(db.engine, "before_cursor_execute", self.before_cursor_execute)
+
+    def before_cursor_execute(self, *args) -> None:
+        self.count += 1
+
+
+def measure(
+    func: Callable[[Any], Any],
+    iterations: int,
+    warmup: int,
+    setup: Callable[[], Any] = lambda: None,
+) -> dict:
+    """
+    Calls `func` with result of `setup` (not measured) and collects latency, allocations and SQL statements.
+
+    Returns:
+        Latency percentiles in milliseconds, peak of allocated memory of single call and
+        median number of SQL statements per call.
+    """
+    for _ in range(warmup):
+        func(setup())
+
+    timings = []
+    statements = []
+    for _ in range(iterations):
+        args = setup()
+        with StatementsCounter() as counter:
+            started_at = time.perf_counter()
+            func(args)
+            timings.append((time.perf_counter() - started_at) * 1000)
+        statements.append(counter.count)
+
+    args = setup()
+    tracemalloc.start()
+    func(args)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    percentiles = statistics.quantiles(timings, n=100, method="inclusive")
+    return {
+        "iterations": iterations,
+        "latency_ms": {
+            "min": min(timings),
+            "mean": statistics.fmean(timings),
+            "p50": percentiles[49],
+            "p90": percentiles[89],
+            "p99": percentiles[98],
+            "max": max(timings),
+        },
+        "alloc_peak_kib": peak / 1024,
+        "sql_statements": statistics.median(statements),
+    }
+
+
+def bench_engine(document: dict, iterations: int, warmup: int) -> dict[str, dict]:
+    workflow, nodes, edges = build_models(document)
+    G = utils.build_graph(nodes, edges)
+    plan = plans.compile_plan(workflow, nodes=nodes, edges=edges)
+    start_node_id, end_node_id = plan.start_node_id, plan.end_node_id
+    return {
+        "find_path": measure(
+            lambda _: utils.find_path(G, start_node_id, end_node_id), iterations=iterations, warmup=warmup
+        ),
+        "build_graph + find_path": measure(
+            lambda _: utils.find_path(utils.build_graph(nodes, edges), start_node_id, end_node_id),
+            iterations=iterations,
+            warmup=warmup
+        ),
+        "find_plan_path": measure(lambda _: plans.find_plan_path(plan), iterations=iterations, warmup=warmup),
+    }
+
+
+def bench_service(workflow_id: int, iterations: int, warmup: int) -> dict[str, dict]:
+    # Every call gets Workflow loaded in new session, previous session is closed outside of measured call
+    sessions = []
+
+    def get_workflow(cold: bool) -> tuple:
+        while sessions:
+            sessions.pop().close()
+        if cold:
+            plans.plan_cache.invalidate(workflow_id)
+        session = db.SessionLocal()
+        sessions.append(session)
+        return session.get(models.Workflow, workflow_id), session
+
+    def run_workflow(args: tuple) -> None:
+        workflow_obj, session = args
+        services.run_workflow(workflow_obj=workflow_obj, db=session)
+
+    try:
+        return {
+            "run_workflow (cold plan)": measure(
+                run_workflow, iterations=iterations, warmup=warmup, setup=lambda: get_workflow(cold=True)
+            ),
+            "run_workflow (cached plan)": measure(
+                run_workflow, iterations=iterations, warmup=warmup, setup=lambda: get_workflow(cold=False)
+            ),
+        }
+    finally:
+        while sessions:
+            sessions.pop().close()
+
+
+def bench_api(client: TestClient, workflow_id: int, message_node_id: int, iterations: int, warmup: int) -> dict[str, dict]:
+    runs = {"runs": [{"statuses": {}}, {"statuses": {message_node_id: "pending"}}] * 5}
+    created_workflows_ids = []
+
+    def request(method: str, path: str, json: Optional[dict] = None) -> Callable[[Any], Any]:
+        def send(_) -> None:
+            response = client.request(method, path, json=json)
+            response.raise_for_status()
+            if method == "POST" and path == "/api/workflows":
+                created_workflows_ids.append(response.json()["id"])
+        return send
+
+    try:
+        return {
+            f"GET /api/workflows/{{id}}": measure(
+                request("GET", f"/api/workflows/{workflow_id}"), iterations=iterations, warmup=warmup
+            ),
+            f"GET /api/workflows/{{id}}/run": measure(
+                request("GET", f"/api/workflows/{workflow_id}/run"), iterations=iterations, warmup=warmup
+            ),
+            f"POST /api/workflows/{{id}}/runs": measure(
+                request("POST", f"/api/workflows/{workflow_id}/runs", json=runs), iterations=iterations, warmup=warmup
+            ),
+            "GET /api/workflows": measure(
+                request("GET", f"/api/workflows?after_id={workflow_id - 1}&limit=1"), iterations=iterations, warmup=warmup
+            ),
+            "POST /api/workflows": measure(
+                request("POST", "/api/workflows", json={"name": "Benchmark"}), iterations=iterations, warmup=warmup
+            ),
+        }
+    finally:
+        for created_workflow_id in created_workflows_ids:
+            client.delete(f"/api/workflows/{created_workflow_id}")
+
+
+def get_git_commit() -> Optional[str]:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "HEAD"], capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def compare(results: list[dict], baseline: list[dict]) -> None:
+    """
+    Prints median latency and SQL statements of cases present in both runs
+    """
+    baseline_cases = {(result["group"], result["shape"], result["case"]): result for result in baseline}
+    print(f"{'case':<48}{'p50 before':>12}{'p50 after':>12}{'change':>10}{'SQL':>10}")
+    for result in results:
+        previous = baseline_cases.get((result["group"], result["shape"], result["case"]))
+        if previous is None:
+            continue
+        before = previous["latency_ms"]["p50"]
+        after = result["latency_ms"]["p50"]
+        change = (after - before) / before * 100 if before else 0.0
+        statements = f"{previous['sql_statements']:g}->{result['sql_statements']:g}"
+        print(f"{result['shape'] + ' ' + result['case']:<48}{before:>12.3f}{after:>12.3f}{change:>+9.1f}%{statements:>10}")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--chain", type=int, default=500, help="Number of Messages in chain Workflow")
+    parser.add_argument("--tree-depth", type=int, default=8, help="Depth of Conditions tree Workflow")
+    parser.add_argument("--fan-in", type=int, default=500, help="Number of edges to End Node of fan-in Workflow")
+    parser.add_argument("--iterations", type=int, default=50, help="Number of measured calls of each case")
+    parser.add_argument("--warmup", type=int, default=3, help="Number of calls of each case before measuring")
+    parser.add_argument("--no-db", action="store_true", help="Only run engine cases, without database")
+    parser.add_argument("--output", default="benchmark-results.json", help="Path of JSON file with results")
+    parser.add_argument("--compare", help="Path of JSON file with results of previous run")
+    args = parser.parse_args()
+
+    sizes = {"chain": args.chain, "tree": args.tree_depth, "fan_in": args.fan_in}
+    results = []
+    client = TestClient(main_app)
+    for shape, size in sizes.items():
+        document = SHAPES[shape](size)
+        shape_info = {"shape": shape, "size": size, "nodes": len(document["nodes"]), "edges": len(document["edges"])}
+        print(f"{shape}: {shape_info['nodes']} nodes, {shape_info['edges']} edges")
+        groups = {"engine": bench_engine(document, iterations=args.iterations, warmup=args.warmup)}
+        if not args.no_db:
+            session = db.SessionLocal()
+            try:
+                workflow_obj, nodes_ids = services.import_workflow(schemas.WorkflowInImport(**document), db=session)
+                workflow_id = workflow_obj.id
+            finally:
+                session.close()
+            message_node_id = next(
+                nodes_ids[node["id"]] for node in document["nodes"] if node["type"] == "message"
+            )
+            try:
+                groups["service"] = bench_service(workflow_id, iterations=args.iterations, warmup=args.warmup)
+                groups["api"] = bench_api(
+                    client, workflow_id, message_node_id, iterations=args.iterations, warmup=args.warmup
+                )
+            finally:
+                client.delete(f"/api/workflows/{workflow_id}")
+
+        for group, cases in groups.items():
+            for case, measurement in cases.items():
+                results.append({"group": group, "case": case, **shape_info, **measurement})
+                print(
+                    f"  {group:<8}{case:<36}p50 {measurement['latency_ms']['p50']:>9.3f} ms"
+                    f"  p99 {measurement['latency_ms']['p99']:>9.3f} ms"
+                    f"  {measurement['alloc_peak_kib']:>10.1f} KiB  {measurement['sql_statements']:g} SQL"
+                )
+
+    with open(args.output, "w") as file:
+        json.dump({
+            "meta": {
+                "created_at": datetime.now(timezone.utc).isoformat(),
+                "git_commit": get_git_commit(),
+                "python": platform.python_version(),
+                "platform": platform.platform(),
+                "args": vars(args),
+            },
+            "results": results,
+        }, file, indent=2)
+    print(f"Results written to {args.output}")
+
+    if args.compare:
+        with open(args.compare) as file:
+            compare(results, json.load(file)["results"])
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,232 @@
+"""
+Checks query plans of hot queries against large synthetic dataset.
+
+Workflows with chains of Nodes are seeded in transaction which is rolled back at the end, so benchmark
+can be run against any database with applied migrations. Every hot query is explained with seeded IDs
+and benchmark fails if any of them reads table without index: uses sequential scan, or scans whole index
+which leading column is not in index condition.
+
+Sequential scans, hash and merge joins are disabled for explained queries (`pin_planner`), so tables are only
+read without index by queries which no index can serve, regardless of dataset size. With `--planner-choice`
+plans are left to planner, which prefers sequential scans of small tables: with default cost settings seeded
+dataset must have at least about 2500 Workflows of 20 Nodes (50k Nodes), smaller ones read Messages and
+Conditions with sequential scan.
+
+Usage (from `web` directory):
+    python -m benchmarks.explain_queries --workflows 10000 --nodes 20 --verbose
+"""
+import argparse
+import json
+import re
+import sys
+
+from typing import NamedTuple
+
+from sqlalchemy import Connection, Executable, create_engine, or_, select, text
+from sqlalchemy.orm import joinedload
+
+from app import models
+from app.config import settings
+
+
+class SeededData(NamedTuple):
+    workflow_ids: list[int]
+    node_ids: list[int]
+    edge_id: int
+
+
+def seed_graphs(connection: Connection, workflows_count: int, nodes_count: int) -> SeededData:
+    """
+    Inserts Workflows with chain of `nodes_count` Nodes (Start, Message and Condition Nodes in turns, End)
+    and updates tables statistics.
+
+    Statistics are updated after every insert, otherwise seeding itself may be planned for empty tables.
+
+    Returns:
+        IDs of few Workflows, Nodes and Edge from the middle of seeded data to use in queries.
+    """
+    workflow_ids = connection.execute(
+        text("INSERT INTO workflow (name) SELECT 'Explain ' || i FROM generate_series(1, :count) i RETURNING id"),
+        {"count": workflows_count}
+    ).scalars().all()
+    seeded = {"first_id": min(workflow_ids), "last_id": max(workflow_ids)}
+    connection.execute(text("ANALYZE workflow"))
+    connection.execute(text("""
+        INSERT INTO node (workflow_id, type)
+        SELECT workflow.id, (CASE
+            WHEN position = 0 THEN 'start'
+            WHEN position = :count - 1 THEN 'end'
+            WHEN position % 2 = 1 THEN 'message'
+            ELSE 'condition'
+        END)::nodetypeenum
+        FROM workflow CROSS JOIN generate_series(0, :count - 1) position
+        WHERE workflow.id BETWEEN :first_id AND :last_id
+        ORDER BY workflow.id, position
+    """), {**seeded, "count": nodes_count})
+    connection.execute(text("ANALYZE node"))
+    connection.execute(text("""
+        INSERT INTO edge (workflow_id, source_node_id, target_node_id)
+        SELECT workflow_id, id, next_id FROM (
+            SELECT workflow_id, id, lead(id) OVER (PARTITION BY workflow_id ORDER BY id) next_id
+            FROM node WHERE workflow_id BETWEEN :first_id AND :last_id
+        ) chain
+        WHERE next_id IS NOT NULL
+    """), seeded)
+    connection.execute(text("ANALYZE edge"))
+    connection.execute(text("""
+        INSERT INTO message (node_id, status, text)
+        SELECT id, 'sent', 'Message ' || id FROM node
+        WHERE workflow_id BETWEEN :first_id AND :last_id AND type = 'message'
+    """), seeded)
+    connection.execute(text("""
+        INSERT INTO condition (node_id, expression, yes_edge_id)
+        SELECT node.id, 'status == "sent"', edge.id FROM node JOIN edge ON edge.source_node_id = node.id
+        WHERE node.workflow_id BETWEEN :first_id AND :last_id AND node.type = 'condition'
+    """), seeded)
+    connection.execute(text("ANALYZE message"))
+    connection.execute(text("ANALYZE condition"))
+
+    sample_workflow_ids = workflow_ids[len(workflow_ids) // 2:][:3]
+    node_ids = connection.execute(
+        select(models.Node.id)
+        .where(models.Node.workflow_id == sample_workflow_ids[0])
+        .order_by(models.Node.id)
+        .limit(2)
+    ).scalars().all()
+    edge_id = connection.execute(
+        select(models.Edge.id).where(models.Edge.source_node_id == node_ids[0])
+    ).scalar_one()
+    return SeededData(workflow_ids=sample_workflow_ids, node_ids=node_ids, edge_id=edge_id)
+
+
+def pin_planner(connection: Connection) -> None:
+    """
+    Makes planner avoid sequential scans, hash and merge joins (which read whole joined table) until the end
+    of transaction, so queries are planned as for large tables. Must be called after tables are analyzed.
+    """
+    for setting in ["enable_seqscan", "enable_hashjoin", "enable_mergejoin"]:
+        connection.execute(text(f"SET LOCAL {setting} = off"))
+
+
+def get_hot_queries(data: SeededData) -> dict[str, Executable]:
+    """
+    Queries executed on every run, listing or change of Workflow, see `selectors` and `services`
+    """
+    return {
+        # Graphs loading in `selectors.get_workflows_graphs`
+        "workflows nodes": select(models.Node)
+            .options(joinedload(models.Node.message), joinedload(models.Node.condition))
+            .where(models.Node.workflow_id.in_(data.workflow_ids))
+            .order_by(models.Node.id),
+        "workflows edges": select(models.Edge)
+            .where(models.Edge.workflow_id.in_(data.workflow_ids))
+            .order_by(models.Edge.created_at, models.Edge.id),
+        # Check of single Start and End Node of Workflow in `services.create_node`
+        "workflow node by type": select(models.Node)
+            .where(models.Node.workflow_id == data.workflow_ids[0], models.Node.type == models.Node.NodeTypeEnum.start)
+            .limit(1),
+        # Outgoing Edges of linked Nodes in `services.create_edge` and `services.create_edges`
+        "nodes outgoing edges": select(models.Edge.source_node_id, models.Edge.target_node_id)
+            .where(models.Edge.source_node_id.in_(data.node_ids)),
+        # Cascade of Node deletion
+        "node incoming edges": select(models.Edge.id)
+            .where(models.Edge.target_node_id == data.node_ids[1]),
+        # Setting NULL on Edge deletion
+        "edge conditions": select(models.Condition.node_id)
+            .where(or_(models.Condition.yes_edge_id == data.edge_id, models.Condition.no_edge_id == data.edge_id)),
+    }
+
+
+def explain(connection: Connection, statement: Executable) -> dict:
+    """
+    Returns plan of statement in JSON format, parameters are rendered inline as in executed query
+    """
+    sql = statement.compile(dialect=connection.dialect, compile_kwargs={"literal_binds": True})
+    plan = connection.exec_driver_sql(f"EXPLAIN (FORMAT JSON) {sql}".replace("%", "%%")).scalar_one()
+    if isinstance(plan, str):
+        plan = json.loads(plan)
+    return plan[0]["Plan"]
+
+
+def get_scans(plan: dict) -> list[tuple[str, str]]:
+    """
+    Returns type and relation of every scan in the plan
+    """
+    scans = []
+    if "Relation Name" in plan:
+        scans.append((plan["Node Type"], plan["Relation Name"]))
+    for subplan in plan.get("Plans", []):
+        scans += get_scans(subplan)
+    return scans
+
+
+def get_leading_column(connection: Connection, index_name: str) -> str:
+    return connection.execute(
+        text("""
+            SELECT attribute.attname FROM pg_index
+            JOIN pg_class ON pg_class.oid = pg_index.indexrelid
+            JOIN pg_attribute attribute
+                ON attribute.attrelid = pg_index.indrelid AND attribute.attnum = pg_index.indkey[0]
+            WHERE pg_class.relname = :index_name
+        """),
+        {"index_name": index_name}
+    ).scalar_one()
+
+
+def get_unindexed_scans(connection: Connection, plan: dict) -> list[str]:
+    """
+    Returns relations (or indexes) read without index: with sequential scan, or with scan of whole index
+    which leading column is not used by index condition
+    """
+    unindexed_scans = []
+    if plan["Node Type"] == "Seq Scan":
+        unindexed_scans.append(plan["Relation Name"])
+    elif "Index Name" in plan:
+        leading_column = get_leading_column(connection, plan["Index Name"])
+        if not re.search(rf"\b{leading_column}\b", plan.get("Index Cond", "")):
+            unindexed_scans.append(plan["Index Name"])
+    for subplan in plan.get("Plans", []):
+        unindexed_scans += get_unindexed_scans(connection, subplan)
+    return unindexed_scans
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--workflows", type=int, default=10000, help="Number of seeded Workflows")
+    parser.add_argument("--nodes", type=int, default=20, help="Number of Nodes in every seeded Workflow")
+    parser.add_argument("--verbose", action="store_true", help="Print full plan of every query")
+    parser.add_argument(
+        "--planner-choice",
+        action="store_true",
+        help="Do not pin planner, requires large enough dataset (see above)"
+    )
+    args = parser.parse_args()
+
+    engine = create_engine(settings.DB_URL)
+    failed = []
+    with engine.connect() as connection:
+        try:
+            data = seed_graphs(connection, workflows_count=args.workflows, nodes_count=args.nodes)
+            print(f"Seeded {args.workflows} Workflows with {args.nodes} Nodes")
+            if not args.planner_choice:
+                pin_planner(connection)
+            print(f"{'query':<24}{'status':<10}scans")
+            for name, statement in get_hot_queries(data).items():
+                plan = explain(connection, statement)
+                unindexed_scans = get_unindexed_scans(connection, plan)
+                if unindexed_scans:
+                    failed.append(name)
+                scans = ", ".join(f"{node_type} on {relation}" for node_type, relation in get_scans(plan))
+                print(f"{name:<24}{'NO INDEX' if unindexed_scans else 'OK':<10}{scans}")
+                if args.verbose:
+                    print(json.dumps(plan, indent=2))
+        finally:
+            connection.rollback()
+
+    if failed:
+        print(f"Table read without index in: {', '.join(failed)}")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
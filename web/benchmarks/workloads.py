@@ -0,0 +1,145 @@
+"""
+Generators of synthetic Workflows used by benchmarks.
+
+Workflows are generated as import documents (see `schemas.WorkflowInImport`), so the same Workflow
+can be created in DB with import endpoint or `services.import_workflow`, or built in memory with `build_models`.
+Every Condition checks `status == "sent"` and every Message is sent, so runs always follow "yes" edges.
+"""
+from typing import Callable
+
+from app import models
+
+
+class WorkflowBuilder:
+    """
+    Collects Nodes and Edges of import document
+    """
+
+    def __init__(self, name: str) -> None:
+        self.name = name
+        self.nodes = [{"id": "start", "type": "start"}, {"id": "end", "type": "end"}]
+        self.edges = []
+
+    def add_message(self, node_id: str) -> str:
+        self.nodes.append({"id": node_id, "type": "message", "status": "sent", "text": f"Message {node_id}"})
+        return node_id
+
+    def add_condition(self, node_id: str) -> str:
+        self.nodes.append({"id": node_id, "type": "condition", "expression": 'status == "sent"'})
+        return node_id
+
+    def add_edge(self, source_node_id: str, target_node_id: str, is_yes_condition: bool = True) -> None:
+        self.edges.append({
+            "source_node_id": source_node_id,
+            "target_node_id": target_node_id,
+            "is_yes_condition": is_yes_condition
+        })
+
+    def build(self) -> dict:
+        return {"name": self.name, "nodes": self.nodes, "edges": self.edges}
+
+
+def generate_chain(messages_count: int) -> dict:
+    """
+    Generates Workflow with chain of Message and Condition Nodes.
+
+    Every Condition leads to the next Message by "yes" edge and to End Node by "no" edge,
+    the last Condition only has "yes" edge to End Node. Run goes through every Node of the chain.
+    """
+    builder = WorkflowBuilder(name=f"Chain {messages_count}")
+    previous_node_id = "start"
+    for i in range(messages_count):
+        builder.add_edge(previous_node_id, builder.add_message(f"msg{i}"))
+        builder.add_edge(f"msg{i}", builder.add_condition(f"condition{i}"))
+        if i < messages_count - 1:
+            builder.add_edge(f"condition{i}", "end", is_yes_condition=False)
+        previous_node_id = f"condition{i}"
+    builder.add_edge(previous_node_id, "end")
+    return builder.build()
+
+
+def generate_tree(depth: int) -> dict:
+    """
+    Generates Workflow with full binary tree of Conditions of given depth.
+
+    Both "yes" and "no" edges of every Condition lead to Message followed by Condition of the next level,
+    Messages of the last level lead to End Node. Run goes from the root to one of the leaves.
+    """
+    builder = WorkflowBuilder(name=f"Tree {depth}")
+    builder.add_edge("start", builder.add_message("msg"))
+    builder.add_edge("msg", builder.add_condition("condition"))
+    # Nodes are named after branches leading to them from the root, e.g. "msgyn", "conditionyn"
+    level = [""]
+    for level_index in range(1, depth + 1):
+        next_level = []
+        for path in level:
+            for branch, is_yes_condition in (("y", True), ("n", False)):
+                message_id = builder.add_message(f"msg{path}{branch}")
+                builder.add_edge(f"condition{path}", message_id, is_yes_condition=is_yes_condition)
+                if level_index < depth:
+                    builder.add_edge(message_id, builder.add_condition(f"condition{path}{branch}"))
+                    next_level.append(f"{path}{branch}")
+                else:
+                    builder.add_edge(message_id, "end")
+        level = next_level
+    return builder.build()
+
+
+def generate_fan_in(width: int) -> dict:
+    """
+    Generates Workflow where End Node has `width` incoming edges.
+
+    Chain of Message and Condition Nodes, "no" edge of every Condition leads to separate Message linked to End Node.
+    """
+    builder = WorkflowBuilder(name=f"Fan-in {width}")
+    previous_node_id = "start"
+    for i in range(width):
+        builder.add_edge(previous_node_id, builder.add_message(f"msg{i}"))
+        builder.add_edge(f"msg{i}", builder.add_condition(f"condition{i}"))
+        builder.add_edge(f"condition{i}", builder.add_message(f"leaf{i}"), is_yes_condition=False)
+        builder.add_edge(f"leaf{i}", "end")
+        previous_node_id = f"condition{i}"
+    builder.add_edge(previous_node_id, "end")
+    return builder.build()
+
+
+SHAPES: dict[str, Callable[[int], dict]] = {
+    "chain": generate_chain,
+    "tree": generate_tree,
+    "fan_in": generate_fan_in,
+}
+
+
+def build_models(document: dict) -> tuple[models.Workflow, list[models.Node], list[models.Edge]]:
+    """
+    Builds in-memory Workflow, Nodes (with Message and Condition data) and Edges of import document
+    """
+    workflow = models.Workflow(id=1, name=document["name"], version=1)
+    nodes = {}
+    for node_data in document["nodes"]:
+        node = models.Node(id=len(nodes) + 1, workflow_id=workflow.id, type=models.Node.NodeTypeEnum(node_data["type"]))
+        if node.type == models.Node.NodeTypeEnum.message:
+            node.message = models.Message(
+                status=models.Message.MessageStatusEnum(node_data["status"]),
+                text=node_data["text"]
+            )
+        elif node.type == models.Node.NodeTypeEnum.condition:
+            node.condition = models.Condition(expression=node_data["expression"])
+        nodes[node_data["id"]] = node
+
+    edges = []
+    for edge_data in document["edges"]:
+        source_node = nodes[edge_data["source_node_id"]]
+        edge = models.Edge(
+            id=len(edges) + 1,
+            workflow_id=workflow.id,
+            source_node_id=source_node.id,
+            target_node_id=nodes[edge_data["target_node_id"]].id
+        )
+        edges.append(edge)
+        if source_node.type == models.Node.NodeTypeEnum.condition:
+            if edge_data["is_yes_condition"]:
+                source_node.condition.yes_edge_id = edge.id
+            else:
+                source_node.condition.no_edge_id = edge.id
+    return workflow, list(nodes.values()), edges